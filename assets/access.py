@@ -0,0 +1,74 @@
+"""
+Per-session cache of the departments a user may see.
+
+``visible_department_ids()`` in models.py takes two queries, the user's
+grants and the departments below them, and ``visible_to(user)`` turns the
+answer into a ``department_id IN (...)`` filter. Views call ``load()`` (or
+``aload()``) once per request, which keeps the answer in the session so
+those two queries run once per login rather than once per page.
+
+A generation number in the default cache, bumped after commit whenever a
+grant or the department tree changes, tells every session to work its
+answer out again on the next request. With more than one process the cache
+must be shared, as for fragments.py; with the dummy cache (``DEBUG``) there
+is no generation and the answer is worked out on every request.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+from .models import visible_department_ids
+
+SESSION_KEY = 'visible_departments'
+GENERATION_KEY = 'department-access-generation'
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def changed():
+    """Make every session recompute its departments once the transaction commits."""
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, time.time_ns() // 1000, None))
+
+
+def load(request):
+    """``visible_department_ids(request.user)``, from the session while still current."""
+    user = request.user
+    if not user.is_authenticated or user.is_superuser:
+        return visible_department_ids(user)
+    generation = _generation()
+    if generation is None:
+        return visible_department_ids(user)
+    stored = request.session.get(SESSION_KEY)
+    if stored and stored['user'] == user.pk and stored['generation'] == generation:
+        metrics.CACHE_REQUESTS.inc(cache='visible_departments', result='hit')
+        ids = None if stored['ids'] is None else frozenset(stored['ids'])
+        # Where visible_department_ids() looks first
+        user._visible_department_ids = ids
+        return ids
+    metrics.CACHE_REQUESTS.inc(cache='visible_departments', result='miss')
+    ids = visible_department_ids(user)
+    request.session[SESSION_KEY] = {
+        'user': user.pk, 'generation': generation, 'ids': None if ids is None else sorted(ids),
+    }
+    return ids
+
+
+async def aload(request):
+    return await sync_to_async(load)(request)
+
+
+def scope_key(ids):
+    """Short key naming a set of visible departments, for cache keys shared by everyone who sees the same."""
+    if ids is None:
+        return 'all'
+    return hashlib.md5(','.join(map(str, sorted(ids))).encode(), usedforsecurity=False).hexdigest()[:16]
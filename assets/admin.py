@@ -1,38 +1,214 @@
 from django.contrib import admin
-from .models import Department, AssetCategory, Asset, AssetMovement, MaintenanceRecord
+from .models import Campus, Building, Room, Department, DepartmentAccess, AssetCategory, Asset, AssetMovement, MaintenanceRecord, HistoryArchive, CheckoutSession, Stocktake, StocktakeScan, AuditEvent, ApiToken
+from .pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables that grow to millions of rows: no exact
+    COUNT queries (estimated page count, no "N total" link) and search
+    fields limited to indexed prefix / exact lookups.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ConditionFilter(admin.SimpleListFilter):
+    # Fixed options; the default filter would scan every row for DISTINCT values
+    title = 'condition'
+    parameter_name = 'condition'
+    conditions = ('Excellent', 'Good', 'Fair', 'Poor')
+
+    def lookups(self, request, model_admin):
+        return [(condition, condition) for condition in self.conditions]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(condition=self.value())
+        return queryset
 
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'location', 'head_of_department')
+    list_display = ('name', 'parent', 'location', 'head_of_department')
+    list_select_related = ('parent',)
     search_fields = ('name', 'head_of_department')
+    autocomplete_fields = ('parent',)
+    # Tree order: every unit directly after its parent
+    ordering = ('path',)
+
+
+@admin.register(DepartmentAccess)
+class DepartmentAccessAdmin(admin.ModelAdmin):
+    list_display = ('user', 'department', 'granted_at')
+    list_select_related = ('user', 'department')
+    search_fields = ('user__username', 'department__name')
+    autocomplete_fields = ('user', 'department')
+
+
+@admin.register(Campus)
+class CampusAdmin(admin.ModelAdmin):
+    list_display = ('name', 'latitude', 'longitude')
+    search_fields = ('name',)
+
+
+@admin.register(Building)
+class BuildingAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'campus', 'latitude', 'longitude')
+    list_filter = ('campus',)
+    list_select_related = ('campus',)
+    search_fields = ('name', 'code')
+
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ('name', 'building', 'floor', 'latitude', 'longitude')
+    list_filter = ('building__campus',)
+    list_select_related = ('building',)
+    search_fields = ('^name', '^building__name', '=building__code')
+    autocomplete_fields = ('building',)
 
 
 @admin.register(AssetCategory)
 class AssetCategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'description')
+    list_display = ('name', 'description', 'default_depreciation_method', 'default_useful_life_years', 'default_salvage_percent')
     search_fields = ('name',)
 
 
+class DeletedFilter(admin.SimpleListFilter):
+    # Soft-deleted assets are listed only when asked for
+    title = 'deleted'
+    parameter_name = 'deleted'
+
+    def lookups(self, request, model_admin):
+        return [('yes', 'Deleted, awaiting purge')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(deleted_at__isnull=False)
+        return queryset.filter(deleted_at__isnull=True)
+
+
 @admin.register(Asset)
-class AssetAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'department', 'condition', 'status', 'purchase_date')
-    list_filter = ('category', 'department', 'status', 'condition')
-    search_fields = ('name', 'serial_number')
+class AssetAdmin(LargeTableAdmin):
+    list_display = ('name', 'category', 'department', 'condition', 'status', 'purchase_date', 'purchase_cost')
+    list_filter = (DeletedFilter, 'category', 'department', 'status', ConditionFilter)
+    list_select_related = ('category', 'department', 'room__building')
+    # Served by the CaseInsensitiveIndex entries in Asset.Meta.indexes
+    search_fields = ('^name', '=serial_number')
+    autocomplete_fields = ('category', 'department', 'room', 'assigned_to')
     ordering = ('-date_added',)
+    readonly_fields = ('deleted_at',)
+    actions = ['restore_assets']
+
+    def get_queryset(self, request):
+        # Deleted assets too, so they can be found and restored
+        return Asset.all_objects.all()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Autocomplete widgets elsewhere in the admin offer live assets only
+        if request.path.endswith('/autocomplete/'):
+            queryset = queryset.filter(deleted_at__isnull=True)
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.action(description="Restore selected deleted assets")
+    def restore_assets(self, request, queryset):
+        restored = 0
+        for asset in queryset.filter(deleted_at__isnull=False):
+            asset.restore()
+            restored += 1
+        self.message_user(request, f"{restored} asset(s) restored.")
 
 
 @admin.register(AssetMovement)
-class AssetMovementAdmin(admin.ModelAdmin):
+class AssetMovementAdmin(LargeTableAdmin):
     list_display = ('asset', 'from_department', 'to_department', 'moved_by', 'date_moved')
     list_filter = ('from_department', 'to_department')
-    search_fields = ('asset__name', 'moved_by__username')
+    list_select_related = ('asset', 'from_department', 'to_department', 'moved_by')
+    search_fields = ('^asset__name', '=moved_by__username')
+    autocomplete_fields = ('asset', 'from_department', 'to_department', 'from_room', 'to_room', 'moved_by')
 
 
 @admin.register(MaintenanceRecord)
-class MaintenanceRecordAdmin(admin.ModelAdmin):
+class MaintenanceRecordAdmin(LargeTableAdmin):
     list_display = ('asset', 'issue_reported', 'maintenance_date', 'performed_by')
     list_filter = ('maintenance_date',)
-    search_fields = ('asset__name', 'performed_by')
+    list_select_related = ('asset',)
+    search_fields = ('^asset__name', '^performed_by')
+    autocomplete_fields = ('asset',)
     date_hierarchy = 'maintenance_date'
 
+
+@admin.register(HistoryArchive)
+class HistoryArchiveAdmin(LargeTableAdmin):
+    list_display = ('asset_id', 'kind', 'records', 'first_date', 'last_date', 'archived_at')
+    list_filter = ('kind',)
+    search_fields = ('=asset__id',)
+    exclude = ('data',)
+    date_hierarchy = 'archived_at'
+
+    # Written only by manage.py archive_history
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CheckoutSession)
+class CheckoutSessionAdmin(LargeTableAdmin):
+    list_display = ('asset', 'user', 'started_at', 'ended_at')
+    list_select_related = ('asset', 'user')
+    search_fields = ('^asset__name', '=user__username')
+    autocomplete_fields = ('asset', 'user')
+    date_hierarchy = 'started_at'
+
+
+@admin.register(Stocktake)
+class StocktakeAdmin(admin.ModelAdmin):
+    list_display = ('department', 'started_by', 'started_at', 'completed_at')
+    list_select_related = ('department', 'started_by')
+    search_fields = ('^department__name',)
+    autocomplete_fields = ('department', 'started_by')
+    date_hierarchy = 'started_at'
+
+
+@admin.register(StocktakeScan)
+class StocktakeScanAdmin(LargeTableAdmin):
+    list_display = ('serial_number', 'asset', 'result', 'room', 'scanned_at', 'stocktake')
+    list_filter = ('result',)
+    list_select_related = ('asset', 'room__building', 'stocktake__department')
+    search_fields = ('=serial_number',)
+    autocomplete_fields = ('stocktake', 'asset', 'room')
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(LargeTableAdmin):
+    list_display = ('timestamp', 'actor_username', 'action', 'object_type', 'object_repr')
+    list_filter = ('action', 'object_type')
+    search_fields = ('=actor_username', '=object_id')
+    date_hierarchy = 'timestamp'
+
+    # The audit trail is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'prefix', 'created', 'revoked')
+    list_filter = ('revoked',)
+    fields = ('user', 'name', 'prefix', 'created', 'revoked')
+    readonly_fields = ('prefix', 'created')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+
+    # Keys are issued with the create_api_token command, which shows them once
+    def has_add_permission(self, request):
+        return False
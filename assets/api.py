@@ -0,0 +1,574 @@
+"""
+Token-authenticated JSON API (v1).
+
+Every collection supports:
+
+* ``?fields=a,b,c`` - only those columns are selected in SQL;
+* filters from ``Resource.filters``, applied as WHERE clauses
+  (comma-separated values become ``__in``);
+* cursor pagination with ``?cursor=`` / ``?limit=`` (keyset, see pagination.py).
+
+Rows are read with ``values()`` so related names (``department_name`` ...)
+come from joins in the same query and no model instances are built.
+Assets, movements and maintenance records also accept bulk writes: POST a
+list to create, PATCH a list of objects with ``id`` to update. A batch is
+validated as a whole with a fixed number of queries and written in one
+transaction.
+``changes/`` is the incremental change feed (see changefeed.py).
+"""
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from . import asset_index, audit, changefeed, events, fragments, metrics, pagination, ratelimit, relocation
+from .models import (
+    ApiToken, Asset, AssetCategory, AssetMovement, CheckoutSession, Department, MaintenanceRecord,
+    canonical_serial, visible_department_ids,
+)
+
+MAX_BATCH_SIZE = 500
+
+
+def error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+# -------------------------------
+# Authentication
+# -------------------------------
+def token_required(view):
+    """Authenticate ``Authorization: Token <key>`` (or ``Bearer``) requests."""
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() not in ('token', 'bearer') or not key.strip():
+            return error("Authentication credentials were not provided.", status=401)
+        token = (
+            ApiToken.objects.select_related('user')
+            .filter(key_hash=ApiToken.hash_key(key.strip()), revoked=False, user__is_active=True)
+            .first()
+        )
+        if token is None:
+            return error("Invalid token.", status=401)
+        request.user = token.user
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+# -------------------------------
+# Resources
+# -------------------------------
+class Resource:
+    """
+    Describes how one model is exposed.
+
+    ``fields`` maps API names to ORM paths; ``filters`` maps query
+    parameters to ORM lookups; ``writable`` lists the API fields accepted by
+    bulk create/update (foreign keys are given as ids), of which
+    ``visible_relations`` may only point at rows the user can see
+    (``visible_to`` in models.py) and ``create_only`` may not be changed by
+    an update. ``related`` names the relations read after a bulk write
+    (audit text, events), loaded with one query each. ``prepare`` derives
+    what ``save()`` would from each object before validation, as bulk writes
+    skip ``save()``, and returns ``{attname set: field it came from}`` so
+    errors on derived columns are reported against the field sent.
+    """
+
+    def __init__(self, model, fields, default_fields, ordering, filters, writable=(), after_create=None,
+                 prepare=None, visible_relations=(), create_only=(), related=()):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.ordering = ordering
+        self.filters = filters
+        self.writable = writable
+        self.after_create = after_create
+        self.prepare = prepare
+        self.visible_relations = visible_relations
+        self.create_only = create_only
+        self.related = related
+
+    def objects(self, user):
+        """The rows ``user`` may read and write."""
+        queryset = self.model._default_manager.all()
+        if hasattr(queryset, 'visible_to'):
+            queryset = queryset.visible_to(user)
+        return queryset
+
+    def model_field(self, name):
+        return self.model._meta.get_field(self.fields[name])
+
+
+def _prepare_asset(asset, attnames):
+    if 'serial_number' not in attnames:
+        return {}
+    asset.serial_canonical = canonical_serial(asset.serial_number)
+    return {'serial_canonical': 'serial_number'}
+
+
+def _assets_created(assets):
+    asset_index.refresh(asset.pk for asset in assets)
+    fragments.assets_changed()
+
+
+ASSETS = Resource(
+    Asset,
+    fields={
+        'id': 'id', 'name': 'name', 'serial_number': 'serial_number',
+        'category': 'category', 'category_name': 'category__name',
+        'department': 'department', 'department_name': 'department__name',
+        'room': 'room', 'room_name': 'room__name',
+        'building': 'room__building', 'building_name': 'room__building__name',
+        'assigned_to': 'assigned_to', 'status': 'status', 'condition': 'condition',
+        'purchase_date': 'purchase_date', 'purchase_cost': 'purchase_cost',
+        'depreciation_method': 'depreciation_method', 'useful_life_years': 'useful_life_years',
+        'salvage_value': 'salvage_value', 'description': 'description',
+        'current_user': 'current_user', 'last_checked_out': 'last_checked_out',
+        'expected_return_time': 'expected_return_time', 'date_added': 'date_added',
+    },
+    default_fields=('id', 'name', 'serial_number', 'category', 'department', 'status', 'condition'),
+    ordering=('id',),
+    filters={
+        'status': 'status', 'condition': 'condition', 'category': 'category_id',
+        'department': 'department_id', 'room': 'room_id', 'building': 'room__building_id',
+        'assigned_to': 'assigned_to_id', 'serial_number': 'serial_number', 'name_prefix': 'name__istartswith',
+        'purchased_after': 'purchase_date__gte', 'purchased_before': 'purchase_date__lte',
+    },
+    writable=(
+        'name', 'serial_number', 'category', 'department', 'room', 'assigned_to', 'status', 'condition',
+        'purchase_date', 'purchase_cost', 'depreciation_method', 'useful_life_years',
+        'salvage_value', 'description', 'current_user', 'expected_return_time',
+    ),
+    after_create=_assets_created,
+    prepare=_prepare_asset,
+    visible_relations=('department',),
+)
+
+MOVEMENTS = Resource(
+    AssetMovement,
+    fields={
+        'id': 'id', 'asset': 'asset', 'asset_name': 'asset__name',
+        'from_department': 'from_department', 'from_department_name': 'from_department__name',
+        'to_department': 'to_department', 'to_department_name': 'to_department__name',
+        'from_room': 'from_room', 'to_room': 'to_room',
+        'moved_by': 'moved_by', 'moved_by_username': 'moved_by__username',
+        'date_moved': 'date_moved', 'remarks': 'remarks',
+    },
+    default_fields=('id', 'asset', 'from_department', 'to_department', 'moved_by', 'date_moved'),
+    ordering=('-date_moved', '-id'),
+    filters={
+        'asset': 'asset_id', 'from_department': 'from_department_id',
+        'to_department': 'to_department_id', 'to_room': 'to_room_id', 'moved_by': 'moved_by_id',
+        'moved_after': 'date_moved__gte', 'moved_before': 'date_moved__lt',
+    },
+    writable=('asset', 'from_department', 'to_department', 'from_room', 'to_room', 'remarks'),
+    after_create=relocation.apply_movements,
+    visible_relations=('asset',),
+    # The asset was moved when the movement was recorded; changing where it
+    # went afterwards would rewrite history without moving it again
+    create_only=('asset', 'to_department', 'to_room'),
+    related=('asset', 'to_department'),
+)
+
+MAINTENANCE = Resource(
+    MaintenanceRecord,
+    fields={
+        'id': 'id', 'asset': 'asset', 'asset_name': 'asset__name',
+        'issue_reported': 'issue_reported', 'maintenance_date': 'maintenance_date',
+        'performed_by': 'performed_by', 'remarks': 'remarks',
+    },
+    default_fields=('id', 'asset', 'issue_reported', 'maintenance_date', 'performed_by'),
+    ordering=('-maintenance_date', '-id'),
+    filters={
+        'asset': 'asset_id', 'performed_by': 'performed_by',
+        'date_after': 'maintenance_date__gte', 'date_before': 'maintenance_date__lte',
+    },
+    writable=('asset', 'issue_reported', 'maintenance_date', 'performed_by', 'remarks'),
+    visible_relations=('asset',),
+    related=('asset',),
+)
+
+DEPARTMENTS = Resource(
+    Department,
+    fields={
+        'id': 'id', 'name': 'name', 'location': 'location', 'head_of_department': 'head_of_department',
+        'parent': 'parent', 'path': 'path',
+    },
+    default_fields=('id', 'name', 'location', 'head_of_department', 'parent'),
+    ordering=('id',),
+    filters={'name': 'name', 'parent': 'parent_id'},
+)
+
+CATEGORIES = Resource(
+    AssetCategory,
+    fields={
+        'id': 'id', 'name': 'name', 'description': 'description',
+        'default_depreciation_method': 'default_depreciation_method',
+        'default_useful_life_years': 'default_useful_life_years',
+        'default_salvage_percent': 'default_salvage_percent',
+    },
+    default_fields=('id', 'name', 'description'),
+    ordering=('id',),
+    filters={'name': 'name'},
+)
+
+
+# -------------------------------
+# Reading
+# -------------------------------
+def _selected_fields(request, resource):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(resource.default_fields)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ValidationError(f"Unknown field(s): {', '.join(unknown)}.")
+    return names
+
+
+def _filtered(request, resource, queryset):
+    for param, lookup in resource.filters.items():
+        value = request.GET.get(param)
+        if value is None:
+            continue
+        if ',' in value and '__' not in lookup:
+            queryset = queryset.filter(**{f'{lookup}__in': value.split(',')})
+        else:
+            queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def _rows(queryset, resource, names, extra=()):
+    """``values()`` over the ORM paths, renamed to API names."""
+    paths = [resource.fields[name] for name in names]
+    for path in extra:
+        if path not in paths:
+            paths.append(path)
+    reverse = {resource.fields[name]: name for name in names}
+    return queryset.values(*paths), reverse
+
+
+def _render(rows, reverse):
+    return [{api: row[path] for path, api in reverse.items()} for row in rows]
+
+
+def _list(request, resource):
+    try:
+        names = _selected_fields(request, resource)
+        queryset = _filtered(request, resource, resource.objects(request.user))
+        ordering_paths = [name.lstrip('-') for name in resource.ordering]
+        values, reverse = _rows(queryset, resource, names, extra=ordering_paths)
+        rows, next_cursor = pagination.keyset_page(
+            values, resource.ordering, request.GET.get('cursor'),
+            pagination.page_size(request.GET.get('limit')),
+        )
+    except pagination.InvalidCursor as exc:
+        return error(str(exc))
+    except (ValidationError, ValueError, TypeError) as exc:
+        return error(exc.messages[0] if isinstance(exc, ValidationError) else str(exc))
+    return JsonResponse({'results': _render(rows, reverse), 'next': next_cursor})
+
+
+# -------------------------------
+# Bulk writes
+# -------------------------------
+def _parse_items(request):
+    try:
+        payload = json.loads(request.body or b'null')
+    except ValueError:
+        raise ValidationError("Request body must be JSON.")
+    items = payload if isinstance(payload, list) else [payload]
+    if not items or not all(isinstance(item, dict) for item in items):
+        raise ValidationError("Send an object or a list of objects.")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValidationError(f"At most {MAX_BATCH_SIZE} objects per request.")
+    return items
+
+
+def _assign(resource, obj, item, errors, creating=True):
+    """Copy ``item`` onto ``obj``; returns the attnames that were set."""
+    touched = []
+    for name, value in item.items():
+        if name == 'id':
+            continue
+        if name not in resource.writable:
+            errors[name] = ["This field is not writable."]
+            continue
+        if not creating and name in resource.create_only:
+            errors[name] = ["This field cannot be changed after creation."]
+            continue
+        field = resource.model_field(name)
+        if field.is_relation:
+            try:
+                value = None if value is None else field.target_field.to_python(value)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+                continue
+        setattr(obj, field.attname, value)
+        touched.append(field.attname)
+    return touched
+
+
+def _prepare(resource, objs, touched):
+    """Run ``resource.prepare``; returns ``{derived attname: field it came from}``."""
+    sources = {}
+    if resource.prepare:
+        for obj, attnames in zip(objs, touched):
+            derived = resource.prepare(obj, attnames)
+            attnames.extend(derived)
+            sources.update(derived)
+    return sources
+
+
+def _add_error(errors, name, message):
+    # A derived column can repeat the error already reported for its source
+    messages = errors.setdefault(name, [])
+    if message not in messages:
+        messages.append(message)
+
+
+def _validate(resource, objs, touched, creating, sources=None, user=None):
+    """
+    Field validation without per-object queries: plain fields via
+    clean_fields(), foreign keys and unique fields with one query each.
+    With a ``user``, ``visible_relations`` must point at rows they can see.
+    """
+    all_errors = {}
+    relations = [f for f in resource.model._meta.concrete_fields if f.is_relation]
+    relation_names = [f.name for f in relations]
+
+    for position, (obj, attnames) in enumerate(zip(objs, touched)):
+        errors = all_errors.setdefault(position, {})
+        exclude = set(relation_names)
+        if not creating:
+            exclude |= {f.name for f in resource.model._meta.concrete_fields if f.attname not in attnames}
+        try:
+            obj.clean_fields(exclude=exclude)
+        except ValidationError as exc:
+            errors.update(exc.message_dict)
+        if creating:
+            for field in relations:
+                if field.name in resource.writable and not field.blank and getattr(obj, field.attname) is None:
+                    errors.setdefault(field.name, []).append("This field is required.")
+
+    for field in relations:
+        wanted = {getattr(obj, field.attname) for obj in objs} - {None}
+        if not wanted:
+            continue
+        related = field.related_model._base_manager.all()
+        if user is not None and field.name in resource.visible_relations:
+            related = field.related_model.objects.visible_to(user)
+        found = set(related.filter(pk__in=wanted).values_list('pk', flat=True))
+        for position, obj in enumerate(objs):
+            if getattr(obj, field.attname) not in found | {None}:
+                all_errors[position].setdefault(field.name, []).append("Object does not exist.")
+
+    for field in resource.model._meta.concrete_fields:
+        if not field.unique or field.primary_key:
+            continue
+        name = (sources or {}).get(field.attname, field.name)
+        values = {}
+        for position, obj in enumerate(objs):
+            value = getattr(obj, field.attname)
+            if value is None:
+                # NULLs never collide
+                continue
+            if value in values:
+                _add_error(all_errors[position], name, "Duplicate value in this batch.")
+            values[value] = obj.pk
+        taken = resource.model._base_manager.filter(**{f'{field.attname}__in': list(values)})
+        for pk, value in taken.values_list('pk', field.attname):
+            if values.get(value) != pk:
+                position = next(i for i, obj in enumerate(objs) if getattr(obj, field.attname) == value)
+                _add_error(all_errors[position], name, "Already in use.")
+
+    return {position: errors for position, errors in all_errors.items() if errors}
+
+
+def _publish_created(obj):
+    # bulk_create() sends no post_save, so live updates are published
+    # (and business events counted) here
+    if isinstance(obj, Asset):
+        events.asset_changed(obj, created=True)
+    elif isinstance(obj, AssetMovement):
+        events.movement_recorded(obj)
+        metrics.business_event('movement')
+    elif isinstance(obj, MaintenanceRecord):
+        events.maintenance_recorded(obj)
+        metrics.business_event('maintenance')
+
+
+def _attach_related(resource, objs):
+    # One query per relation instead of one per object when audit.record()
+    # and the events read obj.asset and friends
+    for name in resource.related:
+        field = resource.model._meta.get_field(name)
+        ids = {getattr(obj, field.attname) for obj in objs} - {None}
+        rows = field.related_model._base_manager.in_bulk(ids)
+        for obj in objs:
+            pk = getattr(obj, field.attname)
+            if pk is not None:
+                setattr(obj, name, rows.get(pk))
+
+
+def _sync_checkouts(user, changes):
+    """
+    Open or end the ``CheckoutSession`` of assets whose status moved to or
+    from "In Use", as checkout_asset and return_asset do; ``changes`` holds
+    ``(asset, previous status)`` pairs.
+    """
+    now = timezone.now()
+    for asset, previous_status in changes:
+        if (asset.status == 'In Use') == (previous_status == 'In Use'):
+            continue
+        if asset.status == 'In Use':
+            CheckoutSession.start(asset, user, now)
+        else:
+            CheckoutSession.end(asset, now)
+
+
+def _bulk_create(request, resource):
+    items = _parse_items(request)
+    objs, touched, errors = [], [], {}
+    for position, item in enumerate(items):
+        obj = resource.model()
+        item_errors = {}
+        touched.append(_assign(resource, obj, item, item_errors))
+        if item_errors:
+            errors[position] = item_errors
+        objs.append(obj)
+    sources = _prepare(resource, objs, touched)
+    errors = {
+        **_validate(resource, objs, touched, creating=True, sources=sources, user=request.user), **errors,
+    }
+    if errors:
+        return error("Validation failed.", errors=errors)
+
+    if resource.model is AssetMovement:
+        for obj in objs:
+            obj.moved_by = request.user
+
+    with transaction.atomic():
+        changefeed.stamp(objs)
+        created = resource.model.objects.bulk_create(objs)
+        if resource.after_create:
+            resource.after_create(created)
+        if resource.model is Asset:
+            _sync_checkouts(request.user, [(asset, None) for asset in created])
+    _attach_related(resource, created)
+
+    for obj in created:
+        asset = obj if isinstance(obj, Asset) else getattr(obj, 'asset', None)
+        audit.record(request.user, 'create', obj, audit.diff({}, audit.snapshot(obj)), asset=asset)
+        _publish_created(obj)
+    return JsonResponse({'created': [obj.pk for obj in created]}, status=201)
+
+
+def _bulk_update(request, resource):
+    items = _parse_items(request)
+    ids = [item.get('id') for item in items]
+    if not all(isinstance(pk, int) for pk in ids):
+        return error("Every object needs an integer 'id'.")
+    existing = resource.objects(request.user).select_related(*resource.related).in_bulk(ids)
+    missing = [pk for pk in ids if pk not in existing]
+    if missing:
+        return error("Objects not found.", ids=missing, status=404)
+
+    objs, touched, befores, errors = [], [], [], {}
+    for position, item in enumerate(items):
+        obj = existing[item['id']]
+        befores.append(audit.snapshot(obj))
+        item_errors = {}
+        touched.append(_assign(resource, obj, item, item_errors, creating=False))
+        if item_errors:
+            errors[position] = item_errors
+        objs.append(obj)
+    sources = _prepare(resource, objs, touched)
+    errors = {
+        **_validate(resource, objs, touched, creating=False, sources=sources, user=request.user), **errors,
+    }
+    if errors:
+        return error("Validation failed.", errors=errors)
+
+    fields = sorted({attname for attnames in touched for attname in attnames})
+    if fields:
+        with transaction.atomic():
+            if resource.model in changefeed.FEED_NAMES:
+                changefeed.stamp(objs)
+                fields.append('change_seq')
+            resource.model.objects.bulk_update(objs, fields, batch_size=100)
+            if resource.model is Asset:
+                _sync_checkouts(request.user, [(obj, before['status']) for obj, before in zip(objs, befores)])
+        if resource.model is Asset:
+            asset_index.refresh(obj.pk for obj in objs)
+            fragments.assets_changed()
+
+    for obj, before in zip(objs, befores):
+        asset = obj if isinstance(obj, Asset) else getattr(obj, 'asset', None)
+        audit.record(request.user, 'update', obj, audit.diff(before, audit.snapshot(obj)), asset=asset)
+        if isinstance(obj, Asset):
+            events.asset_changed(obj, previous_status=before['status'])
+    return JsonResponse({'updated': [obj.pk for obj in objs]})
+
+
+# -------------------------------
+# Views
+# -------------------------------
+@token_required
+def collection(request, resource):
+    if request.method == 'GET':
+        return ratelimit.check(request, 'exports') or _list(request, resource)
+    if request.method in ('POST', 'PATCH') and resource.writable:
+        try:
+            if request.method == 'POST':
+                return _bulk_create(request, resource)
+            return _bulk_update(request, resource)
+        except ValidationError as exc:
+            return error(exc.messages[0])
+    return error("Method not allowed.", status=405)
+
+
+@token_required
+def detail(request, resource, pk):
+    if request.method != 'GET':
+        return error("Method not allowed.", status=405)
+    try:
+        names = _selected_fields(request, resource)
+    except ValidationError as exc:
+        return error(exc.messages[0])
+    values, reverse = _rows(resource.objects(request.user).filter(pk=pk), resource, names)
+    row = values.first()
+    if row is None:
+        return error("Not found.", status=404)
+    return JsonResponse(_render([row], reverse)[0])
+
+
+@token_required
+@ratelimit.rate_limited('exports')
+def changes(request):
+    """
+    ``?since=<cursor>&limit=<n>`` -> ``{changes, cursor, has_more}``. Start
+    from ``since=0`` for a full export, then keep passing back ``cursor``.
+    """
+    if request.method != 'GET':
+        return error("Method not allowed.", status=405)
+    if visible_department_ids(request.user) is not None:
+        # The feed is a full export; it is not filtered by department
+        return error("The change feed needs access to every department.", status=403)
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = int(request.GET.get('limit', changefeed.DEFAULT_BATCH_SIZE))
+    except ValueError:
+        return error("'since' and 'limit' must be integers.")
+    if since < 0:
+        return error("'since' cannot be negative.")
+    limit = max(1, min(limit, changefeed.MAX_BATCH_SIZE))
+    feed, cursor, has_more = changefeed.changes_since(since, limit)
+    return JsonResponse({'changes': feed, 'cursor': cursor, 'has_more': has_more})
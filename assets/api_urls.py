@@ -0,0 +1,17 @@
+from django.urls import path
+from . import api
+
+# Mounted at /api/v1/ by campus_tracking/urls.py
+urlpatterns = [
+    path('assets/', api.collection, {'resource': api.ASSETS}, name='api_assets'),
+    path('assets/<int:pk>/', api.detail, {'resource': api.ASSETS}, name='api_asset'),
+    path('movements/', api.collection, {'resource': api.MOVEMENTS}, name='api_movements'),
+    path('movements/<int:pk>/', api.detail, {'resource': api.MOVEMENTS}, name='api_movement'),
+    path('maintenance/', api.collection, {'resource': api.MAINTENANCE}, name='api_maintenance_records'),
+    path('maintenance/<int:pk>/', api.detail, {'resource': api.MAINTENANCE}, name='api_maintenance_record'),
+    path('departments/', api.collection, {'resource': api.DEPARTMENTS}, name='api_departments'),
+    path('departments/<int:pk>/', api.detail, {'resource': api.DEPARTMENTS}, name='api_department'),
+    path('categories/', api.collection, {'resource': api.CATEGORIES}, name='api_categories'),
+    path('categories/<int:pk>/', api.detail, {'resource': api.CATEGORIES}, name='api_category'),
+    path('changes/', api.changes, name='api_changes'),
+]
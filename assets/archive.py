@@ -0,0 +1,171 @@
+"""
+Archival of old movement and maintenance history.
+
+``AssetMovement`` and ``MaintenanceRecord`` only ever grow, yet the list
+pages, the dashboard and the API work with recent history. ``archive()``
+moves the records older than ``settings.HISTORY_ARCHIVE_DAYS``, and every
+record of a disposed asset, into ``HistoryArchive``: one row per asset, kind
+and run, holding the records as zlib-compressed JSON. Department, room and
+user names are written out, so archived records read the same after those
+are renamed or deleted. What stays in the hot tables (and their indexes) is
+the recent history, small enough to stay in memory.
+
+Archived records leave the list pages, the API and the dashboard; the change
+feed reports them as deleted. ``asset_detail`` reads them back for one asset
+on request (``history()``), and the reports' totals still count them.
+
+Assets are archived ``batch_size`` at a time, each batch in one transaction:
+archive rows written, hot rows deleted with plain DELETEs (no per-row
+``delete()`` and signals), tombstones recorded.
+"""
+import json
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import changefeed
+from .models import AssetMovement, HistoryArchive, MaintenanceRecord
+
+DEFAULT_BATCH_SIZE = 200
+# Ids per DELETE, under every backend's limit on query parameters
+DELETE_CHUNK = 500
+
+
+class Kind:
+    def __init__(self, model, date_field, fields):
+        self.model = model
+        self.date_field = date_field
+        # Archived key -> value path; keys match the model's attribute names,
+        # so templates render archived and live records alike
+        self.fields = fields
+        self.timestamped = isinstance(model._meta.get_field(date_field), models.DateTimeField)
+
+    def cutoff(self, before):
+        return before if self.timestamped else timezone.localdate(before)
+
+    def day(self, value):
+        return timezone.localdate(value) if self.timestamped else value
+
+    def parse(self, value):
+        return parse_datetime(value) if self.timestamped else parse_date(value)
+
+
+KINDS = {
+    'movement': Kind(AssetMovement, 'date_moved', {
+        'id': 'id',
+        'date_moved': 'date_moved',
+        'from_department': 'from_department__name',
+        'to_department': 'to_department__name',
+        'from_room': 'from_room__name',
+        'to_room': 'to_room__name',
+        'moved_by': 'moved_by__username',
+        'remarks': 'remarks',
+    }),
+    'maintenance': Kind(MaintenanceRecord, 'maintenance_date', {
+        'id': 'id',
+        'maintenance_date': 'maintenance_date',
+        'issue_reported': 'issue_reported',
+        'performed_by': 'performed_by',
+        'remarks': 'remarks',
+    }),
+}
+
+
+def horizon(days=None):
+    """The moment before which records are archived."""
+    if days is None:
+        days = settings.HISTORY_ARCHIVE_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def due(kind, before):
+    """Records of ``kind`` to archive: older than ``before``, or of a disposed asset."""
+    spec = KINDS[kind]
+    return spec.model.objects.filter(
+        models.Q(**{f'{spec.date_field}__lt': spec.cutoff(before)}) | models.Q(asset__status='Disposed')
+    )
+
+
+def pending(before):
+    """Number of records ``archive(before)`` would move, by kind."""
+    return {kind: due(kind, before).count() for kind in KINDS}
+
+
+def archive(before, batch_size=DEFAULT_BATCH_SIZE):
+    """Move every record due before ``before`` to the archive; returns the counts moved, by kind."""
+    moved = Counter()
+    for kind in KINDS:
+        asset_ids = sorted(set(due(kind, before).order_by().values_list('asset_id', flat=True)))
+        for start in range(0, len(asset_ids), batch_size):
+            moved[kind] += _archive_batch(kind, before, asset_ids[start:start + batch_size])
+    return moved
+
+
+def _archive_batch(kind, before, asset_ids):
+    spec = KINDS[kind]
+    paths = list(spec.fields.values())
+    with transaction.atomic():
+        rows = (
+            due(kind, before).filter(asset_id__in=asset_ids)
+            .order_by('asset_id', f'-{spec.date_field}', '-id')
+            .values_list('asset_id', *paths)
+        )
+        by_asset = {}
+        for asset_id, *values in rows:
+            by_asset.setdefault(asset_id, []).append(dict(zip(spec.fields, values)))
+
+        archives, ids = [], []
+        for asset_id, records in by_asset.items():
+            archives.append(HistoryArchive(
+                asset_id=asset_id,
+                kind=kind,
+                first_date=spec.day(records[-1][spec.date_field]),
+                last_date=spec.day(records[0][spec.date_field]),
+                records=len(records),
+                data=pack(records),
+            ))
+            ids.extend(record['id'] for record in records)
+        HistoryArchive.objects.bulk_create(archives)
+        for start in range(0, len(ids), DELETE_CHUNK):
+            chunk = ids[start:start + DELETE_CHUNK]
+            queryset = spec.model.objects.filter(pk__in=chunk)
+            queryset._raw_delete(queryset.db)
+        changefeed.record_deletions(spec.model, ids)
+    return len(ids)
+
+
+class RecordEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds; archived records
+    # keep the microseconds they had in the hot table
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def pack(records):
+    return zlib.compress(json.dumps(records, cls=RecordEncoder, separators=(',', ':')).encode(), 9)
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(data))
+
+
+def history(archives):
+    """Records held by ``archives`` (``HistoryArchive`` rows), by kind, newest first."""
+    found = {kind: [] for kind in KINDS}
+    for row in archives:
+        spec = KINDS[row.kind]
+        for record in unpack(row.data):
+            record[spec.date_field] = spec.parse(record[spec.date_field])
+            found[row.kind].append(record)
+    for kind, records in found.items():
+        date_field = KINDS[kind].date_field
+        records.sort(key=lambda record: (record[date_field], record['id']), reverse=True)
+    return found
@@ -0,0 +1,439 @@
+"""
+Process-local, read-only model of the asset registry for hot read paths.
+
+Assets are stored column-wise in compact ``array`` buffers; statuses,
+conditions, departments and categories are stored as small integer codes
+into interned lookup tables. Filtering and counting run over zero-copy
+NumPy views of those buffers, so no query reaches the database. NumPy is
+imported on first query, so processes that never use the index (management
+commands, workers) don't pay for loading it.
+
+The index is optional (``ASSET_INDEX_ENABLED``), warmed when the WSGI/ASGI
+application starts and kept fresh by the model signals in ``signals.py``,
+which apply each change once its transaction commits. Each process holds
+its own copy; ``ASSET_INDEX_MAX_AGE`` bounds how stale it can get when
+another process writes (``QuerySet.update()`` and ``bulk_create()`` do not
+send signals either). A stale index is reloaded on a background thread
+while requests keep reading the old copy; changes made during the reload
+are replayed onto the new one before it is swapped in.
+
+It serves the dashboard's counts. The asset list and detail pages still
+query the database: they need columns the index does not hold (location,
+dates, rooms, history) and the list filters by department subtree, so the
+index could at best hand them a list of ids to fetch anyway.
+"""
+import sys
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import Asset, AssetCategory, Department
+
+FIELDS = ('id', 'name', 'serial_number', 'status', 'condition', 'department_id', 'category_id')
+
+
+class AssetRecord:
+    """Read-only snapshot of one indexed asset."""
+    __slots__ = ('id', 'name', 'serial_number', 'status', 'condition', 'department', 'category')
+
+    def __init__(self, id, name, serial_number, status, condition, department, category):
+        self.id = id
+        self.name = name
+        self.serial_number = serial_number
+        self.status = status
+        self.condition = condition
+        self.department = department
+        self.category = category
+
+    def __repr__(self):
+        return f"<AssetRecord {self.id}: {self.name} ({self.status})>"
+
+
+class LookupTable:
+    """
+    Maps values (or primary keys) to small integer codes and back.
+    Code 0 is reserved for "none" so NULL foreign keys cost nothing.
+    """
+    __slots__ = ('_codes', 'labels', 'keys')
+
+    def __init__(self, none_label=None):
+        self._codes = {}
+        self.keys = [None]
+        self.labels = [none_label]
+
+    def code(self, key, label=None):
+        if key is None:
+            return 0
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.keys)
+            self._codes[key] = code
+            self.keys.append(key)
+            self.labels.append(sys.intern(label if label is not None else str(key)))
+        elif label is not None and self.labels[code] != label:
+            self.labels[code] = sys.intern(label)
+        return code
+
+    def find(self, key):
+        """Code for ``key`` without adding it; -1 if unknown."""
+        if key is None:
+            return 0
+        return self._codes.get(key, -1)
+
+    def discard(self, key):
+        """
+        Forget a deleted key. Its code stays behind as an unused slot so the
+        codes of the other keys (and of every stored row) remain valid.
+        """
+        self._codes.pop(key, None)
+
+    @property
+    def live(self):
+        """Number of keys currently known, not counting "none" or discarded ones."""
+        return len(self._codes)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class AssetIndex:
+    # Attributes a reload replaces wholesale
+    _STATE = ('_ids', '_status', '_condition', '_department', '_category', '_names', '_serials', '_rows',
+              'statuses', 'conditions', 'departments', 'categories')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._warm_lock = threading.Lock()
+        self._pending = None
+        self.warmed_at = None
+        self._reset()
+
+    def _reset(self):
+        self._ids = array('q')
+        self._status = array('b')
+        self._condition = array('b')
+        self._department = array('i')
+        self._category = array('i')
+        self._names = []
+        self._serials = []
+        self._rows = {}
+        self.statuses = LookupTable()
+        for value, label in Asset.STATUS_CHOICES:
+            self.statuses.code(value, label)
+        self.conditions = LookupTable()
+        self.departments = LookupTable('Unassigned')
+        self.categories = LookupTable('Uncategorized')
+
+    # ----- Loading and maintenance -----
+
+    def warm(self):
+        """
+        (Re)load the whole index with three queries.
+
+        The new copy is built without holding the lock, so queries keep
+        reading the current one; changes arriving meanwhile are applied to
+        the current copy and replayed onto the new one when it is swapped in.
+        """
+        with self._warm_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                fresh = AssetIndex()
+                fresh._load()
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for name in self._STATE:
+                    setattr(self, name, getattr(fresh, name))
+                pending, self._pending = self._pending, None
+                for method, args in pending:
+                    getattr(self, method)(*args)
+                self.warmed_at = time.monotonic()
+
+    def _load(self):
+        for pk, name in Department.objects.order_by().values_list('id', 'name'):
+            self.departments.code(pk, name)
+        for pk, name in AssetCategory.objects.order_by().values_list('id', 'name'):
+            self.categories.code(pk, name)
+        for row in Asset.objects.order_by().values_list(*FIELDS).iterator(chunk_size=5000):
+            self._append(*row)
+
+    def _record(self, method, *args):
+        """Remember a change for replay if a reload is in progress (lock held)."""
+        if self._pending is not None:
+            self._pending.append((method, args))
+
+    @property
+    def is_warm(self):
+        return self.warmed_at is not None
+
+    @property
+    def is_loading(self):
+        return self._pending is not None
+
+    def is_stale(self):
+        max_age = getattr(settings, 'ASSET_INDEX_MAX_AGE', None)
+        return not self.is_warm or (max_age is not None and time.monotonic() - self.warmed_at > max_age)
+
+    def _append(self, pk, name, serial_number, status, condition, department_id, category_id):
+        self._rows[pk] = len(self._ids)
+        self._ids.append(pk)
+        self._names.append(name)
+        self._serials.append(serial_number)
+        self._status.append(self.statuses.code(status))
+        self._condition.append(self.conditions.code(condition))
+        self._department.append(self.departments.code(department_id))
+        self._category.append(self.categories.code(category_id))
+
+    def upsert(self, pk, name, serial_number, status, condition, department_id, category_id):
+        with self._lock:
+            self._record('upsert', pk, name, serial_number, status, condition, department_id, category_id)
+            row = self._rows.get(pk)
+            if row is None:
+                self._append(pk, name, serial_number, status, condition, department_id, category_id)
+                return
+            self._names[row] = name
+            self._serials[row] = serial_number
+            self._status[row] = self.statuses.code(status)
+            self._condition[row] = self.conditions.code(condition)
+            self._department[row] = self.departments.code(department_id)
+            self._category[row] = self.categories.code(category_id)
+
+    def upsert_asset(self, asset):
+        self.upsert(*row_of(asset))
+
+    def remove(self, pk):
+        """Delete a row by moving the last row into its slot (O(1))."""
+        with self._lock:
+            self._record('remove', pk)
+            row = self._rows.pop(pk, None)
+            if row is None:
+                return
+            last = len(self._ids) - 1
+            columns = (self._ids, self._names, self._serials, self._status,
+                       self._condition, self._department, self._category)
+            if row != last:
+                for column in columns:
+                    column[row] = column[last]
+                self._rows[self._ids[row]] = row
+            for column in columns:
+                column.pop()
+
+    def rename_department(self, pk, name):
+        with self._lock:
+            self._record('rename_department', pk, name)
+            self.departments.code(pk, name)
+
+    def rename_category(self, pk, name):
+        with self._lock:
+            self._record('rename_category', pk, name)
+            self.categories.code(pk, name)
+
+    def clear_department(self, pk):
+        """Mirror ``on_delete=SET_NULL`` for a deleted department."""
+        with self._lock:
+            self._record('clear_department', pk)
+            code = self.departments.find(pk)
+            if code > 0:
+                self._clear_code(self._department, code)
+            self.departments.discard(pk)
+
+    def clear_category(self, pk):
+        with self._lock:
+            self._record('clear_category', pk)
+            code = self.categories.find(pk)
+            if code > 0:
+                self._clear_code(self._category, code)
+            self.categories.discard(pk)
+
+    @staticmethod
+    def _clear_code(column, code):
+        import numpy as np
+        view = np.frombuffer(column, dtype=column.typecode)
+        view[view == code] = 0
+        del view
+
+    # ----- Queries -----
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _mask(self, status=None, department=None, category=None, condition=None):
+        """Boolean mask over rows; filters take values / primary keys."""
+        import numpy as np
+        mask = np.ones(len(self._ids), dtype=bool)
+        for column, table, key in (
+            (self._status, self.statuses, status),
+            (self._department, self.departments, department),
+            (self._category, self.categories, category),
+            (self._condition, self.conditions, condition),
+        ):
+            if key is None:
+                continue
+            codes = [table.find(k) for k in (key if isinstance(key, (list, tuple, set, frozenset)) else [key])]
+            view = np.frombuffer(column, dtype=column.typecode)
+            mask &= np.isin(view, [c for c in codes if c >= 0])
+            del view
+        return mask
+
+    def count(self, **filters):
+        with self._lock:
+            if not filters:
+                return len(self._ids)
+            return int(self._mask(**filters).sum())
+
+    def filter(self, **filters):
+        """Primary keys of matching assets, in index order."""
+        import numpy as np
+        with self._lock:
+            ids = np.frombuffer(self._ids, dtype=np.int64)
+            result = ids[self._mask(**filters)].tolist()
+            del ids
+            return result
+
+    def _dimension(self, dimension):
+        return {
+            'status': (self._status, self.statuses),
+            'condition': (self._condition, self.conditions),
+            'department': (self._department, self.departments),
+            'category': (self._category, self.categories),
+        }[dimension]
+
+    def counts_by(self, dimension, **filters):
+        """
+        ``{key: count}`` grouped by status, condition, department or category.
+        Keys are the stored values / primary keys (``None`` for unassigned),
+        so two departments sharing a name stay apart; see ``labels()``.
+        """
+        import numpy as np
+        with self._lock:
+            column, table = self._dimension(dimension)
+            view = np.frombuffer(column, dtype=column.typecode)
+            if filters:
+                view = view[self._mask(**filters)]
+            counts = np.bincount(view, minlength=len(table)) if len(view) else np.zeros(len(table), dtype=np.int64)
+            del view
+            return {table.keys[code]: int(n) for code, n in enumerate(counts) if n}
+
+    def labels(self, dimension, keys):
+        """``{key: label}`` for keys returned by ``counts_by()``."""
+        with self._lock:
+            table = self._dimension(dimension)[1]
+            return {key: table.labels[max(table.find(key), 0)] for key in keys}
+
+    def get(self, pk):
+        with self._lock:
+            row = self._rows.get(pk)
+            if row is None:
+                return None
+            return AssetRecord(
+                pk, self._names[row], self._serials[row],
+                self.statuses.keys[self._status[row]],
+                self.conditions.keys[self._condition[row]],
+                self.departments.labels[self._department[row]],
+                self.categories.labels[self._category[row]],
+            )
+
+    def records(self, ids):
+        return [record for record in map(self.get, ids) if record is not None]
+
+
+_index = AssetIndex()
+_refreshing = threading.Lock()  # held while a background reload runs
+
+
+def is_enabled():
+    return getattr(settings, 'ASSET_INDEX_ENABLED', False)
+
+
+def get_index():
+    """
+    The shared index; ``None`` when disabled. A cold index is warmed before
+    returning; a stale one is returned as is while a background thread
+    reloads it.
+    """
+    if not is_enabled():
+        return None
+    if not _index.is_warm:
+        _index.warm()
+    elif _index.is_stale():
+        _refresh_in_background()
+    return _index
+
+
+def _refresh_in_background():
+    if not _refreshing.acquire(blocking=False):
+        return  # already running
+    try:
+        threading.Thread(target=_background_warm, name='asset-index-refresh', daemon=True).start()
+    except BaseException:
+        _refreshing.release()
+        raise
+
+
+def _background_warm():
+    try:
+        _index.warm()
+    finally:
+        connections.close_all()  # this thread's own connections
+        _refreshing.release()
+
+
+def live_index():
+    """The shared index if it is warm or being loaded (used by signal handlers)."""
+    if is_enabled() and (_index.is_warm or _index.is_loading):
+        return _index
+    return None
+
+
+def warm():
+    """Startup hook for wsgi.py / asgi.py."""
+    if is_enabled():
+        _index.warm()
+
+
+def row_of(asset):
+    """The ``upsert()`` arguments for an ``Asset`` instance."""
+    return (asset.pk, asset.name, asset.serial_number, asset.status,
+            asset.condition, asset.department_id, asset.category_id)
+
+
+def on_commit(method, *args, using=None):
+    """
+    Call ``index.<method>(*args)`` once the current transaction commits
+    (at once outside a transaction), so rolled-back writes never reach it.
+    """
+    if live_index() is None:
+        return
+
+    def apply():
+        index = live_index()
+        if index is not None:
+            getattr(index, method)(*args)
+
+    transaction.on_commit(apply, using=using)
+
+
+def refresh(pks, using=None):
+    """Reload specific assets after writes that bypass model signals, on commit."""
+    if live_index() is None:
+        return
+    pks = set(pks)
+
+    def apply():
+        index = live_index()
+        if index is None:
+            return
+        found = set()
+        for row in Asset.objects.using(using).filter(pk__in=pks).values_list(*FIELDS):
+            index.upsert(*row)
+            found.add(row[0])
+        for pk in pks - found:
+            index.remove(pk)  # deleted, or soft-deleted
+
+    transaction.on_commit(apply, using=using)
@@ -0,0 +1,105 @@
+"""
+Buffered writes to the append-only audit trail.
+
+Views call ``record()`` as they change things; events are collected in a
+per-request buffer and written by ``AuditMiddleware`` with one
+``bulk_create`` after the response is built, so auditing costs a single
+INSERT per request however many changes it made. Outside a request (shell,
+management commands) events are written straight away.
+"""
+import logging
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .models import Asset, AuditEvent
+
+logger = logging.getLogger(__name__)
+
+_buffer = ContextVar('audit_buffer', default=None)
+
+
+def snapshot(instance, fields=None):
+    """Current field values of ``instance`` keyed by field name."""
+    return model_to_dict(instance, fields=fields, exclude=[instance._meta.pk.name])
+
+
+def diff(before, after):
+    """
+    ``{field: [old, new]}`` for every field whose value changed. Pass ``{}``
+    as ``before`` for a creation and as ``after`` for a deletion.
+    """
+    return {
+        field: [before.get(field), after.get(field)]
+        for field in {**before, **after}
+        if before.get(field) != after.get(field)
+    }
+
+
+def record(user, action, instance, changes=None, asset=None):
+    """
+    Queue an audit event for ``instance``. ``asset`` ties events on
+    movements and maintenance records to the asset they concern.
+    """
+    if asset is None and isinstance(instance, Asset):
+        asset = instance
+    authenticated = user is not None and user.is_authenticated
+    event = AuditEvent(
+        timestamp=timezone.now(),
+        actor_id=user.pk if authenticated else None,
+        actor_username=user.get_username() if authenticated else '',
+        action=action,
+        object_type=instance._meta.model_name,
+        object_id=instance.pk,
+        object_repr=str(instance)[:200],
+        asset_id=asset.pk if asset is not None else None,
+        changes=changes or {},
+    )
+    pending = _buffer.get()
+    if pending is None:
+        event.save()
+    else:
+        pending.append(event)
+
+
+def flush(events):
+    if not events:
+        return
+    try:
+        AuditEvent.objects.bulk_create(events)
+    except Exception:
+        logger.exception("Could not write %d audit event(s)", len(events))
+
+
+class AuditMiddleware:
+    """Collects audit events for the request and writes them in one batch."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        events = []
+        token = _buffer.set(events)
+        try:
+            return self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            flush(events)
+
+    async def __acall__(self, request):
+        events = []
+        token = _buffer.set(events)
+        try:
+            return await self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            if events:
+                await sync_to_async(flush)(events)
@@ -0,0 +1,144 @@
+"""
+Incremental change feed for downstream sync.
+
+Assets, movements and maintenance records carry a ``change_seq`` taken from
+one counter on every save (see ``ChangeTracked`` in models.py); deletions
+leave a ``ChangeTombstone`` with a sequence number of their own. A consumer
+remembers the last cursor it was given and asks for everything after it,
+receiving each changed row once in its current state.
+
+Writes that bypass ``save()`` / ``delete()`` (``bulk_create``,
+``bulk_update``, ``QuerySet.update``, raw SQL) must stamp rows themselves
+with ``stamp()``, ``stamp_queryset()`` or ``record_deletions()``. A batch
+stamped together shares one sequence number, and the feed never splits a
+sequence number across two responses, so a cursor is always safe to resume
+from.
+"""
+from django.db import models, transaction
+
+from .models import Asset, AssetMovement, ChangeSequence, ChangeTombstone, MaintenanceRecord
+
+# Feed name -> model
+FEED_MODELS = {
+    'asset': Asset,
+    'movement': AssetMovement,
+    'maintenance': MaintenanceRecord,
+}
+FEED_NAMES = {model: name for name, model in FEED_MODELS.items()}
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+
+# -------------------------------
+# Stamping writes that skip save()/delete()
+# -------------------------------
+def stamp(objs, using=None):
+    """Give ``objs`` (about to be bulk written) one new sequence number."""
+    seq = ChangeSequence.allocate(using)
+    for obj in objs:
+        obj.change_seq = seq
+    return seq
+
+
+def stamp_queryset(queryset, **updates):
+    """``queryset.update(**updates)`` that also marks the rows as changed."""
+    with transaction.atomic(using=queryset.db, savepoint=False):
+        return queryset.update(change_seq=ChangeSequence.allocate(queryset.db), **updates)
+
+
+def record_deletions(model, pks, using=None):
+    """Write tombstones for rows of ``model`` deleted without ``delete()``."""
+    pks = list(pks)
+    if not pks or model not in FEED_NAMES:
+        return
+    with transaction.atomic(using=using, savepoint=False):
+        seq = ChangeSequence.allocate(using)
+        ChangeTombstone.objects.using(using).bulk_create(
+            [ChangeTombstone(seq=seq, object_type=FEED_NAMES[model], object_id=pk) for pk in pks]
+        )
+
+
+def set_null_dependents(model):
+    """
+    ``(tracked model, field name)`` pairs whose foreign key to ``model`` is
+    nulled when a ``model`` row is deleted - those rows change too.
+    """
+    return [
+        (tracked, field.name)
+        for tracked in FEED_MODELS.values()
+        for field in tracked._meta.concrete_fields
+        if field.is_relation and field.related_model is model
+        and field.remote_field.on_delete is models.SET_NULL
+    ]
+
+
+# -------------------------------
+# Reading the feed
+# -------------------------------
+def _payload_fields(model):
+    """(name, attname) of the columns sent for ``model``; FKs as ids."""
+    return [
+        (field.name, field.attname)
+        for field in model._meta.concrete_fields
+        if field.attname != 'change_seq'
+    ]
+
+
+def _sources(since):
+    sources = [
+        (name, model._default_manager.filter(change_seq__gt=since), 'change_seq')
+        for name, model in FEED_MODELS.items()
+    ]
+    sources.append((None, ChangeTombstone.objects.filter(seq__gt=since), 'seq'))
+    return sources
+
+
+def changes_since(since=0, limit=DEFAULT_BATCH_SIZE):
+    """
+    Changes with a sequence number above ``since``, oldest first.
+
+    Returns ``(changes, cursor, has_more)``. Each change is
+    ``{'seq', 'type', 'id', 'op', 'data'}`` with ``op`` ``'upsert'`` (``data``
+    holds the row) or ``'delete'``. Pass ``cursor`` back as ``since`` for
+    the next batch. A batch holds about ``limit`` changes; it runs over when
+    the last sequence number was shared by a larger bulk write.
+    """
+    sources = _sources(since)
+
+    # Pass 1: the lowest ``limit`` sequence numbers across all sources
+    seqs, capped = [], False
+    for _, queryset, seq_field in sources:
+        found = list(queryset.order_by(seq_field).values_list(seq_field, flat=True)[:limit + 1])
+        capped = capped or len(found) > limit
+        seqs.extend(found)
+    if not seqs:
+        return [], since, False
+    seqs.sort()
+    boundary = seqs[min(limit, len(seqs)) - 1]
+    has_more = seqs[-1] > boundary or capped
+
+    # Pass 2: every row up to and including the boundary sequence number
+    changes = []
+    for name, queryset, seq_field in sources:
+        queryset = queryset.filter(**{f'{seq_field}__lte': boundary})
+        if name is None:
+            for seq, object_type, object_id in queryset.values_list('seq', 'object_type', 'object_id'):
+                changes.append({'seq': seq, 'type': object_type, 'id': object_id, 'op': 'delete'})
+            continue
+        fields = _payload_fields(FEED_MODELS[name])
+        for row in queryset.values('change_seq', *(attname for _, attname in fields)):
+            changes.append({
+                'seq': row['change_seq'],
+                'type': name,
+                'id': row['id'],
+                'op': 'upsert',
+                'data': {field: row[attname] for field, attname in fields},
+            })
+    changes.sort(key=lambda change: (change['seq'], change['type'], change['id']))
+    return changes, boundary, has_more
+
+
+def current_cursor():
+    """The latest sequence number handed out; a full export starts from here."""
+    return ChangeSequence.objects.values_list('value', flat=True).filter(pk=1).first() or 0
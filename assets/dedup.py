@@ -0,0 +1,250 @@
+"""
+Finding assets registered more than once.
+
+Serial numbers are compared in canonical form (``canonical_serial`` in
+models.py), so "ab-12 3" and "AB123" are the same tag. New clashes are
+refused on save; this module finds the ones already in the register and the
+near misses a typo lets through.
+
+Comparing every asset with every other is out of the question at a million
+rows, so only assets sharing a blocking key are compared:
+
+* every serial is filed under itself and under each variant with one
+  character removed. Two serials one typo apart (a character changed,
+  missing, doubled or two swapped) always share one of these keys, so no
+  single typo escapes, and the keys are hashed to integers so a million
+  serials make about ten million sortable ``uint64`` values;
+* assets of the same category, department and purchase date are sorted by
+  name and each compared with the next few, for a second registration whose
+  serial was mistyped worse.
+
+Candidates are scored by edit distance over the longer serial, worked out
+for all pairs at once one character position at a time; names are compared
+by the cosine of their hashed character-bigram counts. Serials that differ
+only in their digits (same length, letters in the same places) are
+consecutive tags rather than typos and never pair. Everything up to the
+scored pairs is whole-array numpy work; pairs above the threshold are then
+merged into clusters.
+"""
+import numpy as np
+
+from .models import Asset, canonical_serial
+
+MAX_CHARS = 48
+BIGRAM_BUCKETS = 128
+# Candidates compared per blocking key (its members sorted) or name block
+WINDOW = 16
+NAME_WINDOW = 6
+SERIAL_THRESHOLD = 0.8
+NAME_THRESHOLD = 0.9
+# A name match still needs serials at least this alike to count
+NAME_SERIAL_THRESHOLD = 0.7
+CHUNK = 1 << 16
+
+_HASH_PRIME = 1099511628211
+
+
+def encode(strings):
+    """``(chars, lengths)``: strings as an ``(n, MAX_CHARS)`` NUL-padded byte matrix."""
+    encoded = np.array([value.encode('utf-8')[:MAX_CHARS] for value in strings], dtype=f'S{MAX_CHARS}')
+    chars = encoded.view(np.uint8).reshape(len(strings), MAX_CHARS)
+    return chars, (chars != 0).sum(axis=1)
+
+
+def _hash(chars):
+    """One ``uint64`` per row of a byte matrix; trailing NULs do not change it."""
+    powers = np.array([pow(_HASH_PRIME, k, 1 << 64) for k in range(chars.shape[1])], dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        return (chars.astype(np.uint64) * powers).sum(axis=1, dtype=np.uint64)
+
+
+def deletion_keys(encoded):
+    """``(keys, rows)``: each string's hash and the hashes of its one-character deletions."""
+    chars, lengths = encoded
+    width = int(lengths.max(initial=0))
+    chars = chars[:, :width]
+    rows = np.arange(len(chars))
+    keys, owners = [_hash(chars)], [rows]
+    for position in range(width):
+        # Deleting from a one-character serial leaves nothing to match on
+        present = lengths > max(position, 1)
+        keys.append(_hash(np.delete(chars[present], position, axis=1)))
+        owners.append(rows[present])
+    return np.concatenate(keys), np.concatenate(owners)
+
+
+def bigram_vectors(chars):
+    """``(counts, norms)``: hashed bigram counts per row of ``encode`` and their lengths."""
+    counts = np.zeros((len(chars), BIGRAM_BUCKETS), dtype=np.uint8)
+    shift = np.uint32(33 - BIGRAM_BUCKETS.bit_length())
+    for start in range(0, len(chars), CHUNK):
+        block = chars[start:start + CHUNK].astype(np.uint32)
+        with np.errstate(over='ignore'):
+            buckets = ((block[:, :-1] << 8 | block[:, 1:]) * np.uint32(2654435761) >> shift).astype(np.int64)
+        rows = np.arange(len(block))[:, None] * BIGRAM_BUCKETS
+        present = block[:, 1:] != 0
+        flat = np.bincount((rows + buckets)[present], minlength=len(block) * BIGRAM_BUCKETS)
+        counts[start:start + CHUNK] = np.minimum(flat, 255).reshape(len(block), BIGRAM_BUCKETS)
+    norms = np.empty(len(chars), dtype=np.float32)
+    for start in range(0, len(chars), CHUNK):
+        block = counts[start:start + CHUNK].astype(np.float32)
+        norms[start:start + CHUNK] = np.sqrt((block * block).sum(axis=1))
+    return counts, norms
+
+
+def similarity(vectors, left, right):
+    """Cosine similarity of the rows ``left[k]`` and ``right[k]`` of ``bigram_vectors``."""
+    counts, norms = vectors
+    scores = np.empty(len(left), dtype=np.float32)
+    for start in range(0, len(left), CHUNK):
+        a, b = left[start:start + CHUNK], right[start:start + CHUNK]
+        dot = (counts[a].astype(np.float32) * counts[b]).sum(axis=1)
+        length = norms[a] * norms[b]
+        scores[start:start + CHUNK] = np.divide(dot, length, out=np.zeros_like(dot), where=length > 0)
+    return scores
+
+
+def edit_similarity(encoded, left, right):
+    """
+    ``1 - levenshtein / longer length`` for the rows ``left[k]`` and
+    ``right[k]`` of ``encode``, every pair advancing through the table together.
+    """
+    chars, lengths = encoded
+    scores = np.empty(len(left), dtype=np.float32)
+    for start in range(0, len(left), CHUNK):
+        a_len, b_len = lengths[left[start:start + CHUNK]], lengths[right[start:start + CHUNK]]
+        width = int(max(a_len.max(initial=0), b_len.max(initial=0)))
+        a = chars[left[start:start + CHUNK], :width]
+        b = chars[right[start:start + CHUNK], :width]
+        rows = np.arange(len(a))
+        previous = np.broadcast_to(np.arange(width + 1, dtype=np.int16), (len(a), width + 1)).copy()
+        distance = b_len.astype(np.int16)  # against an empty left string
+        for i in range(1, width + 1):
+            current = np.empty_like(previous)
+            current[:, 0] = i
+            best = np.minimum(previous[:, :-1] + (a[:, i - 1:i] != b), previous[:, 1:] + 1)
+            for j in range(1, width + 1):
+                current[:, j] = np.minimum(best[:, j - 1], current[:, j - 1] + 1)
+            distance = np.where(a_len == i, current[rows, b_len], distance)
+            previous = current
+        scores[start:start + CHUNK] = 1 - distance / np.maximum(np.maximum(a_len, b_len), 1)
+    return scores
+
+
+def _neighbours(order, block, window):
+    """``(left, right)`` index pairs at most ``window`` apart in ``order`` and in the same block."""
+    block = block[order]
+    lefts, rights = [], []
+    for offset in range(1, min(window, len(order) - 1) + 1):
+        same = block[:-offset] == block[offset:]
+        lefts.append(order[:-offset][same])
+        rights.append(order[offset:][same])
+    if not lefts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def find_clusters(serials, names, blocks, min_score=SERIAL_THRESHOLD):
+    """
+    Duplicate clusters among records given as parallel sequences: canonical
+    serials ('' for none), names, and an integer block per record (records
+    only pair by name within a block). Returns ``[(positions, score,
+    reasons)]`` with positions into the input, best first.
+    """
+    if not len(serials):
+        return []
+    serials = np.asarray(serials, dtype=str)
+    blocks = np.asarray(blocks)
+    has_serial = serials != ''
+    encoded = encode(serials.tolist())
+    # A serial's shape: its hash once every digit reads '#'
+    chars = encoded[0]
+    shapes = _hash(np.where((chars >= ord('0')) & (chars <= ord('9')), ord('#'), chars))
+    pairs = {}
+
+    def keep(left, right, scores, reason):
+        for i, j, score in zip(left.tolist(), right.tolist(), scores.tolist()):
+            key = (i, j) if i < j else (j, i)
+            best, reasons = pairs.get(key, (0.0, set()))
+            pairs[key] = (max(best, score), reasons | {reason})
+
+    def scored(left, right):
+        wanted = has_serial[left] & has_serial[right] & (shapes[left] != shapes[right])
+        left, right = left[wanted], right[wanted]
+        return left, right, edit_similarity(encoded, left, right)
+
+    # Exact clashes: runs of equal canonical serials once sorted
+    order = np.argsort(serials, kind='stable')
+    equal = (serials[order[1:]] == serials[order[:-1]]) & has_serial[order[1:]]
+    left, right = order[:-1][equal], order[1:][equal]
+    keep(left, right, np.ones(len(left), dtype=np.float32), 'same serial')
+
+    # One typo apart: a shared deletion key. Sorting each key's members by
+    # shape puts consecutive tags together and a typo next to them
+    keys, rows = deletion_keys(encoded)
+    order = np.argsort(keys)
+    keys, rows = keys[order], rows[order]
+    # Most keys hold only consecutive tags (one shape) and are dropped here
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    row_shapes = shapes[rows]
+    mixed = np.minimum.reduceat(row_shapes, starts) != np.maximum.reduceat(row_shapes, starts)
+    mixed = np.repeat(mixed, np.diff(np.r_[starts, len(keys)]))
+    keys, rows = keys[mixed], rows[mixed]
+    left, right = _neighbours(np.lexsort((shapes[rows], keys)), keys, WINDOW)
+    left, right = rows[left], rows[right]
+    distinct = left != right
+    left, right, scores = scored(left[distinct], right[distinct])
+    close = scores >= min_score
+    keep(left[close], right[close], scores[close], 'similar serial')
+
+    lowered = np.array([name.casefold() for name in names], dtype=str)
+    left, right = _neighbours(np.lexsort((lowered, blocks)), blocks, NAME_WINDOW)
+    close = similarity(bigram_vectors(encode(lowered.tolist())[0]), left, right) >= NAME_THRESHOLD
+    left, right, scores = scored(left[close], right[close])
+    close = scores >= NAME_SERIAL_THRESHOLD
+    keep(left[close], right[close], scores[close], 'similar name')
+
+    parent = list(range(len(serials)))
+    for i, j in pairs:
+        root_i, root_j = _find(parent, i), _find(parent, j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    clusters = {}
+    for (i, j), (score, reasons) in pairs.items():
+        members, best, why = clusters.setdefault(_find(parent, i), (set(), [0.0], set()))
+        members.update((i, j))
+        best[0] = max(best[0], score)
+        why.update(reasons)
+    found = [(sorted(members), round(best[0], 3), sorted(why)) for members, best, why in clusters.values()]
+    found.sort(key=lambda cluster: (-cluster[1], -len(cluster[0]), cluster[0][0]))
+    return found
+
+
+def duplicate_assets(queryset=None, min_score=SERIAL_THRESHOLD):
+    """
+    Clusters of likely duplicate assets as ``[(asset_ids, score, reasons)]``.
+
+    Canonical serials are recomputed here rather than read from
+    ``serial_canonical``, which is left empty for clashes that predate it.
+    """
+    if queryset is None:
+        queryset = Asset.objects.all()
+    rows = list(queryset.order_by('id').values_list(
+        'id', 'serial_number', 'name', 'category_id', 'department_id', 'purchase_date',
+    ).iterator(chunk_size=5000))
+    if not rows:
+        return []
+    block_ids = {}
+    blocks = [block_ids.setdefault((category, department, purchased), len(block_ids))
+              for _, _, _, category, department, purchased in rows]
+    found = find_clusters(
+        [canonical_serial(row[1]) or '' for row in rows], [row[2] for row in rows], blocks, min_score=min_score,
+    )
+    return [([rows[position][0] for position in positions], score, reasons) for positions, score, reasons in found]
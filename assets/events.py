@@ -0,0 +1,160 @@
+"""
+In-process publish/subscribe for live page updates.
+
+Signal receivers publish small events (asset status changes, movements,
+maintenance) once the writing transaction commits, and the ``asset_events``
+view streams them to open pages as Server-Sent Events, so the dashboard and
+asset list update in place instead of re-rendering on a timer.
+
+Each event names the departments it concerns, and a subscriber limited to
+some departments (``visible_department_ids`` in models.py) only receives
+events about those.
+
+Subscribers live in this process only: live updates need the site served
+by a single ASGI process (``uvicorn campus_tracking.asgi:application``).
+Under WSGI the stream is refused and pages keep polling.
+"""
+import asyncio
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import presentation
+
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+
+
+class Subscription:
+    def __init__(self, loop, departments=None):
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        # Department ids this subscriber may hear about; None for all
+        self.departments = departments
+
+    def wants(self, departments):
+        return self.departments is None or not self.departments.isdisjoint(departments)
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop. A stalled client loses its
+        # oldest events instead of growing the queue.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class Broker:
+    """Fans events out to subscribers; ``publish`` is safe from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, departments=None):
+        subscription = Subscription(asyncio.get_running_loop(), departments)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, kind, data, departments=()):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        event = (kind, json.dumps(data, cls=DjangoJSONEncoder))
+        for subscription in subscribers:
+            if not subscription.wants(departments):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def publish(kind, data, departments=()):
+    """
+    Publish after the current transaction commits (at once in autocommit).
+    ``departments`` are the ids the event concerns.
+    """
+    if len(broker):
+        transaction.on_commit(lambda: broker.publish(kind, data, departments))
+
+
+async def stream(subscription):
+    """SSE body for one subscriber; unsubscribes when the client goes away."""
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                kind, data = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: {kind}\ndata: {data}\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# -------------------------------
+# Event payloads
+# -------------------------------
+def asset_changed(asset, previous_status=None, created=False):
+    """``asset`` event: what the asset list and dashboard counters need."""
+    if not len(broker):
+        return
+    status_class, status_label = presentation.STATUS_BADGES.get(
+        asset.status, (presentation.DEFAULT_BADGE, asset.status)
+    )
+    action = presentation.STATUS_ACTIONS.get(asset.status)
+    action_url = None
+    if action:
+        head, tail = presentation.url_prefix(f'{action}_asset')
+        action_url = f'{head}{asset.pk}{tail}'
+    publish('asset', {
+        'id': asset.pk,
+        'name': asset.name,
+        'status': asset.status,
+        'previous_status': previous_status,
+        'created': created,
+        'status_label': status_label,
+        'status_class': status_class,
+        'action': action,
+        'action_url': action_url,
+    }, departments=[asset.department_id])
+
+
+def asset_deleted(asset_id, previous_status, department_id=None):
+    publish('asset', {'id': asset_id, 'deleted': True, 'previous_status': previous_status},
+            departments=[department_id])
+
+
+def movement_recorded(movement):
+    publish('movement', {
+        'id': movement.pk,
+        'asset': movement.asset_id,
+        'from_department': movement.from_department_id,
+        'to_department': movement.to_department_id,
+    }, departments=[movement.from_department_id, movement.to_department_id])
+
+
+def maintenance_recorded(record):
+    if not len(broker):
+        return
+    publish('maintenance', {
+        'id': record.pk,
+        'asset': record.asset_id,
+        'maintenance_date': record.maintenance_date,
+    }, departments=[record.asset.department_id])
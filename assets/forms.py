@@ -1,28 +1,125 @@
 from django import forms
-from .models import Asset, AssetMovement, MaintenanceRecord
+from django.forms.utils import flatatt
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .models import Asset, AssetMovement, Department, MaintenanceRecord, Room, Stocktake
+
+
+class TypeaheadWidget(forms.Widget):
+    """
+    Text box with suggestions from a prefix-search endpoint; the chosen
+    object's pk is posted from a hidden input. No <option> is rendered per
+    row, so the page stays small however big the table is.
+    """
+
+    class Media:
+        js = ('js/typeahead.js',)
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def label_for(self, value):
+        # self.choices is the field's ModelChoiceIterator; only used for one get()
+        if value in (None, ''):
+            return ''
+        try:
+            obj = self.choices.queryset.get(pk=value)
+        except (ValueError, TypeError, self.choices.queryset.model.DoesNotExist):
+            return ''
+        return self.choices.field.label_from_instance(obj)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        input_id = attrs.pop('id', f'id_{name}')
+        return format_html(
+            '<div class="typeahead" style="position: relative" data-typeahead-url="{}">'
+            '<input type="text" id="{}" value="{}" autocomplete="off"{}>'
+            '<input type="hidden" name="{}" value="{}" data-typeahead-value>'
+            '<div class="typeahead-menu list-group shadow-sm" '
+            'style="position: absolute; left: 0; right: 0; z-index: 1050; display: none"></div>'
+            '</div>',
+            reverse(self.url_name), input_id, self.label_for(value), flatatt(attrs),
+            name, '' if value is None else value,
+        )
+
+
+class ModelLookupField(forms.ModelChoiceField):
+    """
+    ModelChoiceField for large tables: rendered as a TypeaheadWidget backed
+    by ``url_name`` and validated with a single pk lookup; the queryset is
+    never iterated.
+    """
+
+    def __init__(self, queryset, url_name, placeholder='', **kwargs):
+        kwargs.setdefault('widget', TypeaheadWidget(url_name, attrs={'placeholder': placeholder}))
+        super().__init__(queryset, **kwargs)
+
+
+class VisibleToUserMixin:
+    """
+    Narrows the choices of ``visible_fields`` to what ``user`` may see
+    (``visible_to`` in models.py); without a user nothing is narrowed.
+    """
+    visible_fields = ()
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if user is not None:
+            for name in self.visible_fields:
+                self.fields[name].queryset = self.fields[name].queryset.visible_to(user)
+
+
+class AssetForm(VisibleToUserMixin, forms.ModelForm):
+    visible_fields = ('department',)
+    room = ModelLookupField(
+        Room.objects.select_related('building'), 'room_lookup', required=False,
+        placeholder="Type a building code or name and room number",
+    )
 
-class AssetForm(forms.ModelForm):
     class Meta:
         model = Asset
         fields = [
-            'name', 'category', 'serial_number', 'department', 'assigned_to',
-            'purchase_date', 'condition', 'status', 'description'
+            'name', 'category', 'serial_number', 'department', 'room', 'assigned_to',
+            'purchase_date', 'condition', 'status', 'description',
+            'purchase_cost', 'depreciation_method', 'useful_life_years', 'salvage_value'
         ]
         widgets = {
             'purchase_date': forms.DateInput(attrs={'type': 'date'}),
         }
 
 
-class MovementForm(forms.ModelForm):
+class MovementForm(VisibleToUserMixin, forms.ModelForm):
+    # Assets can be sent to any department, but only taken from a visible one
+    visible_fields = ('asset',)
+    asset = ModelLookupField(Asset.objects.all(), 'asset_lookup', placeholder="Type an asset name or serial number")
+    from_department = ModelLookupField(Department.objects.all(), 'department_lookup', placeholder="Type a department")
+    to_department = ModelLookupField(Department.objects.all(), 'department_lookup', placeholder="Type a department")
+    from_room = ModelLookupField(Room.objects.select_related('building'), 'room_lookup', required=False, placeholder="Type a room")
+    to_room = ModelLookupField(Room.objects.select_related('building'), 'room_lookup', required=False, placeholder="Type a room")
+
     class Meta:
         model = AssetMovement
-        fields = ['asset', 'from_department', 'to_department', 'remarks']
+        fields = ['asset', 'from_department', 'to_department', 'from_room', 'to_room', 'remarks']
 
 
-class MaintenanceForm(forms.ModelForm):
+class MaintenanceForm(VisibleToUserMixin, forms.ModelForm):
+    visible_fields = ('asset',)
+    asset = ModelLookupField(Asset.objects.all(), 'asset_lookup', placeholder="Type an asset name or serial number")
+
     class Meta:
         model = MaintenanceRecord
         fields = ['asset', 'issue_reported', 'maintenance_date', 'performed_by', 'remarks']
         widgets = {
             'maintenance_date': forms.DateInput(attrs={'type': 'date'}),
         }
+
+
+class StocktakeForm(VisibleToUserMixin, forms.ModelForm):
+    visible_fields = ('department',)
+    department = ModelLookupField(Department.objects.all(), 'department_lookup', placeholder="Type a department")
+
+    class Meta:
+        model = Stocktake
+        fields = ['department']
@@ -0,0 +1,87 @@
+"""
+Cached template fragments.
+
+The layout's sidebar and header are wrapped in ``{% cache %}`` keyed on what
+they show (role, current page, the user's name), so they need no
+invalidation. The dashboard tables are keyed on a generation number instead:
+model signals (and the API's bulk writes) bump it after commit, and the next
+request renders and caches the table again. They also vary on the set of
+departments the viewer may see, shared by everyone who sees the same ones.
+The dashboard view looks the tables up first and skips their queries when
+they are cached.
+
+Generations live in the default cache. With more than one process that cache
+must be shared (Redis or Memcached), or a write is only seen by the process
+that made it until ``TABLE_TIMEOUT`` runs out.
+"""
+import time
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+from . import metrics
+
+# Keep in step with the {% cache %} timeouts in templates/assets/dashboard.html
+TABLE_TIMEOUT = 600
+
+# Dashboard context variable -> {% cache %} fragment name
+DASHBOARD_TABLES = {
+    'recent_assets': 'dashboard_recent_assets',
+    'top_departments': 'dashboard_top_departments',
+}
+
+
+def _generation_key(name):
+    return f'fragment-generation:{name}'
+
+
+def _new_generation():
+    # Clock-based, so a generation evicted from the cache is never reissued
+    # while fragments rendered under it may still be cached
+    return time.time_ns() // 1000
+
+
+async def adashboard_tables(scope='all'):
+    """
+    ``(generations, cached)`` for the dashboard tables: the generation each
+    ``{% cache %}`` tag varies on, and the HTML of the tables already cached
+    for users who see the departments named by ``scope`` (access.scope_key).
+    """
+    keys = {name: _generation_key(name) for name in DASHBOARD_TABLES}
+    stored = await cache.aget_many(keys.values())
+    generations = {}
+    for name, key in keys.items():
+        if key not in stored:
+            await cache.aadd(key, _new_generation(), None)
+            stored[key] = await cache.aget(key)
+        generations[name] = stored[key]
+
+    fragment_keys = {
+        name: make_template_fragment_key(DASHBOARD_TABLES[name], [generations[name], scope])
+        for name in DASHBOARD_TABLES
+    }
+    html = await cache.aget_many(fragment_keys.values())
+    cached = {name: mark_safe(html[key]) for name, key in fragment_keys.items() if key in html}
+    metrics.CACHE_REQUESTS.inc(len(cached), cache='dashboard_fragments', result='hit')
+    metrics.CACHE_REQUESTS.inc(len(fragment_keys) - len(cached), cache='dashboard_fragments', result='miss')
+    return generations, cached
+
+
+def invalidate(*names):
+    """Retire the cached copies of these dashboard tables once the transaction commits."""
+    def bump():
+        for name in names:
+            key = _generation_key(name)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _new_generation(), None)
+
+    transaction.on_commit(bump)
+
+
+def assets_changed():
+    """Both dashboard tables show asset data; call after writes that skip signals."""
+    invalidate(*DASHBOARD_TABLES)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assets import archive
+
+
+class Command(BaseCommand):
+    help = ('Move old movement and maintenance records, and all history of disposed assets, '
+            'to the compressed history archive (run it nightly or weekly)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive records older than this (default HISTORY_ARCHIVE_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=archive.DEFAULT_BATCH_SIZE,
+                            help='Assets archived per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days cannot be negative.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        before = archive.horizon(options['days'])
+
+        if options['dry_run']:
+            counts = archive.pending(before)
+            verb = 'would be archived'
+        else:
+            counts = archive.archive(before, batch_size=options['batch_size'])
+            verb = 'archived'
+        for kind in archive.KINDS:
+            self.stdout.write(f"{counts.get(kind, 0):>8} {kind} records {verb}")
+        self.stdout.write(self.style.SUCCESS(f"Done (records before {before:%Y-%m-%d %H:%M})."))
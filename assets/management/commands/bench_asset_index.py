@@ -0,0 +1,96 @@
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from assets.asset_index import AssetIndex
+from assets.models import Asset, AssetCategory, Department
+
+
+class Command(BaseCommand):
+    help = 'Compare memory and query latency of the in-memory asset index with the ORM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000, help='Synthetic assets to insert')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query (median is reported)')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        # Everything happens inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            self._populate(count)
+            self._benchmark(options['repeat'])
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done (synthetic rows rolled back).'))
+
+    def _populate(self, count):
+        self.stdout.write(f'Inserting {count:,} synthetic assets...')
+        departments = [Department.objects.create(name=f'Bench Dept {i}') for i in range(20)]
+        categories = [AssetCategory.objects.create(name=f'Bench Category {i}') for i in range(10)]
+        statuses = [value for value, _ in Asset.STATUS_CHOICES]
+        conditions = ['Excellent', 'Good', 'Fair', 'Poor']
+        Asset.objects.bulk_create(
+            (
+                Asset(
+                    name=f'Bench asset {i}',
+                    serial_number=f'BENCH-{i:08d}',
+                    department=departments[i % len(departments)],
+                    category=categories[i % len(categories)],
+                    status=statuses[i % len(statuses)],
+                    condition=conditions[i % len(conditions)],
+                    purchase_date=date(2020, 1, 1),
+                )
+                for i in range(count)
+            ),
+            batch_size=2000,
+        )
+        self.department = departments[3]
+        self.category = categories[2]
+
+    def _time(self, fn, repeat):
+        fn()  # warm-up: NumPy import, statement and page caches
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return sorted(timings)[len(timings) // 2] * 1000
+
+    def _benchmark(self, repeat):
+        tracemalloc.start()
+        index = AssetIndex()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        index.warm()
+        warm_ms = (time.perf_counter() - start) * 1000
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        total = len(index)
+        self.stdout.write(f'Warm-up: {warm_ms:,.0f} ms for {total:,} assets')
+        self.stdout.write(f'Memory:  {(after - before) / total:,.1f} bytes/asset '
+                          f'({(after - before) / 1024 / 1024:,.1f} MiB total)')
+
+        dept, cat = self.department.pk, self.category.pk
+        queries = [
+            ('count status=In Use',
+             lambda: Asset.objects.filter(status='In Use').count(),
+             lambda: index.count(status='In Use')),
+            ('count department+status',
+             lambda: Asset.objects.filter(department_id=dept, status='Available').count(),
+             lambda: index.count(department=dept, status='Available')),
+            ('ids category',
+             lambda: list(Asset.objects.filter(category_id=cat).values_list('id', flat=True)),
+             lambda: index.filter(category=cat)),
+            ('counts by status',
+             lambda: dict(Asset.objects.order_by().values_list('status').annotate(total=Count('id'))),
+             lambda: index.counts_by('status')),
+        ]
+        self.stdout.write(f'\n{"query":<28}{"ORM ms":>10}{"index ms":>10}{"speed-up":>10}')
+        for label, orm, mem in queries:
+            orm_ms = self._time(orm, repeat)
+            mem_ms = self._time(mem, repeat)
+            self.stdout.write(f'{label:<28}{orm_ms:>10.2f}{mem_ms:>10.3f}{orm_ms / max(mem_ms, 1e-6):>9.0f}x')
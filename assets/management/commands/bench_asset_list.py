@@ -0,0 +1,100 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import Context, Template, engines
+from django.template.loader import get_template
+from django.test import RequestFactory
+
+from assets import presentation
+from assets.models import Asset, AssetCategory, Department
+
+# The per-row markup asset_list.html used before the fast path, kept here
+# only as the baseline for this benchmark.
+LEGACY_ROWS = """{% for asset in assets %}<tr>
+<td class="ps-4 fw-semibold">{{ forloop.counter }}</td>
+<td class="fw-semibold">{{ asset.name }}</td>
+<td><span class="badge bg-info text-dark">{{ asset.category }}</span></td>
+<td>{% if asset.condition == 'Good' %}<span class="badge bg-success">Good</span>{% elif asset.condition == 'Fair' %}<span class="badge bg-warning text-dark">Fair</span>{% elif asset.condition == 'Poor' %}<span class="badge bg-danger">Poor</span>{% else %}<span class="badge bg-secondary">{{ asset.condition }}</span>{% endif %}</td>
+<td>{{ asset.department.name|default:"N/A" }}</td>
+<td>{{ asset.department.location|default:"N/A" }}</td>
+<td>{% if asset.status == 'Available' %}<span class="badge bg-success">Available</span>{% elif asset.status == 'In Use' %}<span class="badge bg-danger">In Use</span>{% elif asset.status == 'Under Maintenance' %}<span class="badge bg-warning text-dark">Maintenance</span>{% else %}<span class="badge bg-secondary">{{ asset.status }}</span>{% endif %}</td>
+<td><div class="d-flex justify-content-center gap-2">
+<a href="{% url 'asset_detail' asset.id %}" class="btn btn-sm btn-outline-primary" title="View Details"><i class="bi bi-eye"></i></a>
+<a href="{% url 'edit_asset' asset.id %}" class="btn btn-sm btn-primary"><i class="bi bi-pencil"></i></a>
+<a href="{% url 'delete_asset' asset.id %}" class="btn btn-sm btn-danger"><i class="bi bi-trash"></i></a>
+{% if asset.status == 'Available' %}<form method="post" action="{% url 'checkout_asset' asset.id %}">{% csrf_token %}<button type="submit" class="btn btn-sm btn-success"><i class="bi bi-arrow-right-circle"></i> Check Out</button></form>
+{% elif asset.status == 'In Use' %}<form method="post" action="{% url 'return_asset' asset.id %}">{% csrf_token %}<button type="submit" class="btn btn-sm btn-warning"><i class="bi bi-arrow-return-left"></i> Return</button></form>{% endif %}
+</div></td></tr>{% endfor %}"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark asset_list row rendering (ms per 1,000 rows), legacy vs fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Synthetic assets to render')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path (best is reported)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._populate(options['rows'])
+            self._benchmark(options['repeat'])
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done (synthetic rows rolled back).'))
+
+    def _populate(self, count):
+        department = Department.objects.create(name='Bench Dept', location='Bench Building')
+        category = AssetCategory.objects.create(name='Bench Category')
+        statuses = [value for value, _ in Asset.STATUS_CHOICES]
+        conditions = ['Excellent', 'Good', 'Fair', 'Poor']
+        Asset.objects.bulk_create(
+            (
+                Asset(
+                    name=f'Bench asset {i}', serial_number=f'BENCH-{i:08d}',
+                    department=department, category=category,
+                    status=statuses[i % len(statuses)], condition=conditions[i % len(conditions)],
+                    purchase_date=date(2020, 1, 1),
+                )
+                for i in range(count)
+            ),
+            batch_size=2000,
+        )
+
+    def _best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            html = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings), len(html)
+
+    def _benchmark(self, repeat):
+        request = RequestFactory().get('/assets/')
+        request.META['CSRF_COOKIE'] = 'x' * 64
+        queryset = Asset.objects.order_by('-date_added')
+        total = queryset.count()
+
+        legacy = Template(LEGACY_ROWS, engine=engines['django'].engine)
+        fast = get_template('assets/_asset_rows.html')
+
+        def legacy_path():
+            assets = list(queryset.select_related('department', 'category'))
+            return legacy.render(Context({'assets': assets, 'csrf_token': 'x' * 64}))
+
+        def fast_path():
+            return fast.render({'rows': presentation.asset_rows(queryset)}, request)
+
+        legacy_assets = list(queryset.select_related('department', 'category'))
+        fast_rows = presentation.asset_rows(queryset)
+        results = [
+            ('legacy: query + render', *self._best(legacy_path, repeat)),
+            ('legacy: render only', *self._best(
+                lambda: legacy.render(Context({'assets': legacy_assets, 'csrf_token': 'x' * 64})), repeat)),
+            ('fast:   query + render', *self._best(fast_path, repeat)),
+            ('fast:   render only', *self._best(lambda: fast.render({'rows': fast_rows}, request), repeat)),
+        ]
+        self.stdout.write(f'Rendering {total:,} rows\n')
+        self.stdout.write(f'{"path":<26}{"ms / 1,000 rows":>16}{"KiB / 1,000 rows":>18}')
+        for label, seconds, size in results:
+            self.stdout.write(f'{label:<26}{seconds * 1000 * 1000 / total:>16.1f}{size / 1024 * 1000 / total:>18.1f}')
@@ -0,0 +1,68 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from assets import dedup
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the duplicate finder (assets/dedup.py) on synthetic records held in memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=1000000, help='Synthetic assets')
+        parser.add_argument('--duplicates', type=int, default=1000, help='Of which re-registered with a typo')
+
+    def handle(self, *args, **options):
+        serials, names, blocks, planted = self._records(options['records'], options['duplicates'])
+        self.stdout.write(f"{len(serials):,} records, {len(planted):,} planted duplicates")
+
+        started = time.perf_counter()
+        clusters = dedup.find_clusters(serials, names, blocks)
+        elapsed = time.perf_counter() - started
+
+        # A dropped digit can match several consecutive tags equally well, so
+        # a planted pair counts as found when it lands in one cluster
+        cluster_of = {position: n for n, (positions, _, _) in enumerate(clusters) for position in positions}
+        found = sum(1 for a, b in planted if a in cluster_of and cluster_of.get(a) == cluster_of.get(b))
+        flagged = len(cluster_of)
+        self.stdout.write(f"{'clusters':<10} {len(clusters):>9,}")
+        self.stdout.write(f"{'recall':<10} {found / max(len(planted), 1):>9.1%}")
+        self.stdout.write(f"{'flagged':<10} {flagged:>9,}")
+        self.stdout.write(f"{'seconds':<10} {elapsed:>9.2f}")
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def _records(self, count, duplicates):
+        # Batches of consecutive tags under a few prefixes, as a register
+        # filled from purchase orders looks; then re-register some of them
+        # with one character changed, dropped or doubled
+        rng = random.Random(0)
+        prefixes = [''.join(rng.choices(string.ascii_uppercase, k=3)) for _ in range(200)]
+        models = [f'{rng.choice(["Dell", "HP", "Lenovo", "Epson"])} {rng.choice(["Laptop", "Monitor", "Printer"])} '
+                  f'{rng.randint(100, 9999)}' for _ in range(500)]
+        serials, names, blocks = [], [], []
+        while len(serials) < count:
+            prefix, model, block = rng.choice(prefixes), rng.choice(models), rng.randrange(20000)
+            first = rng.randrange(10 ** 7)
+            for n in range(min(rng.randint(1, 200), count - len(serials))):
+                serials.append(f'{prefix}{first + n:07d}')
+                names.append(model)
+                blocks.append(block)
+
+        planted = []
+        for original in rng.sample(range(count), min(duplicates, count)):
+            serial = serials[original]
+            at = rng.randrange(len(serial))
+            edit = rng.choice(('change', 'drop', 'double'))
+            if edit == 'change':
+                serial = serial[:at] + rng.choice(string.ascii_uppercase) + serial[at + 1:]
+            elif edit == 'drop':
+                serial = serial[:at] + serial[at + 1:]
+            else:
+                serial = serial[:at] + serial[at] + serial[at:]
+            planted.append((original, len(serials)))
+            serials.append(serial)
+            names.append(names[original])
+            blocks.append(blocks[original])
+        return serials, names, blocks, planted
@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+DEFAULT_PATHS = ['/dashboard/', '/assets/', '/movements/', '/reports/']
+NO_CACHE = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+LOCAL_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-fragments'}
+
+
+class Command(BaseCommand):
+    help = 'Per-request time and queries with template fragment caching off vs warm (assets/fragments.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help=f'Page to request (repeatable; default {DEFAULT_PATHS})')
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per path and mode')
+        parser.add_argument('--username', default=None, help='User the pages are fetched as (default: first superuser)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to fetch the pages as; pass --username.')
+
+        self.stdout.write(f"{'path':<16} {'uncached ms':>12} {'cached ms':>10} {'saved ms':>9} {'queries':>9}")
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        for path in options['paths'] or DEFAULT_PATHS:
+            runs = {}
+            for mode, cache in (('uncached', NO_CACHE), ('cached', LOCAL_CACHE)):
+                # Only the fragment cache changes; other aliases ('local') stay as configured.
+                # No rate limits, or the measured requests would soon be answered 429.
+                caches = {**settings.CACHES, 'default': cache}
+                with override_settings(CACHES=caches, ALLOWED_HOSTS=hosts, RATE_LIMITS={}):
+                    runs[mode] = self._measure(user, path, options['requests'])
+            uncached, cached = runs['uncached'], runs['cached']
+            self.stdout.write(
+                f"{path:<16} {uncached[0]:>12.2f} {cached[0]:>10.2f} {uncached[0] - cached[0]:>9.2f} "
+                f"{f'{uncached[1]}->{cached[1]}':>9}"
+            )
+
+    def _measure(self, user, path, total):
+        """``(median ms, queries per request)``; the first request warms the cache."""
+        client = Client()
+        client.force_login(user)
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path} answered {response.status_code}')
+
+        timings = []
+        for _ in range(max(1, total)):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                client.get(path)
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(queries)
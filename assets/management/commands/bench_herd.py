@@ -0,0 +1,118 @@
+import io
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.backends.signals import connection_created
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from assets import singleflight
+from assets.models import DepartmentAccess
+
+
+class QueryCounter:
+    """Counts queries on every connection opened while installed, across threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = ('Open the dashboard and reports as many users at the same moment and count the database '
+            'queries, with and without request coalescing (assets/singleflight.py). Runs against a '
+            'throwaway test database filled by seed_data, never the real one')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='Users arriving at once')
+        parser.add_argument('--rounds', type=int, default=3, help='Herds per page and mode')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Page to open (repeatable); default /dashboard/ and /reports/')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/dashboard/', '/reports/']
+        with tempfile.TemporaryDirectory() as workdir:
+            if connection.vendor == 'sqlite':
+                # A file, not the in-memory default: the herd's threads each open a connection
+                connection.settings_dict['TEST']['NAME'] = str(Path(workdir) / 'bench_herd.sqlite3')
+            databases = setup_databases(
+                verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set(),
+            )
+            try:
+                call_command('seed_data', stdout=io.StringIO())
+                with override_settings(ALLOWED_HOSTS=['testserver']):
+                    failed = self._run(paths, options['clients'], options['rounds'])
+            finally:
+                teardown_databases(databases, verbosity=0)
+        # CI runs this against each database backend; a failed page fails the build
+        if failed:
+            raise CommandError(f'{failed} requests did not return 200.')
+        self.stdout.write(self.style.SUCCESS('Done (test database dropped).'))
+
+    def _run(self, paths, clients, rounds):
+        # Every simulated user is a separate account, so each has its own rate-limit bucket
+        User.objects.bulk_create(User(username=f'bench-herd-{n}') for n in range(clients))
+        users = list(User.objects.filter(username__startswith='bench-herd-'))
+        DepartmentAccess.objects.bulk_create(DepartmentAccess(user=user, department=None) for user in users)
+        counter = QueryCounter()
+        connection_created.connect(counter.install)
+        failed = 0
+        try:
+            self.stdout.write(f"{'page':<14} {'coalescing':<11} {'requests':>8} {'queries':>8} "
+                              f"{'per req':>8} {'shared':>7} {'slowest':>9}")
+            for path in paths:
+                for enabled in (False, True):
+                    singleflight.group.enabled = enabled
+                    for _ in range(rounds):
+                        failed += self._herd(path, enabled, users, counter)
+        finally:
+            singleflight.group.enabled = True
+            connection_created.disconnect(counter.install)
+        return failed
+
+    def _herd(self, path, enabled, users, counter):
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        start = threading.Barrier(len(clients) + 1)
+        statuses, latencies = [], []
+
+        def visit(client):
+            start.wait()
+            began = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - began)
+            statuses.append(response.status_code)
+            connection.close()
+
+        threads = [threading.Thread(target=visit, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        counter.count, singleflight.group.shared = 0, 0
+        start.wait()
+        for thread in threads:
+            thread.join()
+
+        failed = sum(1 for status in statuses if status != 200)
+        self.stdout.write(
+            f"{path:<14} {'on' if enabled else 'off':<11} {len(statuses):>8} {counter.count:>8} "
+            f"{counter.count / len(statuses):>8.1f} {singleflight.group.shared:>7} {max(latencies):>8.3f}s"
+            + (self.style.ERROR(f'  {failed} failed') if failed else '')
+        )
+        return failed
@@ -0,0 +1,84 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from assets import utilization
+from assets.models import Asset, AssetCategory, CheckoutSession, Department
+
+
+class Command(BaseCommand):
+    help = 'Benchmark utilization reports (assets/utilization.py) over synthetic checkout sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assets', type=int, default=2000, help='Synthetic assets')
+        parser.add_argument('--sessions', type=int, default=500000, help='Synthetic checkout sessions over the last year')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per report (best is reported)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._populate(options['assets'], options['sessions'])
+            self.stdout.write(f"Inserted {options['sessions']:,} sessions in {time.perf_counter() - started:.1f} s")
+            self._benchmark(options['repeat'])
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done (synthetic rows rolled back).'))
+
+    def _populate(self, asset_count, session_count):
+        departments = [Department.objects.create(name=f'Bench Dept {i}') for i in range(10)]
+        categories = [AssetCategory.objects.create(name=f'Bench Category {i}') for i in range(10)]
+        Asset.objects.bulk_create(
+            (
+                Asset(
+                    name=f'Bench asset {i}', serial_number=f'BENCH-{i:08d}',
+                    department=departments[i % len(departments)], category=categories[i % len(categories)],
+                    purchase_date=date(2020, 1, 1),
+                )
+                for i in range(asset_count)
+            ),
+            batch_size=2000,
+        )
+        asset_ids = list(Asset.objects.filter(serial_number__startswith='BENCH-').values_list('id', flat=True))
+        # date_added is auto_now_add; backdate so the assets exist for the whole year
+        Asset.objects.filter(id__in=asset_ids).update(date_added=timezone.now() - timedelta(days=400))
+
+        # Each asset's sessions spread over the last year: one per slot,
+        # starting at a random point in it and lasting 1-8 hours
+        rng = random.Random(0)
+        year_ago = timezone.now() - timedelta(days=365)
+        per_asset = max(1, session_count // len(asset_ids))
+        slot = timedelta(days=365) / per_asset
+
+        def sessions():
+            for asset_id in asset_ids:
+                for i in range(per_asset):
+                    started = year_ago + slot * i + slot * rng.random() / 2
+                    length = min(timedelta(minutes=rng.randint(60, 480)), slot / 2)
+                    yield CheckoutSession(
+                        asset_id=asset_id, started_at=started, ended_at=started + length,
+                        seconds=round(length.total_seconds()),
+                    )
+
+        CheckoutSession.objects.bulk_create(sessions(), batch_size=5000)
+
+    def _best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000, result
+
+    def _benchmark(self, repeat):
+        now = timezone.now()
+        self.stdout.write(f"{'report':<12} {'window':>8} {'sessions':>10} {'groups':>7} {'ms':>9}")
+        for days in (30, 365):
+            start = now - timedelta(days=days)
+            for group_by in utilization.GROUPS:
+                ms, report = self._best(lambda: utilization.utilization_report(group_by, start, now), repeat)
+                self.stdout.write(
+                    f"{group_by:<12} {f'{days}d':>8} {report['sessions']:>10,} {len(report['groups']):>7} {ms:>9.1f}"
+                )
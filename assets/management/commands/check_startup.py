@@ -0,0 +1,75 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# "import time:  self [us] | cumulative | imported package", nesting shown by indentation
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def parse_importtime(output):
+    """``(total_us, {module: cumulative_us})`` from ``-X importtime`` output."""
+    total, modules = 0, {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match[2]), match[3], match[4]
+        modules[module] = cumulative
+        if not indent:
+            total += cumulative
+    return total, modules
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start import time of a management command (-X importtime) and fail over budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--command', default='export_changes', help='Command whose startup is measured')
+        parser.add_argument('--settings-module', default=os.environ.get('DJANGO_SETTINGS_MODULE'))
+        parser.add_argument('--budget-ms', type=float, default=300.0, help='Allowed import time')
+        parser.add_argument('--forbid', action='append', default=[], help="Module that must not be imported, e.g. numpy")
+        parser.add_argument('--runs', type=int, default=3, help='Cold starts to measure (the fastest counts)')
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        # '--help' sets Django up and loads the command without running it
+        argv = [sys.executable, '-X', 'importtime', str(settings.BASE_DIR / 'manage.py'), options['command'], '--help']
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': options['settings_module']}
+
+        best = None
+        for _ in range(max(1, options['runs'])):
+            started = time.perf_counter()
+            process = subprocess.run(argv, env=env, capture_output=True, text=True)
+            wall = (time.perf_counter() - started) * 1000
+            if process.returncode:
+                raise CommandError(f"'{options['command']}' failed to start:\n{process.stderr[-2000:]}")
+            total, modules = parse_importtime(process.stderr)
+            if best is None or total < best[0]:
+                best = (total, modules, wall)
+        total, modules, wall = best
+        total_ms = total / 1000
+
+        self.stdout.write(f"{options['command']} with {options['settings_module']}:")
+        self.stdout.write(f"  imports {total_ms:.1f} ms ({len(modules)} modules), process {wall:.1f} ms")
+        top_level = sorted(
+            ((module, cumulative) for module, cumulative in modules.items() if '.' not in module),
+            key=lambda item: item[1], reverse=True,
+        )
+        for module, cumulative in top_level[:options['top']]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+        problems = []
+        if total_ms > options['budget_ms']:
+            problems.append(f"import time {total_ms:.1f} ms is over the {options['budget_ms']:.0f} ms budget")
+        for forbidden in options['forbid']:
+            # The package line can be missing from the output, so match submodules too
+            if any(module == forbidden or module.startswith(forbidden + '.') for module in modules):
+                problems.append(f"'{forbidden}' is imported at startup")
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Startup within budget.'))
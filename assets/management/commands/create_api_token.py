@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = 'Issue a token for the JSON API (/api/v1/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--name', default='api', help="What the token is for, e.g. 'helpdesk'")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        token, key = ApiToken.issue(user, options['name'])
+        self.stdout.write(self.style.SUCCESS(f'Created token "{token.name}" for {user.username}.'))
+        self.stdout.write('Key (shown only once):')
+        self.stdout.write(key)
+        self.stdout.write('Use it as:  Authorization: Token <key>')
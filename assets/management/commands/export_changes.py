@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from assets import changefeed
+
+
+class Command(BaseCommand):
+    help = 'Write changes after a cursor as JSON lines (one change per line)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, default=0, help='Cursor from the previous run (0 = everything)')
+        parser.add_argument('--batch-size', type=int, default=changefeed.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=0, help='Stop after this many batches (0 = no limit)')
+
+    def handle(self, *args, **options):
+        if options['since'] < 0:
+            raise CommandError('--since cannot be negative.')
+        batch_size = max(1, min(options['batch_size'], changefeed.MAX_BATCH_SIZE))
+
+        cursor, total, batches = options['since'], 0, 0
+        while True:
+            changes, cursor, has_more = changefeed.changes_since(cursor, batch_size)
+            for change in changes:
+                self.stdout.write(json.dumps(change, cls=DjangoJSONEncoder))
+            total += len(changes)
+            batches += 1
+            if not has_more or (options['max_batches'] and batches >= options['max_batches']):
+                break
+
+        # stderr so stdout stays a clean JSON-lines stream
+        self.stderr.write(f'{total} change(s); next cursor: {cursor}')
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assets import dedup
+from assets.models import Asset
+
+
+class Command(BaseCommand):
+    help = 'List assets that look registered more than once (same or nearly the same serial number)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-score', type=float, default=dedup.SERIAL_THRESHOLD,
+                            help='Serial similarity a near match needs (0-1)')
+        parser.add_argument('--limit', type=int, default=100, help='Clusters to show, best first (0 = all)')
+        parser.add_argument('--json', action='store_true', help='One JSON object per cluster instead of a table')
+
+    def handle(self, *args, **options):
+        if not 0 < options['min_score'] <= 1:
+            raise CommandError('--min-score must be above 0 and at most 1.')
+        clusters = dedup.duplicate_assets(min_score=options['min_score'])
+        total = len(clusters)
+        if options['limit'] > 0:
+            clusters = clusters[:options['limit']]
+        assets = Asset.objects.select_related('department').in_bulk(
+            [pk for asset_ids, _, _ in clusters for pk in asset_ids]
+        )
+
+        for asset_ids, score, reasons in clusters:
+            members = [assets[pk] for pk in asset_ids]
+            if options['json']:
+                self.stdout.write(json.dumps({
+                    'score': score,
+                    'reasons': reasons,
+                    'assets': [
+                        {'id': asset.pk, 'serial_number': asset.serial_number, 'name': asset.name,
+                         'department': asset.department.name if asset.department else None}
+                        for asset in members
+                    ],
+                }))
+                continue
+            self.stdout.write(f"{score:.3f}  {', '.join(reasons)}")
+            for asset in members:
+                self.stdout.write(f"    #{asset.pk:<8} {asset.serial_number:<24} {asset.name}")
+
+        # stderr so --json output stays a clean JSON-lines stream
+        self.stderr.write(f'{total} cluster(s) found, {len(clusters)} shown.')
@@ -0,0 +1,148 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/dashboard/', '/reports/', '/movements/rows/?limit=50', '/maintenance/rows/?limit=50']
+
+
+class Target:
+    """One running server, e.g. ``asgi=http://127.0.0.1:8001``."""
+
+    def __init__(self, spec):
+        name, sep, url = spec.partition('=')
+        if not sep:
+            name, url = spec, spec
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise CommandError(f"Bad target '{spec}', expected name=http://host:port")
+        self.name = name
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.netloc = parts.netloc
+        self.cookies = {}
+
+    def connect(self):
+        connection_class = HTTPSConnection if self.scheme == 'https' else HTTPConnection
+        return connection_class(self.host, self.port, timeout=30)
+
+    def request(self, connection, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={value}' for key, value in self.cookies.items())
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for key, morsel in SimpleCookie(header).items():
+                self.cookies[key] = morsel.value
+        return response.status
+
+    def login(self, username, password):
+        connection = self.connect()
+        try:
+            self.request(connection, 'GET', '/')
+            if 'csrftoken' not in self.cookies:
+                raise CommandError(f"{self.name}: no CSRF cookie from the login page")
+            body = urlencode({
+                'csrfmiddlewaretoken': self.cookies['csrftoken'],
+                'username': username,
+                'password': password,
+            })
+            self.request(connection, 'POST', '/', body=body, headers={
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Referer': f'{self.scheme}://{self.netloc}/',
+            })
+        finally:
+            connection.close()
+        if 'sessionid' not in self.cookies:
+            raise CommandError(f"{self.name}: login as '{username}' failed")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[position]
+
+
+class Command(BaseCommand):
+    help = 'Load-test running servers (e.g. uvicorn vs a WSGI server): requests/s and tail latency per path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+', help='name=URL of each running server, e.g. asgi=http://127.0.0.1:8001')
+        parser.add_argument('--path', action='append', dest='paths', help=f'Path to request (repeatable; default {DEFAULT_PATHS})')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path and target')
+        parser.add_argument('--concurrency', type=int, default=20, help='Simultaneous clients')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per path first')
+        parser.add_argument('--username', default='admin')
+        parser.add_argument('--password', default='admin123')
+
+    def handle(self, *args, **options):
+        targets = [Target(spec) for spec in options['targets']]
+        paths = options['paths'] or DEFAULT_PATHS
+        for target in targets:
+            target.login(options['username'], options['password'])
+
+        self.stdout.write(
+            f"{'target':<10} {'path':<32} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}"
+        )
+        for path in paths:
+            for target in targets:
+                self._run(target, path, options['warmup'], options['concurrency'])
+                result = self._run(target, path, options['requests'], options['concurrency'])
+                self.stdout.write(
+                    f"{target.name:<10} {path[:32]:<32} {result['rps']:>9.1f} {result['p50']:>8.1f} "
+                    f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['max']:>8.1f} {result['errors']:>7}"
+                )
+
+    def _run(self, target, path, total, concurrency):
+        remaining = iter(range(total))
+        lock = threading.Lock()
+        latencies, errors = [], []
+
+        def client():
+            connection = target.connect()
+            own, failed = [], 0
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            break
+                    started = time.perf_counter()
+                    try:
+                        status = target.request(connection, 'GET', path)
+                    except OSError:
+                        connection.close()
+                        connection = target.connect()
+                        status = None
+                    own.append((time.perf_counter() - started) * 1000)
+                    if status != 200:
+                        failed += 1
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(own)
+                errors.append(failed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(client) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': statistics.median(latencies) if latencies else 0.0,
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else 0.0,
+            'errors': sum(errors),
+        }
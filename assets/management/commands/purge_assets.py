@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assets import purge
+
+
+class Command(BaseCommand):
+    help = ('Permanently remove assets deleted more than ASSET_PURGE_AFTER_DAYS ago, with their history, '
+            'in short transactions (run it nightly from cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Purge assets deleted longer ago than this (default ASSET_PURGE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=purge.DEFAULT_BATCH_SIZE,
+                            help='Assets removed per round')
+        parser.add_argument('--chunk-size', type=int, default=purge.DEFAULT_CHUNK_SIZE,
+                            help='Dependent rows deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to wait between transactions, so other writers get the lock')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the assets due')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days cannot be negative.')
+        if options['batch_size'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--batch-size and --chunk-size must be at least 1.')
+        before = purge.horizon(options['days'])
+
+        if options['dry_run']:
+            self.stdout.write(f"{purge.due(before).count()} deleted assets would be purged.")
+            return
+        assets, dependents = purge.purge(
+            before, batch_size=options['batch_size'], chunk_size=options['chunk_size'], pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {assets} assets and {dependents} related records (deleted before {before:%Y-%m-%d %H:%M})."
+        ))
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from assets.models import Department, AssetCategory, Asset, AssetMovement, MaintenanceRecord
+from assets.models import Department, DepartmentAccess, AssetCategory, Asset, AssetMovement, MaintenanceRecord
 from datetime import datetime, timedelta
 from django.utils import timezone
 
@@ -78,6 +78,15 @@ class Command(BaseCommand):
         }
         self.stdout.write(self.style.SUCCESS(f'Created {len(departments)} departments'))
 
+        # Department access: ICT support sees everything, the rest their own unit
+        DepartmentAccess.objects.bulk_create([
+            DepartmentAccess(user=users['john_kamau'], department=departments['cs']),
+            DepartmentAccess(user=users['grace_wanjiru'], department=departments['it']),
+            DepartmentAccess(user=users['peter_mwangi'], department=departments['business']),
+            DepartmentAccess(user=users['mary_njeri'], department=departments['admin']),
+            DepartmentAccess(user=users['david_ochieng'], department=None),
+        ])
+
         # Create Asset Categories
         self.stdout.write('Creating asset categories...')
         categories = {
@@ -0,0 +1,140 @@
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+DEFAULT_PATHS = ['/dashboard/', '/assets/', '/movements/', '/reports/']
+# What a current browser sends; the served size is the variant it would get
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CANDIDATE = re.compile(r'^\s*(\S+)(?:\s+(\d+)w)?\s*$')
+PIXELS = re.compile(r'^\s*(\d+)px\s*$')
+
+
+class StaticReferences(HTMLParser):
+    """Collects the local static files a page makes the browser download."""
+
+    def __init__(self, static_url, viewport):
+        super().__init__()
+        self.static_url = static_url
+        self.viewport = viewport
+        self.urls = []
+        self._picture_source = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and 'stylesheet' in (attrs.get('rel') or '').split():
+            self._add(attrs.get('href'))
+        elif tag == 'script':
+            self._add(attrs.get('src'))
+        elif tag == 'source' and attrs.get('srcset') and self._picture_source is None:
+            # The first <source> of a <picture> wins in any browser that supports it
+            self._picture_source = self._pick(attrs['srcset'], attrs.get('sizes'))
+        elif tag == 'img':
+            chosen = self._picture_source
+            if chosen is None and attrs.get('srcset'):
+                chosen = self._pick(attrs['srcset'], attrs.get('sizes'))
+            self._add(chosen or attrs.get('src'))
+            self._picture_source = None
+
+    def handle_endtag(self, tag):
+        if tag == 'picture':
+            self._picture_source = None
+
+    def _pick(self, srcset, sizes):
+        """The candidate a 1x display needs for the slot given by ``sizes``."""
+        match = PIXELS.match(sizes or '')
+        slot = int(match[1]) if match else self.viewport
+        candidates = []
+        for entry in srcset.split(','):
+            parsed = CANDIDATE.match(entry)
+            if parsed:
+                candidates.append((int(parsed[2] or 0), parsed[1]))
+        if not candidates:
+            return None
+        wide_enough = sorted(c for c in candidates if c[0] >= slot)
+        return (wide_enough[0] if wide_enough else max(candidates))[1]
+
+    def _add(self, url):
+        if url and url.startswith(self.static_url) and url not in self.urls:
+            self.urls.append(url)
+
+
+class Command(BaseCommand):
+    help = 'Bytes a browser downloads per page: the HTML plus the local CSS, JS and images it references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help=f'Page to fetch (repeatable; default {DEFAULT_PATHS})')
+        parser.add_argument('--template', action='append', default=[], help='Also render this template directly (pages with no URL)')
+        parser.add_argument('--username', default=None, help='User the pages are fetched as (default: first superuser)')
+        parser.add_argument('--viewport', type=int, default=1280, help='Width used to pick srcset candidates without a px "sizes"')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to fetch the pages as; pass --username.')
+
+        # The login page is only shown to anonymous visitors
+        pages = [self._fetch(Client(HTTP_HOST='localhost'), reverse('login'))]
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        for path in options['paths'] or DEFAULT_PATHS:
+            pages.append(self._fetch(client, path))
+        for name in options['template']:
+            request = RequestFactory(HTTP_HOST='localhost').get('/')
+            request.user = user
+            pages.append((name, render_to_string(name, request=request).encode()))
+
+        self.stdout.write(f"{'page':<28} {'html':>9} {'files':>6} {'static':>11} {'served':>11} {'total':>11}")
+        grand_raw = grand_served = 0
+        for page, html in pages:
+            parser = StaticReferences(settings.STATIC_URL, options['viewport'])
+            parser.feed(html.decode('utf-8', 'replace'))
+            raw = served = 0
+            for url in parser.urls:
+                file_raw, file_served, encoding = self._sizes(url)
+                raw += file_raw
+                served += file_served
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"    {url:<70} {file_raw:>10} {file_served:>10} {encoding}")
+            grand_raw += len(html) + raw
+            grand_served += len(html) + served
+            self.stdout.write(
+                f"{page[:28]:<28} {len(html):>9} {len(parser.urls):>6} {raw:>11} {served:>11} {len(html) + served:>11}"
+            )
+        self.stdout.write(f'Uncompressed {grand_raw} bytes; transferred {grand_served} bytes.')
+
+    def _fetch(self, client, path):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path} answered {response.status_code}')
+        return path, response.content
+
+    def _sizes(self, url):
+        """``(raw bytes, served bytes, encoding)`` for one static URL."""
+        name = url[len(settings.STATIC_URL):].split('?')[0]
+        path = None
+        if settings.STATIC_ROOT and (Path(settings.STATIC_ROOT) / name).is_file():
+            path = Path(settings.STATIC_ROOT) / name
+        else:
+            found = finders.find(name)
+            path = Path(found) if found else None
+        if path is None:
+            self.stderr.write(f'Missing static file: {url}')
+            return 0, 0, 'missing'
+        raw = path.stat().st_size
+        for encoding, suffix in ENCODINGS:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                return raw, variant.stat().st_size, encoding
+        return raw, raw, 'identity'
@@ -0,0 +1,308 @@
+"""
+In-process metrics, exposed at ``/metrics`` in the Prometheus text format.
+
+Counters and histograms are plain dicts of numbers behind a lock, so
+recording one costs a dict lookup and an addition; nothing touches the
+database or the cache. A scrape renders the current values without a query,
+so Prometheus can scrape every few seconds.
+
+What is recorded:
+
+* every request to a view of this app (``MetricsMiddleware``): count by
+  view, method and status, duration, and the number and time of its
+  database queries;
+* every database query, through an execute wrapper added to each new
+  connection (``connection_created``). The request it belongs to is found
+  through a context variable, which follows async views into the threads
+  their queries run in;
+* cache hits and misses (dashboard fragments, per-session departments),
+  coalesced computations and rate-limited requests, from their modules;
+* checkouts, returns, movements and maintenance records, from signals.py
+  and the bulk paths that skip signals.
+
+Like the asset index and the live-update broker, the numbers belong to one
+process; with several workers, scrape each one (they are summed by
+Prometheus queries, not here).
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'campus_'
+
+# Seconds; a page is fast under 0.1, a query under 0.005
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = dict(self._values)
+        lines.extend(self._samples(values))
+        return lines
+
+    def _samples(self, values):
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.label_names, key)} {_number(value)}'
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    """A value that goes up and down with ``inc()``, or is read from ``function()`` when scraped."""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), function=None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def render(self):
+        if self.function is None:
+            return super().render()
+        value = self.function()
+        if value is None:
+            return []
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge', f'{self.name} {_number(value)}']
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket (not cumulative), +Inf, then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[slot] += 1
+            counts[-1] += value
+
+    def _samples(self, values):
+        for key, counts in sorted(values.items()):
+            total = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                total += count
+                labels = _labels(self.label_names, key, [('le', _number(bound))])
+                yield f'{self.name}_bucket{labels} {total}'
+            labels = _labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {_number(counts[-1])}'
+            yield f'{self.name}_count{labels} {total}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def scrape(request):
+    """
+    The ``/metrics`` view. With ``settings.METRICS_TOKEN`` set it needs
+    ``Authorization: Bearer <token>``; without, only local addresses
+    (loopback and ``INTERNAL_IPS``) may scrape.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+        allowed = scheme.lower() == 'bearer' and constant_time_compare(key.strip(), token)
+    else:
+        allowed = request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1', *settings.INTERNAL_IPS)
+    if not allowed:
+        return HttpResponse(status=403)
+    if request.method != 'GET':
+        return HttpResponse(status=405)
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+# -------------------------------
+# Metrics
+# -------------------------------
+REQUESTS = Counter('http_requests_total', 'Requests handled, by view, method and status.',
+                   ('view', 'method', 'status'))
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Time to build the response, by view.', ('view',))
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests being handled right now.')
+REQUEST_QUERIES = Counter('db_request_queries_total', 'Database queries made by requests, by view.', ('view',))
+REQUEST_QUERY_SECONDS = Counter('db_request_query_seconds_total', 'Time in database queries, by view.', ('view',))
+QUERY_DURATION = Histogram('db_query_duration_seconds', 'Duration of every database query.',
+                           buckets=QUERY_BUCKETS)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups, by cache and hit or miss.', ('cache', 'result'))
+COALESCED = Counter('coalesced_requests_total',
+                    'Expensive computations run (leader) or shared with one in flight (shared).', ('result',))
+RATE_LIMITED = Counter('rate_limited_requests_total', 'Requests refused with 429, by limit.', ('limit',))
+BUSINESS_EVENTS = Counter('business_events_total', 'Checkouts, returns, movements and maintenance records.',
+                          ('event',))
+
+_started = time.time()
+Gauge('process_start_time_seconds', 'When this process started (Unix time).', function=lambda: _started)
+
+
+def _live_subscribers():
+    from . import events
+    return len(events.broker)
+
+
+def _index_rows():
+    from . import asset_index
+    index = asset_index.live_index()
+    return None if index is None else len(index)
+
+
+Gauge('live_update_subscribers', 'Pages connected to the live update stream.', function=_live_subscribers)
+Gauge('asset_index_rows', 'Assets in the in-memory index, when it is warm.', function=_index_rows)
+
+
+def business_event(event, count=1):
+    BUSINESS_EVENTS.inc(count, event=event)
+
+
+# -------------------------------
+# Requests and queries
+# -------------------------------
+class _RequestStats:
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+
+def _timed_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        QUERY_DURATION.observe(elapsed)
+        stats = _current.get()
+        if stats is not None:
+            # One request's queries run one at a time, even from async views
+            stats.queries += 1
+            stats.seconds += elapsed
+
+
+def _instrument(sender, connection, **kwargs):
+    # Sent on every (re)connect of the same wrapper object; add it once
+    if _timed_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_query)
+
+
+connection_created.connect(_instrument)
+
+
+def _view_name(request):
+    match = request.resolver_match
+    # Only this app's views; admin and static files are left out
+    if match is None or not match.func.__module__.startswith('assets.'):
+        return None
+    return match.view_name
+
+
+class MetricsMiddleware:
+    """Counts and times requests to this app's views. Put it first in MIDDLEWARE."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self._start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, stats, token, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self._start()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, stats, token, started)
+
+    def _start(self):
+        IN_FLIGHT.inc()
+        stats = _RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def _finish(self, request, response, stats, token, started):
+        # Streaming responses are timed to their first byte
+        elapsed = time.perf_counter() - started
+        _current.reset(token)
+        IN_FLIGHT.inc(-1)
+        view = _view_name(request)
+        if view is None:
+            return
+        status = response.status_code if response is not None else 500
+        REQUESTS.inc(view=view, method=request.method, status=status)
+        REQUEST_DURATION.observe(elapsed, view=view)
+        if stats.queries:
+            REQUEST_QUERIES.inc(stats.queries, view=view)
+            REQUEST_QUERY_SECONDS.inc(stats.seconds, view=view)
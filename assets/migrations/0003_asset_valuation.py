@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_asset_current_user_asset_expected_return_time_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='depreciation_method',
+            field=models.CharField(blank=True, choices=[('straight_line', 'Straight Line'), ('declining_balance', 'Double Declining Balance'), ('none', 'No Depreciation')], help_text='Leave blank to use the category default.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='purchase_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='salvage_value',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Leave blank to use the category salvage percentage.', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='useful_life_years',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Leave blank to use the category default.', null=True),
+        ),
+        migrations.AddField(
+            model_name='assetcategory',
+            name='default_depreciation_method',
+            field=models.CharField(choices=[('straight_line', 'Straight Line'), ('declining_balance', 'Double Declining Balance'), ('none', 'No Depreciation')], default='straight_line', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='assetcategory',
+            name='default_salvage_percent',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='assetcategory',
+            name='default_useful_life_years',
+            field=models.PositiveSmallIntegerField(default=5),
+        ),
+    ]
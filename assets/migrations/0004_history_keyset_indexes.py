@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0003_asset_valuation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assetmovement',
+            index=models.Index(fields=['-date_moved', '-id'], name='movement_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['-maintenance_date', '-id'], name='maintenance_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def stamp_existing_rows(apps, schema_editor):
+    # Number existing rows in id order, so a consumer starting at since=0
+    # pages through the whole inventory once.
+    offset = 0
+    for model_name in ('Asset', 'AssetMovement', 'MaintenanceRecord'):
+        model = apps.get_model('assets', model_name)
+        model.objects.update(change_seq=models.F('id') + offset)
+        offset += model.objects.aggregate(last=models.Max('id'))['last'] or 0
+    apps.get_model('assets', 'ChangeSequence').objects.create(pk=1, value=offset)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0006_api_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChangeTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(db_index=True)),
+                ('object_type', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='assetmovement',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(stamp_existing_rows, migrations.RunPython.noop),
+    ]
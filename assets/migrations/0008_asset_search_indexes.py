@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:58
+
+import assets.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0007_change_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['-date_added', '-id'], name='asset_recent_idx'),
+        ),
+        # Case-insensitive prefix / exact search (admin '^name', '=serial_number')
+        migrations.AddIndex(
+            model_name='asset',
+            index=assets.models.CaseInsensitiveIndex(field='name', name='asset_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=assets.models.CaseInsensitiveIndex(field='serial_number', name='asset_serial_nocase_idx'),
+        ),
+    ]
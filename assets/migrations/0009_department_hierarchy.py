@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def root_existing_departments(apps, schema_editor):
+    # Every existing department starts as a top-level unit
+    Department = apps.get_model('assets', 'Department')
+    for pk in Department.objects.values_list('pk', flat=True):
+        Department.objects.filter(pk=pk).update(path=f'{pk:08d}')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0008_asset_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Faculty or department this unit belongs to', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='assets.department'),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(root_existing_departments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0010_checkout_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('grid_cell', models.BigIntegerField(blank=True, db_index=True, editable=False, null=True)),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Campuses',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Building',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('grid_cell', models.BigIntegerField(blank=True, db_index=True, editable=False, null=True)),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.CharField(blank=True, help_text="Short code shown with room numbers, e.g. 'SCI'", max_length=20)),
+                ('campus', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='buildings', to='assets.campus')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('grid_cell', models.BigIntegerField(blank=True, db_index=True, editable=False, null=True)),
+                ('name', models.CharField(help_text='Room number or name', max_length=50)),
+                ('floor', models.SmallIntegerField(blank=True, null=True)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='rooms', to='assets.building')),
+            ],
+            options={
+                'ordering': ['building__name', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assets', to='assets.room'),
+        ),
+        migrations.AddField(
+            model_name='assetmovement',
+            name='from_room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moved_from', to='assets.room'),
+        ),
+        migrations.AddField(
+            model_name='assetmovement',
+            name='to_room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moved_to', to='assets.room'),
+        ),
+        migrations.AddConstraint(
+            model_name='building',
+            constraint=models.UniqueConstraint(fields=('campus', 'name'), name='building_unique_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='room',
+            constraint=models.UniqueConstraint(fields=('building', 'name'), name='room_unique_name'),
+        ),
+    ]
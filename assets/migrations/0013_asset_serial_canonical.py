@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:21
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Frozen copy of assets.models.canonical_serial as of this migration
+_SERIAL_NOISE = re.compile(r'[\s\-_./\\:#]+')
+
+
+def canonical_serial(serial):
+    return _SERIAL_NOISE.sub('', unicodedata.normalize('NFKC', serial or '')).upper() or None
+
+
+def fill_serial_canonical(apps, schema_editor):
+    # Oldest asset wins; later ones with the same canonical serial stay NULL
+    # for find_duplicates to report
+    Asset = apps.get_model('assets', 'Asset')
+    taken, last = set(), 0
+    while True:
+        # Keyset batches: no cursor stays open across the UPDATEs
+        assets = list(Asset.objects.filter(pk__gt=last).order_by('pk').only('pk', 'serial_number')[:2000])
+        if not assets:
+            break
+        last = assets[-1].pk
+        batch = []
+        for asset in assets:
+            canonical = canonical_serial(asset.serial_number)
+            if canonical is not None and canonical not in taken:
+                taken.add(canonical)
+                asset.serial_canonical = canonical
+                batch.append(asset)
+        Asset.objects.bulk_update(batch, ['serial_canonical'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0012_stocktake'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='serial_canonical',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(fill_serial_canonical, migrations.RunPython.noop),
+    ]
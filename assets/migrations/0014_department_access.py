@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def grant_existing_users(apps, schema_editor):
+    # Everyone could see every department before; keep it that way for
+    # existing accounts and narrow them in the admin
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    DepartmentAccess = apps.get_model('assets', 'DepartmentAccess')
+    DepartmentAccess.objects.bulk_create(
+        DepartmentAccess(user_id=pk, department=None)
+        for pk in User.objects.filter(is_superuser=False).values_list('pk', flat=True)
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0013_asset_serial_canonical'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granted_at', models.DateTimeField(auto_now_add=True)),
+                ('department', models.ForeignKey(blank=True, help_text='Leave empty for every department', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='access_grants', to='assets.department')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='department_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'department access',
+                'constraints': [models.UniqueConstraint(fields=('user', 'department'), name='department_access_unique'), models.UniqueConstraint(condition=models.Q(('department__isnull', True)), fields=('user',), name='department_access_one_all')],
+            },
+        ),
+        migrations.RunPython(grant_existing_users, migrations.RunPython.noop),
+    ]
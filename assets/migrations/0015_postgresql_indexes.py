@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+# PostgreSQL-only indexes, built without locking the tables for writes:
+# BRIN indexes for date ranges over the append-mostly movement and asset
+# tables (a few pages instead of a B-tree's megabytes), and trigram indexes
+# for AssetQuerySet.search().
+POSTGRESQL_INDEXES = [
+    ('movement_date_brin',
+     'CREATE INDEX CONCURRENTLY IF NOT EXISTS movement_date_brin ON assets_assetmovement USING brin (date_moved)'),
+    ('asset_added_brin',
+     'CREATE INDEX CONCURRENTLY IF NOT EXISTS asset_added_brin ON assets_asset USING brin (date_added)'),
+    ('asset_name_trgm_idx',
+     'CREATE INDEX CONCURRENTLY IF NOT EXISTS asset_name_trgm_idx ON assets_asset USING gin (name gin_trgm_ops)'),
+]
+
+
+def create_postgresql_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # A trusted extension since PostgreSQL 13: the database owner may create it
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for _, sql in POSTGRESQL_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_postgresql_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in POSTGRESQL_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('assets', '0014_department_access'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(condition=models.Q(('status', 'Under Maintenance'), ('condition', 'Poor'), _connector='OR'), fields=['-date_added'], name='asset_attention_idx'),
+        ),
+        migrations.RunPython(create_postgresql_indexes, drop_postgresql_indexes),
+    ]
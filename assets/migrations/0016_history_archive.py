@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0015_postgresql_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('movement', 'Movements'), ('maintenance', 'Maintenance')], max_length=20)),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('records', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('asset', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.asset')),
+            ],
+            options={
+                'ordering': ['-last_date', '-id'],
+                'indexes': [models.Index(fields=['asset', 'kind', '-last_date'], name='archive_asset_idx')],
+            },
+        ),
+    ]
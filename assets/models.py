@@ -1,11 +1,130 @@
-from django.db import models
+import hashlib
+import math
+import re
+import secrets
+import unicodedata
+
+from django.core.exceptions import ValidationError
+from django.db import connections, models, router, transaction
+from django.db.models.functions import Collate, Concat, Substr, Upper
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+
+# Depreciation methods understood by the valuation engine (assets/valuation.py)
+DEPRECIATION_METHOD_CHOICES = [
+    ('straight_line', 'Straight Line'),
+    ('declining_balance', 'Double Declining Balance'),
+    ('none', 'No Depreciation'),
+]
+
+
+# Change sequence for the incremental change feed (assets/changefeed.py)
+class ChangeSequence(models.Model):
+    """Single-row counter handing out change sequence numbers."""
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, using=None):
+        """
+        Next sequence number. Call inside the transaction that writes the
+        change: the counter row stays locked until it commits, so changes
+        become visible in sequence order and a reader never skips one.
+        """
+        using = using or router.db_for_write(cls)
+        with transaction.atomic(using=using, savepoint=False):
+            if not cls.objects.using(using).filter(pk=1).update(value=models.F('value') + 1):
+                cls.objects.using(using).create(pk=1, value=1)
+            return cls.objects.using(using).values_list('value', flat=True).get(pk=1)
+
+
+class ChangeTracked(models.Model):
+    """Stamps every save with a fresh change sequence number."""
+    change_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'change_seq'}
+        with transaction.atomic(using=using, savepoint=False):
+            self.change_seq = ChangeSequence.allocate(using)
+            super().save(*args, **kwargs)
+
+
+# Deleted rows, so feed consumers learn about deletions
+class ChangeTombstone(models.Model):
+    seq = models.BigIntegerField(db_index=True)
+    object_type = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.object_type} #{self.object_id} deleted (seq {self.seq})"
+
+
+# Department hierarchy (faculty > department > lab) as a materialized path:
+# each department stores its ancestors' ids and its own, zero-padded to
+# PATH_STEP digits, e.g. "00000003" + "00000017". A subtree is a range of
+# ``path`` values, so subtree filters are one indexed range scan on any
+# database, and moving a subtree is one UPDATE of the moved rows' prefixes.
+PATH_STEP = 8
+
+
+def path_segment(pk):
+    return f'{pk:0{PATH_STEP}d}'
+
+
+def subtree_range(path):
+    """``(low, high)`` bounds of every path starting with ``path``."""
+    # Paths are digits only, so bumping the last segment gives the first
+    # path past the subtree under any collation
+    return path, path[:-PATH_STEP] + path_segment(int(path[-PATH_STEP:]) + 1)
+
+
+def rollup_counts(counts, paths):
+    """
+    Subtree totals from per-department totals: ``counts`` maps department ids
+    to their own totals, ``paths`` maps every department id to its path. Each
+    department's result includes everything below it.
+    """
+    totals = dict.fromkeys(paths, 0)
+    for pk, count in counts.items():
+        path = paths.get(pk, '')
+        for i in range(0, len(path), PATH_STEP):
+            ancestor = int(path[i:i + PATH_STEP])
+            if ancestor in totals:
+                totals[ancestor] += count
+    return totals
+
+
+class DepartmentQuerySet(models.QuerySet):
+    def subtree(self, department):
+        """``department`` and everything below it."""
+        low, high = subtree_range(department.path)
+        return self.filter(path__gte=low, path__lt=high)
+
+    def visible_to(self, user):
+        ids = visible_department_ids(user)
+        return self if ids is None else self.filter(id__in=sorted(ids))
+
 
 # Department model
 class Department(models.Model):
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=100, blank=True)
     head_of_department = models.CharField(max_length=100, blank=True, null=True)  
+    parent = models.ForeignKey(
+        'self', on_delete=models.PROTECT, null=True, blank=True, related_name='children',
+        help_text="Faculty or department this unit belongs to",
+    )
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+
+    objects = DepartmentQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -13,12 +132,171 @@ class Department(models.Model):
     class Meta:
         ordering = ['name']  
 
+    @property
+    def depth(self):
+        return max(len(self.path) // PATH_STEP - 1, 0)
+
+    @property
+    def ancestor_ids(self):
+        return [int(self.path[i:i + PATH_STEP]) for i in range(0, len(self.path) - PATH_STEP, PATH_STEP)]
+
+    def subtree_filter(self, prefix=''):
+        """``Q`` matching rows whose department (via ``prefix``) is in this subtree."""
+        low, high = subtree_range(self.path)
+        return models.Q(**{f'{prefix}path__gte': low, f'{prefix}path__lt': high})
+
+    def _parent_path(self, using=None):
+        # Read fresh: a cached parent instance may predate a move
+        if not self.parent_id:
+            return ''
+        return Department.objects.using(using).values_list('path', flat=True).get(pk=self.parent_id)
+
+    def clean(self):
+        super().clean()
+        if self.path and self._parent_path().startswith(self.path):
+            raise ValidationError({'parent': "A department cannot sit inside itself or its own sub-units."})
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        parent_path = self._parent_path(using)
+        if self.path and parent_path.startswith(self.path):
+            raise ValidationError({'parent': "A department cannot sit inside itself or its own sub-units."})
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            path = parent_path + path_segment(self.pk)
+            if path == self.path:
+                return
+            old = self.path
+            if old:
+                # Re-root the whole subtree (this row included) in one UPDATE
+                low, high = subtree_range(old)
+                Department.objects.using(using).filter(path__gte=low, path__lt=high).update(
+                    path=Concat(models.Value(path), Substr('path', len(old) + 1), output_field=models.CharField())
+                )
+            else:
+                Department.objects.using(using).filter(pk=self.pk).update(path=path)
+            self.path = path
+
+
+# Department-scoped visibility (see assets/access.py for the per-session cache)
+class DepartmentAccess(models.Model):
+    """
+    Lets a user see a department and everything below it. A grant without a
+    department covers all of them; superusers need no grants.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='department_access')
+    department = models.ForeignKey(
+        Department, on_delete=models.CASCADE, null=True, blank=True, related_name='access_grants',
+        help_text="Leave empty for every department",
+    )
+    granted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} → {self.department or 'all departments'}"
+
+    class Meta:
+        verbose_name_plural = 'department access'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'department'], name='department_access_unique'),
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(department__isnull=True), name='department_access_one_all',
+            ),
+        ]
+
+
+_UNKNOWN = object()
+
+
+def visible_department_ids(user):
+    """
+    Ids of the departments ``user`` may see, or ``None`` for all of them.
+    Worked out once per user object; access.py keeps it in the session.
+    """
+    if not user.is_authenticated or not user.is_active:
+        return frozenset()
+    if user.is_superuser:
+        return None
+    ids = getattr(user, '_visible_department_ids', _UNKNOWN)
+    if ids is _UNKNOWN:
+        paths = list(DepartmentAccess.objects.filter(user_id=user.pk).values_list('department__path', flat=True))
+        if None in paths:
+            ids = None
+        elif paths:
+            query = models.Q()
+            for path in paths:
+                low, high = subtree_range(path)
+                query |= models.Q(path__gte=low, path__lt=high)
+            ids = frozenset(Department.objects.filter(query).values_list('id', flat=True))
+        else:
+            ids = frozenset()
+        user._visible_department_ids = ids
+    return ids
+
+
+class ScopedQuerySet(models.QuerySet):
+    """Rows filtered to what a user may see through the department they belong to."""
+    # Path from the model to that department
+    department_path = 'department'
+
+    def visible_to(self, user):
+        ids = visible_department_ids(user)
+        if ids is None:
+            return self
+        # department_id IN (...), answered from the foreign key's index
+        return self.filter(**{f'{self.department_path}_id__in': sorted(ids)})
+
+
+class AssetRecordQuerySet(ScopedQuerySet):
+    department_path = 'asset__department'
+
+
+class AssetQuerySet(ScopedQuerySet):
+    def search(self, term):
+        """
+        Assets whose name or serial number starts with ``term``, served by
+        the prefix search indexes. On PostgreSQL also names containing a word
+        like ``term`` (pg_trgm, so typos still match), closest first.
+        """
+        prefix = models.Q(name__istartswith=term) | models.Q(serial_number__istartswith=term)
+        if connections[self.db].vendor != 'postgresql':
+            return self.filter(prefix).order_by('name', 'id')
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        return (
+            self.filter(prefix | models.Q(name__trigram_word_similar=term))
+            .annotate(similarity=TrigramWordSimilarity(term, 'name'))
+            .order_by('-similarity', 'name', 'id')
+        )
+
+
+class LiveAssetManager(models.Manager.from_queryset(AssetQuerySet)):
+    """Assets that are not deleted; ``Asset.all_objects`` includes those too."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class LiveAssetRecordManager(models.Manager.from_queryset(AssetRecordQuerySet)):
+    """
+    History of assets that are not deleted. The few deleted assets come from
+    a subquery on ``asset_deleted_idx``, so no join to the asset table is
+    added; ``_base_manager`` still sees every row (purge, cascades).
+    """
+    def get_queryset(self):
+        deleted = Asset.all_objects.filter(deleted_at__isnull=False).values('pk')
+        return super().get_queryset().exclude(asset__in=deleted)
+
 
 # Asset Category
 class AssetCategory(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
 
+    # Defaults used by assets in this category that don't set their own
+    default_depreciation_method = models.CharField(
+        max_length=20, choices=DEPRECIATION_METHOD_CHOICES, default='straight_line'
+    )
+    default_useful_life_years = models.PositiveSmallIntegerField(default=5)
+    default_salvage_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
     def __str__(self):
         return self.name
 
@@ -26,8 +304,127 @@ class AssetCategory(models.Model):
         verbose_name_plural = "Asset Categories"
 
 
+# Campus locations. Coordinates are optional WGS84 degrees; each located row
+# also stores the cell of a fixed GRID_DEGREES grid it falls in, numbered
+# row by row, so a bounding box is a handful of indexed range scans (one per
+# grid row) on any database. See assets/spatial.py for the lookups.
+GRID_DEGREES = 0.001  # about 110 m of latitude
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+
+
+def grid_cell(latitude, longitude):
+    row = math.floor((latitude + 90) / GRID_DEGREES)
+    column = math.floor((longitude + 180) / GRID_DEGREES) % GRID_COLUMNS
+    return row * GRID_COLUMNS + column
+
+
+class Located(models.Model):
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    grid_cell = models.BigIntegerField(null=True, blank=True, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def clean(self):
+        super().clean()
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValidationError("Give both latitude and longitude, or neither.")
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.grid_cell = grid_cell(self.latitude, self.longitude)
+        else:
+            self.grid_cell = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'grid_cell'}
+        super().save(*args, **kwargs)
+
+
+class Campus(Located):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = "Campuses"
+
+
+class Building(Located):
+    campus = models.ForeignKey(Campus, on_delete=models.PROTECT, related_name='buildings')
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=20, blank=True, help_text="Short code shown with room numbers, e.g. 'SCI'")
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['campus', 'name'], name='building_unique_name'),
+        ]
+
+
+class Room(Located):
+    # Rooms without coordinates are placed at their building's
+    building = models.ForeignKey(Building, on_delete=models.PROTECT, related_name='rooms')
+    name = models.CharField(max_length=50, help_text="Room number or name")
+    floor = models.SmallIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.building.code or self.building.name} {self.name}"
+
+    class Meta:
+        ordering = ['building__name', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['building', 'name'], name='room_unique_name'),
+        ]
+
+
+# Serial numbers are compared without case, spaces or separators, so
+# " abc-123 " and "ABC123" are the same serial (see assets/dedup.py)
+_SERIAL_NOISE = re.compile(r'[\s\-_./\\:#]+')
+
+
+def canonical_serial(serial):
+    """``' ab-12 3 '`` -> ``'AB123'``; ``None`` when nothing is left."""
+    return _SERIAL_NOISE.sub('', unicodedata.normalize('NFKC', serial or '')).upper() or None
+
+
+class CaseInsensitiveIndex(models.Index):
+    """
+    Index for case-insensitive exact and prefix lookups on one text field
+    (``iexact``, ``istartswith``). The expression those lookups can use
+    differs per database, so it is picked when the index is created:
+    ``field COLLATE NOCASE`` on SQLite (for its LIKE), ``UPPER(field)`` with
+    ``text_pattern_ops`` on PostgreSQL, the plain column elsewhere.
+    """
+    def __init__(self, *, field, name):
+        self.field = field
+        super().__init__(fields=[field], name=name)
+
+    def deconstruct(self):
+        path, _, _ = super().deconstruct()
+        return path, (), {'field': self.field, 'name': self.name}
+
+    def for_vendor(self, vendor):
+        if vendor == 'sqlite':
+            return models.Index(Collate(models.F(self.field), 'NOCASE'), name=self.name)
+        if vendor == 'postgresql':
+            from django.contrib.postgres.indexes import OpClass
+            return models.Index(OpClass(Upper(self.field), name='text_pattern_ops'), name=self.name)
+        return models.Index(fields=[self.field], name=self.name)
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        index = self.for_vendor(schema_editor.connection.vendor)
+        return index.create_sql(model, schema_editor, using=using, **kwargs)
+
+
 # Main Asset model
-class Asset(models.Model):
+class Asset(ChangeTracked):
     STATUS_CHOICES = [
         ('Available', 'Available'),
         ('In Use', 'In Use'),
@@ -38,7 +435,12 @@ class Asset(models.Model):
     name = models.CharField(max_length=100)
     category = models.ForeignKey(AssetCategory, on_delete=models.SET_NULL, null=True)
     serial_number = models.CharField(max_length=100, unique=True)
+    # canonical_serial(serial_number), set on save. NULL only for rows that
+    # clashed with an older asset when the column was added; resolve those
+    # with the find_duplicates command.
+    serial_canonical = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True)
+    room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True, related_name='assets')
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     purchase_date = models.DateField()
     condition = models.CharField(max_length=50, default="Good")
@@ -49,46 +451,339 @@ class Asset(models.Model):
     last_checked_out = models.DateTimeField(blank=True, null=True)
     expected_return_time = models.DateTimeField(blank=True, null=True)
 
+    # Valuation - blank depreciation fields fall back to the category defaults
+    purchase_cost = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    depreciation_method = models.CharField(
+        max_length=20, choices=DEPRECIATION_METHOD_CHOICES, blank=True,
+        help_text="Leave blank to use the category default."
+    )
+    useful_life_years = models.PositiveSmallIntegerField(
+        blank=True, null=True, help_text="Leave blank to use the category default."
+    )
+    salvage_value = models.DecimalField(
+        max_digits=12, decimal_places=2, blank=True, null=True,
+        help_text="Leave blank to use the category salvage percentage."
+    )
+    # Set by soft_delete(); `manage.py purge_assets` removes the row later
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveAssetManager()
+    all_objects = AssetQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so live updates can report the transition
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
     def __str__(self):
         return f"{self.name} ({self.serial_number})"
 
+    def clean(self):
+        super().clean()
+        canonical = canonical_serial(self.serial_number)
+        # Deleted assets keep their serial number until purged, so they can be restored
+        clash = Asset.all_objects.filter(serial_canonical=canonical).exclude(pk=self.pk).first() if canonical else None
+        if clash is not None:
+            owner = f"{clash} (deleted, awaiting purge)" if clash.deleted_at else str(clash)
+            raise ValidationError({
+                'serial_number': f"{owner} already has this serial number (ignoring case, spaces and dashes).",
+            })
+
+    def save(self, *args, **kwargs):
+        self.serial_canonical = canonical_serial(self.serial_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'serial_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'serial_canonical'}
+        super().save(*args, **kwargs)
+
+    def soft_delete(self):
+        """Hide the asset and its history everywhere; both stay until it is purged."""
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+
+    def restore(self):
+        self.deleted_at = None
+        self.save(update_fields=['deleted_at'])
+
     class Meta:
-        ordering = ['-date_added']  
+        ordering = ['-date_added']
+        indexes = [
+            # Search: the admin's '^name' / '=serial_number' and AssetQuerySet.search()
+            CaseInsensitiveIndex(field='name', name='asset_name_prefix_idx'),
+            CaseInsensitiveIndex(field='serial_number', name='asset_serial_nocase_idx'),
+            # Default ordering of the asset list and the admin changelist;
+            # partial, so deleted rows awaiting purge don't take up room in it
+            models.Index(
+                fields=['-date_added', '-id'], name='asset_live_recent_idx',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # The purge's queue: only the few deleted rows
+            models.Index(
+                fields=['deleted_at'], name='asset_deleted_idx', condition=models.Q(deleted_at__isnull=False),
+            ),
+            # The dashboard's "needing attention" list; a small slice of the table
+            models.Index(
+                fields=['-date_added'], name='asset_attention_idx',
+                condition=models.Q(status='Under Maintenance') | models.Q(condition='Poor'),
+            ),
+        ]
 
 
 # Track movement of assets between departments
-class AssetMovement(models.Model):
+class AssetMovement(ChangeTracked):
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
     from_department = models.ForeignKey(Department, related_name='moved_from', on_delete=models.SET_NULL, null=True)
     to_department = models.ForeignKey(Department, related_name='moved_to', on_delete=models.SET_NULL, null=True)
+    from_room = models.ForeignKey(Room, related_name='moved_from', on_delete=models.SET_NULL, null=True, blank=True)
+    to_room = models.ForeignKey(Room, related_name='moved_to', on_delete=models.SET_NULL, null=True, blank=True)
     moved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     date_moved = models.DateTimeField(auto_now_add=True)
     remarks = models.TextField(blank=True)
 
+    objects = LiveAssetRecordManager()
+
     def __str__(self):
         return f"{self.asset.name} moved to {self.to_department}"
 
     class Meta:
         ordering = ['-date_moved']
+        indexes = [
+            # Keyset pagination order for movement_rows
+            models.Index(fields=['-date_moved', '-id'], name='movement_recent_idx'),
+        ]
 
          # Auto-update Asset when movement is saved
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.to_department:
-            self.asset.department = self.to_department
+        if self.to_department or self.to_room:
+            if self.to_department:
+                self.asset.department = self.to_department
+            if self.to_room:
+                self.asset.room = self.to_room
             self.asset.save()
 
 
 # Track maintenance records
-class MaintenanceRecord(models.Model):
+class MaintenanceRecord(ChangeTracked):
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
     issue_reported = models.TextField()
     maintenance_date = models.DateField()
     performed_by = models.CharField(max_length=100)
     remarks = models.TextField(blank=True)
 
+    objects = LiveAssetRecordManager()
+
     def __str__(self):
         return f"Maintenance for {self.asset.name} on {self.maintenance_date}"
 
     class Meta:
         ordering = ['-maintenance_date']
+        indexes = [
+            # Keyset pagination order for maintenance_rows
+            models.Index(fields=['-maintenance_date', '-id'], name='maintenance_recent_idx'),
+        ]
+
+
+# Old movement and maintenance history, moved out of the hot tables (assets/archive.py)
+class HistoryArchive(models.Model):
+    KIND_CHOICES = [
+        ('movement', 'Movements'),
+        ('maintenance', 'Maintenance'),
+    ]
+
+    # No FK constraint: archived history outlives the asset, like the audit trail
+    asset = models.ForeignKey(
+        Asset, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Dates of the oldest and newest record in the batch
+    first_date = models.DateField()
+    last_date = models.DateField()
+    records = models.PositiveIntegerField()
+    # zlib-compressed JSON list of the records, newest first
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = LiveAssetRecordManager()
+
+    def __str__(self):
+        return f"{self.records} archived {self.kind} records of asset #{self.asset_id}"
+
+    class Meta:
+        ordering = ['-last_date', '-id']
+        indexes = [
+            models.Index(fields=['asset', 'kind', '-last_date'], name='archive_asset_idx'),
+        ]
+
+
+# Checkout history for utilization analytics (assets/utilization.py)
+class CheckoutSession(models.Model):
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='checkout_sessions')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    # Both NULL while the asset is still checked out; the length is stored
+    # so window totals can SUM it instead of subtracting timestamps per row
+    ended_at = models.DateTimeField(null=True, blank=True)
+    seconds = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return f"{self.asset.name} checked out {self.started_at:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def start(cls, asset, user, at):
+        """Open a session for ``asset``, ending one left open first."""
+        cls.end(asset, at)
+        return cls.objects.create(asset=asset, user=user, started_at=at)
+
+    @classmethod
+    def end(cls, asset, at):
+        """End the open session of ``asset``, if there is one."""
+        for session in cls.objects.filter(asset=asset, ended_at__isnull=True):
+            session.ended_at = at
+            session.seconds = max(0, round((at - session.started_at).total_seconds()))
+            session.save(update_fields=['ended_at', 'seconds'])
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            # Covers the SUM over sessions inside a window (no table reads)
+            models.Index(fields=['started_at', 'ended_at', 'asset', 'seconds'], name='checkout_window_idx'),
+            # Sessions still running at a window's start
+            models.Index(fields=['ended_at', 'started_at'], name='checkout_ended_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['asset'], condition=models.Q(ended_at__isnull=True),
+                name='checkout_one_open_per_asset',
+            ),
+        ]
+
+
+# Stocktakes: a department's assets checked off room by room (assets/stocktake.py)
+class Stocktake(models.Model):
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, related_name='stocktakes')
+    started_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ScopedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Stocktake of {self.department} on {self.started_at:%Y-%m-%d}"
+
+    class Meta:
+        ordering = ['-started_at']
+
+
+class StocktakeScan(models.Model):
+    RESULT_CHOICES = [
+        ('found', 'Found'),
+        ('misplaced', 'Misplaced'),
+        ('unknown', 'Unknown serial number'),
+        ('missing', 'Missing'),
+    ]
+
+    stocktake = models.ForeignKey(Stocktake, on_delete=models.CASCADE, related_name='scans')
+    asset = models.ForeignKey(Asset, on_delete=models.SET_NULL, null=True, blank=True)
+    serial_number = models.CharField(max_length=100)
+    room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True)
+    # NULL for assets that were never scanned
+    scanned_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES)
+
+    def __str__(self):
+        return f"{self.serial_number}: {self.get_result_display()}"
+
+    class Meta:
+        ordering = ['stocktake', 'id']
+        constraints = [
+            # A re-sent batch or a second scan of the same tag is ignored
+            models.UniqueConstraint(fields=['stocktake', 'serial_number'], name='stocktake_scan_once'),
+        ]
+
+
+# Append-only audit trail of changes made through the views
+class AppendOnlyError(Exception):
+    pass
+
+
+class AuditEventQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise AppendOnlyError("Audit events cannot be updated.")
+
+    def delete(self):
+        raise AppendOnlyError("Audit events cannot be deleted.")
+
+
+class AuditEvent(models.Model):
+    ACTION_CHOICES = [
+        ('create', 'Created'),
+        ('update', 'Updated'),
+        ('delete', 'Deleted'),
+        ('checkout', 'Checked Out'),
+        ('return', 'Returned'),
+    ]
+
+    timestamp = models.DateTimeField(default=timezone.now)
+    # No FK constraints: events must outlive the users and assets they mention
+    actor = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    actor_username = models.CharField(max_length=150, blank=True)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    object_type = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    object_repr = models.CharField(max_length=200)
+    asset = models.ForeignKey(
+        Asset, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    objects = AuditEventQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.actor_username or 'system'} {self.action} {self.object_repr}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise AppendOnlyError("Audit events cannot be updated.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise AppendOnlyError("Audit events cannot be deleted.")
+
+    class Meta:
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            # Time-leading index: range scans per period, and maps directly
+            # onto time partitions / BRIN on databases that offer them
+            models.Index(fields=['timestamp'], name='audit_time_idx'),
+            models.Index(fields=['asset', '-timestamp', '-id'], name='audit_asset_idx'),
+            models.Index(fields=['actor', '-timestamp', '-id'], name='audit_actor_idx'),
+        ]
+
+
+# API access tokens (only a hash of the key is stored)
+class ApiToken(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, help_text="What the token is used for, e.g. 'helpdesk'.")
+    prefix = models.CharField(max_length=8, help_text="First characters of the key, for identification.")
+    key_hash = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+    revoked = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix}…) for {self.user}"
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, name):
+        """Create a token and return ``(token, key)``; the key is shown only once."""
+        key = secrets.token_urlsafe(32)
+        token = cls.objects.create(user=user, name=name, prefix=key[:8], key_hash=cls.hash_key(key))
+        return token, key
@@ -0,0 +1,168 @@
+"""
+Keyset ("seek") pagination.
+
+Pages are fetched with ``WHERE (key) < (last key seen)`` on an indexed
+ordering instead of ``OFFSET``, so every page costs the same no matter how
+deep into the history it is. Cursors are opaque URL-safe tokens holding
+the ordering values of the last row of the previous page.
+
+``EstimatedCountPaginator`` is for the admin changelists, which need page
+numbers and so can't use cursors.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds, which would make
+    # rows sharing a millisecond with the cursor row vanish between pages.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, length):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor("Cursor does not match this listing.")
+    return values
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a ``limit`` query parameter, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _after(ordering, values):
+    """
+    Q object selecting rows strictly after ``values`` in ``ordering``, e.g.
+    for ('-date_moved', '-id'): date < d OR (date = d AND id < i).
+    """
+    condition = Q()
+    for position in range(len(ordering) - 1, -1, -1):
+        field = ordering[position].lstrip('-')
+        lookup = 'lt' if ordering[position].startswith('-') else 'gt'
+        step = Q(**{f'{field}__{lookup}': values[position]})
+        if position < len(ordering) - 1:
+            step |= Q(**{field: values[position]}) & condition
+        condition = step
+    return condition
+
+
+def _key(row, ordering):
+    fields = [name.lstrip('-') for name in ordering]
+    if isinstance(row, dict):
+        return [row[name] for name in fields]
+    return [getattr(row, name) for name in fields]
+
+
+def _seek(queryset, ordering, cursor):
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, len(ordering))
+        try:
+            queryset = queryset.filter(_after(ordering, values))
+        except (ValidationError, ValueError, TypeError):
+            # A crafted cursor can hold any JSON: strings that don't parse,
+            # null, objects or lists where the fields expect scalars
+            raise InvalidCursor("Cursor does not match this listing.")
+    return queryset
+
+
+def _page(rows, ordering, limit):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(_key(rows[-1], ordering))
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of ``queryset`` in ``ordering`` (which must end in a unique
+    field such as ``-id``). Works for model instances and ``values()``
+    dicts as long as the ordering fields are included.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    queryset = _seek(queryset, ordering, cursor)
+    return _page(list(queryset[:limit + 1]), ordering, limit)
+
+
+async def akeyset_page(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """``keyset_page()`` for async views."""
+    queryset = _seek(queryset, ordering, cursor)
+    return _page([row async for row in queryset[:limit + 1]], ordering, limit)
+
+
+# -------------------------------
+# Estimated counts (admin changelists)
+# -------------------------------
+def estimated_row_count(model, using='default'):
+    """
+    Cheap estimate of the number of rows in ``model``'s table, or None.
+    PostgreSQL reports the planner's statistics; elsewhere the highest
+    primary key is read from the index (exact until rows are deleted).
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [connection.ops.quote_name(model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else None
+    else:
+        estimate = model._base_manager.using(using).aggregate(last=Max('pk'))['last']
+    # reltuples is -1 for a table that was never analysed
+    if not isinstance(estimate, int) or estimate < 0:
+        return None
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs a full-table COUNT. Unfiltered lists use
+    ``estimated_row_count()`` once the table is big; filtered lists count
+    at most ``count_limit`` rows, so pages past that aren't reachable.
+    """
+    estimate_threshold = 10_000
+    count_limit = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
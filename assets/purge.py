@@ -0,0 +1,93 @@
+"""
+Hard deletion of soft-deleted assets.
+
+Deleting an asset in the app only sets ``deleted_at`` (``Asset.soft_delete``):
+the default manager hides it, and an administrator can restore it from the
+admin. ``purge()`` removes assets deleted longer ago than
+``settings.ASSET_PURGE_AFTER_DAYS`` for good, with their movements,
+maintenance records and checkout sessions.
+
+An asset with years of history would make ``Asset.delete()`` one long
+transaction, holding SQLite's write lock throughout. Instead the dependent
+rows go first, ``chunk_size`` rows per transaction with an optional pause in
+between so other writers get their turn, then the assets themselves. Rows
+are removed with plain DELETEs; tombstones are written for the change feed.
+The live-update, index and feed side of the deletion already happened when
+the asset was soft-deleted. Archived history (``HistoryArchive``) and audit
+events are kept, as after any deletion.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import changefeed
+from .models import Asset
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def horizon(days=None):
+    """The moment before which deleted assets are purged."""
+    if days is None:
+        days = settings.ASSET_PURGE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def due(before):
+    """Assets deleted before ``before``."""
+    return Asset.all_objects.filter(deleted_at__lt=before)
+
+
+def _dependents():
+    """``(model, field name, on_delete)`` of every foreign key to ``Asset``."""
+    return [
+        (relation.related_model, relation.field.name, relation.on_delete)
+        for relation in Asset._meta.related_objects
+    ]
+
+
+def _clear(model, field, on_delete, asset_ids, chunk_size, pause):
+    """Delete or detach ``model`` rows pointing at ``asset_ids``, a chunk per transaction."""
+    if on_delete is models.DO_NOTHING:
+        return 0
+    if on_delete not in (models.CASCADE, models.SET_NULL):
+        raise ValueError(f"purge does not handle on_delete={on_delete.__name__} ({model.__name__}.{field}).")
+    rows = model._base_manager.filter(**{f'{field}__in': asset_ids})
+    cleared = 0
+    while True:
+        with transaction.atomic():
+            pks = list(rows.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return cleared
+            chunk = model._base_manager.filter(pk__in=pks)
+            if on_delete is models.CASCADE:
+                chunk._raw_delete(chunk.db)
+                changefeed.record_deletions(model, pks)
+            elif model in changefeed.FEED_NAMES:
+                changefeed.stamp_queryset(chunk, **{field: None})
+            else:
+                chunk.update(**{field: None})
+        cleared += len(pks)
+        if pause:
+            time.sleep(pause)
+
+
+def purge(before, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, pause=0):
+    """Remove every asset deleted before ``before``; returns ``(assets, dependent rows)`` removed."""
+    assets = dependents = 0
+    while True:
+        asset_ids = list(due(before).order_by('deleted_at', 'id').values_list('id', flat=True)[:batch_size])
+        if not asset_ids:
+            return assets, dependents
+        for model, field, on_delete in _dependents():
+            dependents += _clear(model, field, on_delete, asset_ids, chunk_size, pause)
+        with transaction.atomic():
+            # Skips any asset restored while its history was being removed
+            doomed = Asset.all_objects.filter(pk__in=asset_ids, deleted_at__isnull=False)
+            assets += doomed._raw_delete(doomed.db)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,84 @@
+"""
+Per-user token buckets for report and export endpoints.
+
+Each user has a bucket per limit in ``settings.RATE_LIMITS``: it holds up to
+``burst`` tokens and refills at ``rate`` tokens a minute. A request takes a
+token; with none left the response is ``429 Too Many Requests`` with a
+``Retry-After`` header. A burst of page loads is let through, a script
+fetching the reports in a loop is slowed to the refill rate.
+
+Buckets live in the ``local`` cache (LocMemCache), so each process keeps
+its own and the limits apply per process; nothing is shared, so checking a
+bucket costs no network round trip. An idle bucket expires once it would
+have refilled anyway.
+"""
+import math
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+from . import metrics
+
+CACHE_ALIAS = 'local'
+
+_lock = threading.Lock()
+
+
+def take(name, user):
+    """Take a token from ``user``'s ``name`` bucket; returns 0, or the seconds until one is free."""
+    limit = getattr(settings, 'RATE_LIMITS', {}).get(name)
+    if limit is None:
+        return 0
+    rate, burst = limit
+    per_second = rate / 60
+    key = f'ratelimit:{name}:{user.pk}'
+    cache = caches[CACHE_ALIAS]
+    # Read and write under one lock so concurrent requests can't both spend the last token
+    with _lock:
+        now = time.monotonic()
+        tokens, stamp = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - stamp) * per_second)
+        if tokens < 1:
+            return (1 - tokens) / per_second
+        cache.set(key, (tokens - 1, now), math.ceil(burst / per_second))
+    return 0
+
+
+def too_many_requests(request, wait):
+    retry_after = str(max(1, math.ceil(wait)))
+    message = "Too many requests; try again shortly."
+    if 'text/html' in request.headers.get('Accept', ''):
+        response = HttpResponse(message, status=429, content_type='text/plain')
+    else:
+        response = JsonResponse({'error': message}, status=429)
+    response['Retry-After'] = retry_after
+    return response
+
+
+def check(request, name):
+    """A 429 response if ``request.user`` has used up the ``name`` limit, else None."""
+    wait = take(name, request.user)
+    if not wait:
+        return None
+    metrics.RATE_LIMITED.inc(limit=name)
+    return too_many_requests(request, wait)
+
+
+def rate_limited(name):
+    """Apply the ``name`` limit to a view (sync or async), after authentication."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                return check(request, name) or await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                return check(request, name) or view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,165 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import access, asset_index, changefeed, events, fragments, metrics
+from .models import (
+    Asset, AssetCategory, AssetMovement, CheckoutSession, Department, DepartmentAccess, MaintenanceRecord,
+)
+
+
+# -------------------------------
+# In-memory asset index upkeep
+# -------------------------------
+@receiver(post_save, sender=Asset)
+def index_asset_saved(sender, instance, using, **kwargs):
+    if instance.deleted_at is None:
+        asset_index.on_commit('upsert', *asset_index.row_of(instance), using=using)
+    else:
+        asset_index.on_commit('remove', instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Asset)
+def index_asset_deleted(sender, instance, using, **kwargs):
+    asset_index.on_commit('remove', instance.pk, using=using)
+
+
+@receiver(post_save, sender=Department)
+def index_department_saved(sender, instance, using, **kwargs):
+    asset_index.on_commit('rename_department', instance.pk, instance.name, using=using)
+
+
+@receiver(post_delete, sender=Department)
+def index_department_deleted(sender, instance, using, **kwargs):
+    asset_index.on_commit('clear_department', instance.pk, using=using)
+
+
+@receiver(post_save, sender=AssetCategory)
+def index_category_saved(sender, instance, using, **kwargs):
+    asset_index.on_commit('rename_category', instance.pk, instance.name, using=using)
+
+
+@receiver(post_delete, sender=AssetCategory)
+def index_category_deleted(sender, instance, using, **kwargs):
+    asset_index.on_commit('clear_category', instance.pk, using=using)
+
+
+# -------------------------------
+# Change feed tombstones
+# -------------------------------
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=AssetMovement)
+@receiver(post_delete, sender=MaintenanceRecord)
+def feed_record_deleted(sender, instance, using, **kwargs):
+    changefeed.record_deletions(sender, [instance.pk], using=using)
+
+
+@receiver(post_save, sender=Asset)
+def feed_asset_soft_deleted(sender, instance, using, update_fields=None, **kwargs):
+    # The feed reads through the default managers, which hide the asset and
+    # its history from now on; a restore brings the history back
+    if not update_fields or 'deleted_at' not in update_fields:
+        return
+    history = [AssetMovement._base_manager.using(using), MaintenanceRecord._base_manager.using(using)]
+    if instance.deleted_at is not None:
+        changefeed.record_deletions(sender, [instance.pk], using=using)
+        for rows in history:
+            changefeed.record_deletions(
+                rows.model, rows.filter(asset=instance).values_list('pk', flat=True), using=using,
+            )
+    else:
+        for rows in history:
+            changefeed.stamp_queryset(rows.filter(asset=instance))
+
+
+@receiver(pre_delete, sender=Department)
+@receiver(pre_delete, sender=AssetCategory)
+@receiver(pre_delete, sender=User)
+def feed_dependents_nulled(sender, instance, using, **kwargs):
+    # on_delete=SET_NULL rewrites these rows with an UPDATE that skips save()
+    for model, field in changefeed.set_null_dependents(sender):
+        changefeed.stamp_queryset(model._default_manager.using(using).filter(**{field: instance}))
+
+
+# -------------------------------
+# Dashboard fragment caches (fragments.py)
+# -------------------------------
+@receiver(post_save, sender=Asset)
+@receiver(post_delete, sender=Asset)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def fragments_assets_changed(sender, **kwargs):
+    # Recent assets show department names; top departments count assets
+    fragments.assets_changed()
+
+
+# -------------------------------
+# Per-session visible departments (access.py)
+# -------------------------------
+@receiver(post_save, sender=DepartmentAccess)
+@receiver(post_delete, sender=DepartmentAccess)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def access_changed(sender, **kwargs):
+    # A grant covers the departments below it, so new or moved units count too
+    access.changed()
+
+
+# -------------------------------
+# Live updates (events.py)
+# -------------------------------
+@receiver(post_save, sender=Asset)
+def live_asset_saved(sender, instance, created, update_fields=None, **kwargs):
+    soft_delete_changed = bool(update_fields) and 'deleted_at' in update_fields
+    if instance.deleted_at is not None:
+        # Soft-deleted: gone as far as pages are concerned
+        if soft_delete_changed:
+            live_asset_deleted(sender, instance)
+        return
+    # A restored asset reappears on pages like a new one
+    created = created or soft_delete_changed
+    previous = None if created else getattr(instance, '_loaded_status', None)
+    events.asset_changed(instance, previous_status=previous, created=created)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Asset)
+def live_asset_deleted(sender, instance, **kwargs):
+    events.asset_deleted(
+        instance.pk, getattr(instance, '_loaded_status', instance.status), instance.department_id,
+    )
+
+
+@receiver(post_save, sender=AssetMovement)
+def live_movement_saved(sender, instance, created, **kwargs):
+    if created:
+        events.movement_recorded(instance)
+
+
+@receiver(post_save, sender=MaintenanceRecord)
+def live_maintenance_saved(sender, instance, created, **kwargs):
+    if created:
+        events.maintenance_recorded(instance)
+
+
+# -------------------------------
+# Business event counters (metrics.py)
+# -------------------------------
+@receiver(post_save, sender=CheckoutSession)
+def metrics_checkout_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        metrics.business_event('checkout')
+    elif update_fields and 'ended_at' in update_fields:
+        metrics.business_event('return')
+
+
+@receiver(post_save, sender=AssetMovement)
+def metrics_movement_saved(sender, instance, created, **kwargs):
+    if created:
+        metrics.business_event('movement')
+
+
+@receiver(post_save, sender=MaintenanceRecord)
+def metrics_maintenance_saved(sender, instance, created, **kwargs):
+    if created:
+        metrics.business_event('maintenance')
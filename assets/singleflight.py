@@ -0,0 +1,98 @@
+"""
+Request coalescing for expensive computations.
+
+When many people open the dashboard or the reports at once (the first
+morning of a semester), every request would run the same aggregate queries
+side by side. ``do()`` / ``ado()`` run a computation once per key at a time:
+the first caller computes, and callers arriving with the same key while it
+is still running wait for that result instead of starting their own. Nothing
+is kept once it finishes, so results are never stale; this only flattens
+bursts. Keys must name everything the result depends on, such as the set of
+departments the user can see (``access.scope_key``).
+
+Calls meet in a ``concurrent.futures.Future``, so threads (WSGI, sync
+views) and event loops (ASGI, or async views run under WSGI, each on a loop
+of its own) share one in-flight call. Like the rest of the in-process
+caches, this coalesces within one process. An error in the computation is
+raised in every caller that waited for it.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from . import metrics
+
+
+class Group:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # bench_herd switches coalescing off to compare
+        self.enabled = True
+        # Callers that joined a computation already running, for benchmarks
+        self.shared = 0
+
+    def _join(self, key):
+        """``(future, leader)``: the call in flight for ``key``, started if there is none."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                leader = False
+            else:
+                future = self._calls[key] = Future()
+                leader = True
+        metrics.COALESCED.inc(result='leader' if leader else 'shared')
+        return future, leader
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, compute):
+        """``compute()``, shared with concurrent ``do()``/``ado()`` calls for the same key."""
+        if not self.enabled:
+            return compute()
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = compute()
+        except Exception as exc:
+            self._finish(key, future, error=exc)
+            raise
+        except BaseException:
+            # Interrupted rather than failed: release the waiters too
+            self._finish(key, future, error=RuntimeError("Shared computation was interrupted."))
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key, compute):
+        """``await compute()``, shared like ``do()``; ``compute`` returns a coroutine."""
+        if not self.enabled:
+            return await compute()
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded: a waiter going away must not cancel the shared call
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await compute()
+        except Exception as exc:
+            self._finish(key, future, error=exc)
+            raise
+        except BaseException:
+            # Cancelled (client went away) rather than failed
+            self._finish(key, future, error=RuntimeError("Shared computation was interrupted."))
+            raise
+        self._finish(key, future, result)
+        return result
+
+
+group = Group()
+do = group.do
+ado = group.ado
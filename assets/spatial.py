@@ -0,0 +1,111 @@
+"""
+Bounding-box and radius lookups over campus locations.
+
+Every ``Campus``, ``Building`` and ``Room`` with coordinates stores the
+``grid_cell`` it falls in (see ``grid_cell`` in models.py). Cells are
+numbered row by row, so the cells of one grid row inside a box are one
+contiguous range of numbers: a box becomes one indexed ``BETWEEN`` per grid
+row, and only the rows those ranges return are checked against the exact
+coordinates. This works the same on SQLite and PostgreSQL and stays an index
+scan as the inventory grows.
+
+Assets are found through their room; a room without coordinates is placed
+at its building's.
+"""
+import math
+
+from django.db.models import Q
+
+from .models import GRID_COLUMNS, GRID_DEGREES, Asset, Room, grid_cell
+
+EARTH_RADIUS_M = 6371008.8
+METRES_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+# Beyond this many grid rows one range from the first cell to the last is
+# scanned instead; it returns more candidates but stays a single query.
+MAX_GRID_ROWS = 64
+
+
+class InvalidBox(ValueError):
+    pass
+
+
+def grid_filter(south, west, north, east, prefix=''):
+    """``Q`` matching rows whose ``grid_cell`` (via ``prefix``) may lie in the box."""
+    if south > north or west > east:
+        raise InvalidBox("The box's south-west corner must be below and left of its north-east corner.")
+    low, high = grid_cell(south, west), grid_cell(north, east)
+    first_row, last_row = low // GRID_COLUMNS, high // GRID_COLUMNS
+    if last_row - first_row >= MAX_GRID_ROWS or high % GRID_COLUMNS < low % GRID_COLUMNS:
+        return Q(**{f'{prefix}grid_cell__range': (low, high)})
+    first_column, last_column = low % GRID_COLUMNS, high % GRID_COLUMNS
+    query = Q()
+    for row in range(first_row, last_row + 1):
+        start = row * GRID_COLUMNS
+        query |= Q(**{f'{prefix}grid_cell__range': (start + first_column, start + last_column)})
+    return query
+
+
+def in_box(queryset, south, west, north, east, prefix=''):
+    """Rows of ``queryset`` (of a located model, via ``prefix``) inside the box."""
+    return queryset.filter(grid_filter(south, west, north, east, prefix)).filter(**{
+        f'{prefix}latitude__range': (south, north), f'{prefix}longitude__range': (west, east),
+    })
+
+
+def box_around(latitude, longitude, radius_m):
+    """``(south, west, north, east)`` of the box enclosing a circle."""
+    lat_delta = radius_m / METRES_PER_DEGREE
+    lon_delta = lat_delta / max(math.cos(math.radians(latitude)), GRID_DEGREES)
+    return (
+        max(latitude - lat_delta, -90.0), max(longitude - lon_delta, -180.0),
+        min(latitude + lat_delta, 90.0), min(longitude + lon_delta, 180.0),
+    )
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def rooms_in_box(south, west, north, east):
+    """
+    ``{room_id: (latitude, longitude)}`` for rooms inside the box, by their
+    own coordinates or, when they have none, their building's.
+    """
+    rooms = Room.objects.order_by()
+    own = in_box(rooms, south, west, north, east).values_list('id', 'latitude', 'longitude')
+    inherited = (
+        in_box(rooms.filter(grid_cell__isnull=True), south, west, north, east, prefix='building__')
+        .values_list('id', 'building__latitude', 'building__longitude')
+    )
+    return {pk: (lat, lon) for pk, lat, lon in [*own, *inherited]}
+
+
+def rooms_within(latitude, longitude, radius_m):
+    """``{room_id: distance in metres}`` for rooms within ``radius_m`` of a point."""
+    rooms = {}
+    for pk, (lat, lon) in rooms_in_box(*box_around(latitude, longitude, radius_m)).items():
+        distance = distance_m(latitude, longitude, lat, lon)
+        if distance <= radius_m:
+            rooms[pk] = distance
+    return rooms
+
+
+def assets_in_box(south, west, north, east, queryset=None):
+    if queryset is None:
+        queryset = Asset.objects.all()
+    return queryset.filter(room__in=list(rooms_in_box(south, west, north, east)))
+
+
+def assets_within(latitude, longitude, radius_m, queryset=None):
+    """``(assets queryset, {room_id: distance})`` for assets within ``radius_m`` of a point."""
+    if queryset is None:
+        queryset = Asset.objects.all()
+    rooms = rooms_within(latitude, longitude, radius_m)
+    return queryset.filter(room__in=list(rooms)), rooms
@@ -0,0 +1,247 @@
+"""
+Static file build and serving.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` writes every
+file under a content-hashed name (``css/base.3f2a91c0d4e1.css``), resized
+WebP/PNG copies of raster images for ``srcset`` (see the
+``responsive_image`` tag), and ``.gz``/``.br`` siblings of text files.
+``StaticFilesMiddleware`` then serves ``STATIC_ROOT`` with far-future cache
+headers for hashed names and the smallest encoding the browser accepts, so
+a cached page costs only its HTML.
+
+Pillow (image derivatives) and brotli (``.br`` files) are optional; without
+them those steps are skipped. With ``DEBUG = True`` none of this is used and
+``runserver`` serves the source files as before.
+"""
+import gzip
+import mimetypes
+import os
+from io import BytesIO
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+COMPRESSIBLE = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico'}
+COMPRESS_MIN_SIZE = 256
+RESIZABLE = {'.png', '.jpg', '.jpeg'}
+WEBP_QUALITY = 80
+
+# Content-hashed names never change, so browsers may keep them for a year
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+MUTABLE_CACHE = 'public, max-age=60'
+
+# Preferred first: (Accept-Encoding token, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def derived_name(name, width, ext):
+    """``images/logo.png`` -> ``images/logo.160w.webp``"""
+    return f'{os.path.splitext(name)[0]}.{width}w.{ext}'
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes image derivatives and compressed copies."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        for name in sorted(paths):
+            if os.path.splitext(name)[1].lower() in RESIZABLE:
+                for derived, hashed in self._derive_images(name):
+                    yield derived, hashed, True
+        self.save_manifest()
+
+        written = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(written):
+            self._compress(name)
+
+    def _derive_images(self, name):
+        """Resized WebP (and same-format) copies at ``STATIC_IMAGE_WIDTHS``."""
+        try:
+            from PIL import Image
+        except ImportError:
+            return []
+
+        with self.open(self.hashed_files[self.hash_key(self.clean_name(name))]) as source:
+            image = Image.open(source)
+            image.load()
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            # Palette images would otherwise be resized without filtering
+            image = image.convert('RGBA')
+        ext = os.path.splitext(name)[1].lower().lstrip('.')
+        fmt = 'JPEG' if ext in ('jpg', 'jpeg') else 'PNG'
+        widths = sorted(w for w in getattr(settings, 'STATIC_IMAGE_WIDTHS', ()) if w < image.width)
+
+        saved = []
+        # The full width only gets a WebP copy; the original is its fallback
+        for width in widths + [image.width]:
+            if width == image.width:
+                resized = image
+            else:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            targets = [('webp', 'WEBP', {'quality': WEBP_QUALITY, 'method': 6})]
+            if width != image.width:
+                targets.append((ext, fmt, {'optimize': True}))
+            for target_ext, target_fmt, save_options in targets:
+                buffer = BytesIO()
+                frame = resized if target_fmt != 'JPEG' else resized.convert('RGB')
+                frame.save(buffer, target_fmt, **save_options)
+                saved.append(self._store(derived_name(name, width, target_ext), buffer.getvalue()))
+        return saved
+
+    def _store(self, name, data):
+        content = ContentFile(data)
+        hashed = self.hashed_name(name, content)
+        if self.exists(hashed):
+            self.delete(hashed)
+        self._save(hashed, content)
+        self.hashed_files[self.hash_key(name)] = hashed
+        return name, hashed
+
+    def _compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+            return
+        path = Path(self.path(name))
+        if not path.is_file():
+            return
+        data = path.read_bytes()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+        brotli = _brotli()
+        if brotli:
+            variants['.br'] = brotli.compress(data)
+        for suffix, compressed in variants.items():
+            # Only worth a lookup at request time if it actually saves bytes
+            if len(compressed) < len(data) * 0.95:
+                path.with_name(path.name + suffix).write_bytes(compressed)
+
+
+def _accepted(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        token, _, params = part.strip().partition(';')
+        if token and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            accepted.add(token.lower())
+    return accepted
+
+
+class StaticFile:
+    """One collected file and its precompressed siblings."""
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        self.cache_control = IMMUTABLE_CACHE if immutable else MUTABLE_CACHE
+        self.variants = {
+            token: path.with_name(path.name + suffix)
+            for token, suffix in ENCODINGS
+            if path.with_name(path.name + suffix).is_file()
+        }
+
+    def choose(self, request):
+        """``(path, encoding or None)`` of the smallest acceptable variant."""
+        accepted = _accepted(request)
+        for token, _ in ENCODINGS:
+            if token in self.variants and token in accepted:
+                return self.variants[token], token
+        return self.path, None
+
+
+class StaticFilesMiddleware:
+    """
+    Serves ``STATIC_URL`` from ``STATIC_ROOT`` ahead of the rest of the stack.
+
+    Put it right after ``SecurityMiddleware``. It steps aside under ``DEBUG``
+    (``runserver`` serves static files then) and when ``STATIC_URL`` points at
+    another host. A front-end server or CDN with the same headers is just as
+    good; this makes a bare ``uvicorn``/``gunicorn`` deployment correct.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT or not settings.STATIC_URL.startswith('/'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = Path(settings.STATIC_ROOT)
+        self._files = None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self._is_static(request):
+            return self.serve(request, stream=True)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self._is_static(request):
+            return await sync_to_async(self.serve)(request, stream=False)
+        return await self.get_response(request)
+
+    def _is_static(self, request):
+        return request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix)
+
+    @property
+    def files(self):
+        # Built on first use so startup stays cheap; collectstatic runs
+        # before a deploy restarts the process anyway.
+        if self._files is None:
+            from django.contrib.staticfiles.storage import staticfiles_storage
+
+            hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+            files = {}
+            for directory, _, names in os.walk(self.root):
+                for filename in names:
+                    if filename.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                        continue
+                    path = Path(directory) / filename
+                    name = path.relative_to(self.root).as_posix()
+                    files[name] = StaticFile(path, name in hashed)
+            self._files = files
+        return self._files
+
+    def serve(self, request, stream=True):
+        static_file = self.files.get(request.path_info[len(self.prefix):])
+        if static_file is None:
+            return HttpResponse('Not found', status=404, content_type='text/plain')
+
+        path, encoding = static_file.choose(request)
+        stat = path.stat()
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}{"-" + encoding if encoding else ""}"'
+        response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+        if response is None:
+            if stream:
+                response = FileResponse(path.open('rb'), content_type=static_file.content_type)
+                del response['Content-Disposition']
+            else:
+                response = HttpResponse(path.read_bytes(), content_type=static_file.content_type)
+            response['Content-Length'] = stat.st_size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = static_file.cache_control
+        if static_file.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,177 @@
+"""
+Stocktakes with offline scanning.
+
+The scanning page downloads a compact manifest of the assets expected in a
+department (its sub-units included) once, records scans in the browser while
+offline, and uploads them in gzip-compressed batches. Each batch is
+reconciled in one transaction with a fixed number of queries, however many
+scans it holds:
+
+* found: the asset belongs to the department and, when a room was scanned,
+  is in that room;
+* misplaced: it belongs elsewhere or sits in another room; an
+  ``AssetMovement`` is written and the asset moved to where it was found;
+* unknown: no asset has the scanned serial number;
+* missing: on completion, every expected asset that was never scanned.
+
+Tags are matched on the canonical serial number and each counts once per
+stocktake, so re-sending a batch after a dropped connection is harmless.
+"""
+import json
+import zlib
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import audit, events, metrics, relocation
+from .models import Asset, AssetMovement, Department, Room, Stocktake, StocktakeScan, canonical_serial
+
+MANIFEST_COLUMNS = ('id', 'serial_number', 'name', 'room')
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+MAX_BATCH_SCANS = 20000
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+class StocktakeClosed(Exception):
+    pass
+
+
+def expected_assets(stocktake):
+    """Assets the stocktake should find: the department's and its sub-units', not disposed."""
+    return Asset.objects.filter(stocktake.department.subtree_filter('department__')).exclude(status='Disposed')
+
+
+def manifest(stocktake):
+    """Everything the scanning page needs offline, as flat rows."""
+    rows = list(
+        expected_assets(stocktake).order_by('serial_number').values_list(*MANIFEST_COLUMNS).iterator(chunk_size=2000)
+    )
+    # Rooms of every building the department's assets are in, to pick from
+    buildings = Room.objects.filter(id__in={room for *_, room in rows if room}).values('building_id')
+    rooms = Room.objects.filter(building_id__in=buildings).select_related('building').order_by('building__name', 'name')
+    return {
+        'stocktake': stocktake.pk,
+        'department': stocktake.department.name,
+        'completed': stocktake.completed_at is not None,
+        'generated_at': timezone.now().isoformat(),
+        'columns': list(MANIFEST_COLUMNS),
+        'assets': [list(row) for row in rows],
+        'rooms': [[room.pk, str(room)] for room in rooms],
+        'scanned': list(stocktake.scans.exclude(result='missing').values_list('serial_number', flat=True)),
+    }
+
+
+def read_batch(body, content_encoding=''):
+    """``(scans, complete)`` from an upload; scans are ``(serial, room_id, scanned_at)``."""
+    if content_encoding.lower() == 'gzip':
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            body = decompressor.decompress(body, MAX_BATCH_BYTES)
+        except zlib.error:
+            raise InvalidBatch("The batch is not valid gzip.")
+        if decompressor.unconsumed_tail:
+            raise InvalidBatch("The batch is too large once decompressed.")
+    try:
+        payload = json.loads(body or b'null')
+    except ValueError:
+        raise InvalidBatch("The batch must be JSON.")
+    if not isinstance(payload, dict) or not isinstance(payload.get('scans', []), list):
+        raise InvalidBatch("Send {\"scans\": [[serial, room, scanned_at], ...], \"complete\": false}.")
+    if len(payload.get('scans', [])) > MAX_BATCH_SCANS:
+        raise InvalidBatch(f"At most {MAX_BATCH_SCANS} scans per batch.")
+
+    now = timezone.now()
+    scans = []
+    for position, scan in enumerate(payload.get('scans', [])):
+        if not isinstance(scan, list) or len(scan) != 3 or not isinstance(scan[0], str) or not scan[0].strip():
+            raise InvalidBatch(f"Scan {position} is not [serial, room, scanned_at].")
+        serial, room, scanned_at = scan
+        if room is not None and not isinstance(room, int):
+            raise InvalidBatch(f"Scan {position} has a room that is not an id.")
+        when = parse_datetime(scanned_at) if isinstance(scanned_at, str) else None
+        if when is None:
+            when = now
+        elif timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        scans.append((serial.strip(), room, min(when, now)))
+    return scans, bool(payload.get('complete'))
+
+
+def summary(stocktake):
+    """Scans recorded so far, per result."""
+    counts = dict.fromkeys((value for value, _ in StocktakeScan.RESULT_CHOICES), 0)
+    counts.update(stocktake.scans.order_by().values_list('result').annotate(total=Count('id')))
+    return counts
+
+
+def reconcile(stocktake, scans, user, complete=False):
+    """
+    Record a batch of scans, move misplaced assets and, with ``complete``,
+    mark everything expected but unscanned as missing and close the
+    stocktake. Returns the movements written.
+    """
+    with transaction.atomic():
+        # Serialises concurrent uploads for the same stocktake
+        stocktake = Stocktake.objects.select_for_update().select_related('department').get(pk=stocktake.pk)
+        if stocktake.completed_at is not None:
+            raise StocktakeClosed(f"{stocktake} was completed on {stocktake.completed_at:%Y-%m-%d %H:%M}.")
+
+        # Tags are matched on the canonical serial, so "ab-12" finds AB12
+        already = {canonical_serial(serial) for serial in stocktake.scans.values_list('serial_number', flat=True)}
+        fresh = {}
+        for serial, room, scanned_at in scans:
+            canonical = canonical_serial(serial)
+            if canonical and canonical not in already and canonical not in fresh:
+                fresh[canonical] = (serial, room, scanned_at)
+
+        assets = Asset.objects.in_bulk(list(fresh), field_name='serial_canonical')
+        scanned_rooms = {room for _, room, _ in fresh.values() if room}
+        rooms = set(Room.objects.filter(id__in=scanned_rooms).values_list('id', flat=True))
+        departments = Department.objects.subtree(stocktake.department).in_bulk()
+
+        records, movements = [], []
+        for canonical, (serial, room, scanned_at) in fresh.items():
+            room = room if room in rooms else None
+            asset = assets.get(canonical)
+            record = StocktakeScan(stocktake=stocktake, asset=asset, serial_number=serial,
+                                   room_id=room, scanned_at=scanned_at, result='found')
+            if asset is None:
+                record.result = 'unknown'
+            elif asset.department_id not in departments or (room and room != asset.room_id):
+                record.result = 'misplaced'
+                movements.append(AssetMovement(
+                    asset=asset,
+                    from_department_id=asset.department_id,
+                    to_department=departments.get(asset.department_id, stocktake.department),
+                    from_room_id=asset.room_id,
+                    to_room_id=room or asset.room_id,
+                    moved_by=user,
+                    remarks=f"Found during stocktake #{stocktake.pk}",
+                ))
+            records.append(record)
+
+        if movements:
+            # One INSERT and one UPDATE per destination, not two queries per asset
+            relocation.record_movements(movements)
+        StocktakeScan.objects.bulk_create(records)
+
+        if complete:
+            scanned = StocktakeScan.objects.filter(stocktake=stocktake, asset__isnull=False).values('asset_id')
+            StocktakeScan.objects.bulk_create(
+                StocktakeScan(stocktake=stocktake, asset_id=pk, serial_number=serial, result='missing')
+                for pk, serial in expected_assets(stocktake).exclude(id__in=scanned).values_list('id', 'serial_number')
+                .iterator(chunk_size=2000)
+            )
+            stocktake.completed_at = timezone.now()
+            stocktake.save(update_fields=['completed_at'])
+
+    for movement in movements:
+        audit.record(user, 'create', movement, audit.diff({}, audit.snapshot(movement)), asset=movement.asset)
+        events.movement_recorded(movement)
+    metrics.business_event('movement', len(movements))
+    return movements
@@ -0,0 +1,68 @@
+import os
+import re
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+# Written by CompressedManifestStaticFilesStorage (assets/static_pipeline.py)
+DERIVED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<width>\d+)w\.(?P<ext>webp|png|jpe?g)$')
+
+_variants = {'source': None, 'index': {}}
+
+
+def variants(name):
+    """
+    ``(webp, fallback)`` srcset candidates for a collected image, each a list
+    of ``(width, name)``; both empty when no derivatives were built.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if settings.DEBUG or not hashed_files:
+        return [], []
+    if _variants['source'] is not hashed_files:
+        index = {}
+        for key in hashed_files:
+            match = DERIVED_NAME.match(key)
+            if match:
+                index.setdefault(match['stem'], []).append((int(match['width']), match['ext'], key))
+        _variants.update(source=hashed_files, index=index)
+
+    stem, ext = os.path.splitext(name)
+    entries = sorted(_variants['index'].get(stem, []))
+    webp = [(width, key) for width, kind, key in entries if kind == 'webp']
+    resized = {width: key for width, kind, key in entries if '.' + kind == ext.lower()}
+    # The widest WebP is full size; its fallback is the original file
+    fallback = [(width, resized.get(width, name)) for width, _ in webp]
+    return webp, fallback
+
+
+def _srcset(candidates):
+    return ', '.join(f'{static(key)} {width}w' for width, key in candidates)
+
+
+@register.simple_tag
+def responsive_image(name, alt='', sizes='100vw', **attrs):
+    """
+    ``<picture>`` with WebP and resized candidates for a static image.
+
+        {% responsive_image 'images/logo.png' alt='Logo' sizes='40px' class='rounded-circle' %}
+
+    Falls back to a plain ``<img>`` until ``collectstatic`` has built the
+    derivatives (and always under ``DEBUG``).
+    """
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    extra = format_html_join('', ' {}="{}"', ((key.replace('_', '-'), value) for key, value in attrs.items()))
+
+    webp, fallback = variants(name)
+    if not webp:
+        return format_html('<img src="{}" alt="{}"{}>', static(name), alt, extra)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        _srcset(webp), sizes, static(name), _srcset(fallback), sizes, alt, extra,
+    )
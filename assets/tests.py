@@ -1,3 +1,1080 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    archive, asset_index, audit, changefeed, dedup, pagination, purge, ratelimit, singleflight, spatial, stocktake,
+    utilization, valuation,
+)
+from .models import (
+    AppendOnlyError, ApiToken, Asset, AssetCategory, AssetMovement, AuditEvent, Building, Campus, ChangeTombstone,
+    CheckoutSession, Department, DepartmentAccess, HistoryArchive, MaintenanceRecord, Room, Stocktake,
+    canonical_serial,
+)
+
+# Pages render without running collectstatic first
+PLAIN_STATIC = {**settings.STORAGES, 'staticfiles': {
+    'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+}}
+
+
+def report_stat(response, label):
+    """A figure from one of the stat cards of the reports page."""
+    found = re.search(rf'{re.escape(label)}</h5>\s*<div class="stat-number">(\d+)</div>', response.content.decode())
+    return int(found.group(1))
+
+
+def make_asset(name, serial, department=None, **fields):
+    fields.setdefault('purchase_date', date(2024, 1, 1))
+    return Asset.objects.create(name=name, serial_number=serial, department=department, **fields)
+
+
+# -------------------------------
+# Valuation
+# -------------------------------
+class BookValueTests(TestCase):
+    # 1461 days is exactly four years of DAYS_PER_YEAR
+    AS_OF = 10_000
+
+    def value(self, method, cost, salvage, life, age_days):
+        values = valuation.book_values(
+            np.array([self.AS_OF - age_days]), np.array([float(cost)]), np.array([float(salvage)]),
+            np.array([float(life)]), np.array([method], dtype=np.int8), self.AS_OF,
+        )
+        return float(values[0])
+
+    def test_straight_line(self):
+        straight = valuation.METHOD_STRAIGHT_LINE
+        # 10000 - 9000 * 4/5
+        self.assertAlmostEqual(self.value(straight, 10_000, 1_000, 5, 1461), 2_800)
+        self.assertAlmostEqual(self.value(straight, 10_000, 1_000, 5, 0), 10_000)
+        # Past the useful life it stays at salvage
+        self.assertAlmostEqual(self.value(straight, 10_000, 1_000, 5, 2 * 1461), 1_000)
+        # Salvage above cost is capped at cost, so nothing is written off
+        self.assertAlmostEqual(self.value(straight, 10_000, 20_000, 5, 1461), 10_000)
+
+    def test_double_declining_balance(self):
+        declining = valuation.METHOD_DECLINING_BALANCE
+        # Rate 2/5: 10000 * 0.6 ** 4
+        self.assertAlmostEqual(self.value(declining, 10_000, 500, 5, 1461), 1_296)
+        # Rate 2/10: 10000 * 0.8 ** 4
+        self.assertAlmostEqual(self.value(declining, 10_000, 500, 10, 1461), 4_096)
+        # Never below salvage, and exactly salvage once the life is over
+        self.assertAlmostEqual(self.value(declining, 10_000, 2_000, 5, 1461), 2_000)
+        self.assertAlmostEqual(self.value(declining, 10_000, 500, 4, 1461), 500)
+
+    def test_no_depreciation_and_future_purchases(self):
+        self.assertAlmostEqual(self.value(valuation.METHOD_NONE, 10_000, 1_000, 5, 1461), 10_000)
+        self.assertEqual(self.value(valuation.METHOD_STRAIGHT_LINE, 10_000, 1_000, 5, -30), 0)
+
+
+class ValuationReportTests(TestCase):
+    AS_OF = date(2024, 1, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Department.objects.create(name='Science')
+        cls.library = Department.objects.create(name='Library')
+        cls.laptops = AssetCategory.objects.create(
+            name='Laptops', default_useful_life_years=5, default_salvage_percent=10,
+        )
+        four_years_ago = date(2020, 1, 1)
+        # Category defaults: salvage 10% of 10000, straight line over 5 years -> 2800
+        make_asset('Laptop', 'V-1', cls.science, category=cls.laptops,
+                   purchase_cost=10_000, purchase_date=four_years_ago)
+        make_asset('Microscope', 'V-2', cls.science, category=cls.laptops,
+                   purchase_cost=5_000, purchase_date=four_years_ago, depreciation_method='none')
+        # Own life and salvage, fully written off after four years
+        make_asset('Shelving', 'V-3', cls.library, purchase_cost=2_000,
+                   purchase_date=four_years_ago, useful_life_years=4, salvage_value=0)
+        # Not yet bought on AS_OF, and disposed: neither counts
+        make_asset('Projector', 'V-4', purchase_cost=1_000, purchase_date=date(2025, 1, 1))
+        make_asset('Old printer', 'V-5', cls.library, purchase_cost=800,
+                   purchase_date=four_years_ago, status='Disposed')
+
+    def test_by_department(self):
+        report = valuation.valuation_report('department', self.AS_OF)
+        self.assertEqual(report['asset_count'], 3)
+        self.assertEqual(report['purchase_cost'], 17_000)
+        self.assertEqual(report['book_value'], 7_800)
+        self.assertEqual(report['groups'], [
+            {'id': self.science.id, 'name': 'Science', 'asset_count': 2,
+             'purchase_cost': 15_000, 'book_value': 7_800, 'accumulated_depreciation': 7_200},
+            {'id': self.library.id, 'name': 'Library', 'asset_count': 1,
+             'purchase_cost': 2_000, 'book_value': 0, 'accumulated_depreciation': 2_000},
+        ])
+
+    def test_by_category(self):
+        groups = valuation.valuation_report('category', self.AS_OF)['groups']
+        self.assertEqual([(group['name'], group['asset_count'], group['book_value']) for group in groups], [
+            ('Laptops', 2, 7_800), ('Uncategorized', 1, 0),
+        ])
+        self.assertIsNone(groups[1]['id'])
+
+    def test_unassigned_department(self):
+        groups = valuation.valuation_report('department', date(2025, 6, 1))['groups']
+        self.assertIn('Unassigned', [group['name'] for group in groups])
+
+
+# -------------------------------
+# In-memory asset index
+# -------------------------------
+class AssetIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Department.objects.create(name='Science')
+        cls.library = Department.objects.create(name='Library')
+        cls.laptop = make_asset('Laptop', 'I-1', cls.science)
+        cls.microscope = make_asset('Microscope', 'I-2', cls.science, status='In Use')
+        cls.shelf = make_asset('Shelf', 'I-3', cls.library, condition='Poor')
+
+    def setUp(self):
+        self.index = asset_index.AssetIndex()
+        self.index.warm()
+
+    def test_warm_loads_every_asset(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.counts_by('status'), {'Available': 2, 'In Use': 1})
+        self.assertEqual(self.index.count(department=self.science.id), 2)
+        self.assertEqual(self.index.count(condition='Poor'), 1)
+        self.assertEqual(self.index.get(self.microscope.id).department, 'Science')
+
+    def test_filters_combine(self):
+        self.assertEqual(self.index.filter(department=self.science.id, status='In Use'), [self.microscope.id])
+        self.assertEqual(self.index.count(status=['Available', 'In Use']), 3)
+        self.assertEqual(self.index.count(status='Disposed'), 0)
+
+    def test_upsert_and_remove(self):
+        self.shelf.status = 'Disposed'
+        self.index.upsert_asset(self.shelf)
+        self.assertEqual(self.index.count(status='Disposed'), 1)
+        self.assertEqual(len(self.index), 3)
+
+        self.index.remove(self.laptop.id)
+        self.assertEqual(len(self.index), 2)
+        self.assertIsNone(self.index.get(self.laptop.id))
+        # The row moved into the freed slot is still found by its key
+        self.assertEqual(self.index.get(self.shelf.id).name, 'Shelf')
+
+    def test_clear_department(self):
+        self.index.clear_department(self.science.id)
+        self.assertEqual(self.index.count(department=self.science.id), 0)
+        self.assertEqual(self.index.get(self.laptop.id).department, 'Unassigned')
+        # The deleted department no longer counts as one
+        self.assertEqual(self.index.departments.live, 1)
+
+    def test_counts_by_department_keeps_namesakes_apart(self):
+        other_library = Department.objects.create(name='Library')
+        make_asset('Globe', 'I-4', other_library)
+        self.index.warm()
+        counts = self.index.counts_by('department')
+        self.assertEqual(counts, {self.science.id: 2, self.library.id: 1, other_library.id: 1})
+        self.assertEqual(self.index.labels('department', counts)[other_library.id], 'Library')
+        self.assertEqual(self.index.departments.live, 3)
+
+
+# -------------------------------
+# Keyset pagination
+# -------------------------------
+class KeysetPaginationTests(TestCase):
+    ordering = ('-date_moved', '-id')
+
+    @classmethod
+    def setUpTestData(cls):
+        asset = make_asset('Projector', 'PRJ-1')
+        moves = [AssetMovement.objects.create(asset=asset) for _ in range(7)]
+        # Ties on the date, and two rows within one millisecond
+        moment = timezone.make_aware(datetime(2025, 3, 1, 9, 30, 0, 123400))
+        stamps = [moment, moment, moment, moment + timedelta(microseconds=300),
+                  moment - timedelta(days=1), moment - timedelta(days=1), moment - timedelta(days=2)]
+        for move, stamp in zip(moves, stamps):
+            AssetMovement.objects.filter(pk=move.pk).update(date_moved=stamp)
+        cls.expected = list(AssetMovement.objects.order_by(*cls.ordering).values_list('pk', flat=True))
+
+    def pages(self, limit):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = pagination.keyset_page(AssetMovement.objects.all(), self.ordering, cursor, limit)
+            pages.append([row.pk for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_every_row_once_in_order(self):
+        for limit in range(1, 9):
+            with self.subTest(limit=limit):
+                pages = self.pages(limit)
+                self.assertEqual([pk for page in pages for pk in page], self.expected)
+                self.assertTrue(all(len(page) == limit for page in pages[:-1]))
+
+    def test_no_empty_last_page(self):
+        # 7 rows: a limit of exactly 7 is one page, not a page and an empty one
+        self.assertEqual(self.pages(7), [self.expected])
+        self.assertEqual(len(self.pages(8)), 1)
+
+    # Decodes fine but holds values the ordering fields cannot take
+    CRAFTED = (['x', 'abc'], [None, 1], [{}, 1], [[1], 1], ['2025-03-01T09:30:00+00:00', {}])
+
+    def test_invalid_cursors(self):
+        cursors = ['not-base64!', pagination.encode_cursor([1]), *map(pagination.encode_cursor, self.CRAFTED)]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(pagination.InvalidCursor):
+                pagination.keyset_page(AssetMovement.objects.all(), self.ordering, cursor)
+
+    def test_view_rejects_bad_cursor(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        for cursor in ('garbage', *map(pagination.encode_cursor, self.CRAFTED)):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('movement_rows'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+        first = self.client.get(reverse('movement_rows'), {'limit': 4}).json()
+        rest = self.client.get(reverse('movement_rows'), {'limit': 4, 'cursor': first['next']}).json()
+        self.assertEqual([row['id'] for row in first['rows'] + rest['rows']], self.expected)
+        self.assertIsNone(rest['next'])
+
+    def test_page_size_clamped(self):
+        self.assertEqual(pagination.page_size(None), pagination.DEFAULT_PAGE_SIZE)
+        self.assertEqual(pagination.page_size('0'), 1)
+        self.assertEqual(pagination.page_size('100000'), pagination.MAX_PAGE_SIZE)
+
+
+# -------------------------------
+# Audit trail
+# -------------------------------
+class AuditTrailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clerk', password='pw')
+        DepartmentAccess.objects.create(user=cls.user, department=None)
+        cls.laptop = make_asset('Laptop', 'AU-1')
+
+    def test_diff(self):
+        self.assertEqual(audit.diff({'a': 1, 'b': 2}, {'a': 1, 'b': 3}), {'b': [2, 3]})
+        self.assertEqual(audit.diff({}, {'a': 1}), {'a': [None, 1]})
+        self.assertEqual(audit.diff({'a': 1}, {}), {'a': [1, None]})
+
+    def test_outside_a_request_writes_straight_away(self):
+        audit.record(self.user, 'update', self.laptop, {'name': ['Old', 'Laptop']})
+        event = AuditEvent.objects.get()
+        self.assertEqual((event.actor_username, event.asset_id, event.object_type),
+                         ('clerk', self.laptop.id, 'asset'))
+
+    def test_events_are_append_only(self):
+        audit.record(None, 'create', self.laptop)
+        event = AuditEvent.objects.get()
+        self.assertEqual(event.actor_username, '')
+        with self.assertRaises(AppendOnlyError):
+            event.save()
+        with self.assertRaises(AppendOnlyError):
+            AuditEvent.objects.all().delete()
+
+    def test_checkout_is_recorded_once_per_request(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('checkout_asset', args=[self.laptop.id]))
+        event = AuditEvent.objects.get()
+        self.assertEqual(event.action, 'checkout')
+        self.assertEqual(event.changes['status'], ['Available', 'In Use'])
+        self.assertEqual(event.changes['current_user'], [None, 'clerk'])
+
+
+# -------------------------------
+# JSON API
+# -------------------------------
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('integration', password='pw')
+        DepartmentAccess.objects.create(user=cls.user, department=None)
+        _, cls.key = ApiToken.issue(cls.user, 'tests')
+        cls.science = Department.objects.create(name='Science')
+        cls.library = Department.objects.create(name='Library')
+        cls.laptops = AssetCategory.objects.create(name='Laptops')
+        cls.laptop = make_asset('Laptop', 'API-1', cls.science)
+
+    def call(self, method, name, payload=None, **params):
+        return getattr(self.client, method)(
+            reverse(name), params if payload is None else json.dumps(payload),
+            content_type='application/json', HTTP_AUTHORIZATION=f'Token {self.key}',
+        )
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get(reverse('api_assets')).status_code, 401)
+        response = self.client.get(reverse('api_assets'), HTTP_AUTHORIZATION='Token wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_bad_cursor(self):
+        for values in (['abc'], [None], [{}], [[1]], [1, 2]):
+            with self.subTest(cursor=values):
+                response = self.client.get(reverse('api_assets'), {'cursor': pagination.encode_cursor(values)},
+                                           HTTP_AUTHORIZATION=f'Token {self.key}')
+                self.assertEqual(response.status_code, 400)
+
+    def test_selected_fields(self):
+        response = self.client.get(reverse('api_assets'), {'fields': 'id,department_name'},
+                                   HTTP_AUTHORIZATION=f'Token {self.key}')
+        self.assertEqual(response.json()['results'], [{'id': self.laptop.id, 'department_name': 'Science'}])
+        response = self.client.get(reverse('api_assets'), {'fields': 'id,secret'},
+                                   HTTP_AUTHORIZATION=f'Token {self.key}')
+        self.assertEqual(response.status_code, 400)
+
+    def new_asset(self, serial, **fields):
+        return {'name': 'Projector', 'serial_number': serial, 'purchase_date': '2024-02-01',
+                'category': self.laptops.id, 'department': self.science.id, **fields}
+
+    def test_bulk_create_is_validated_as_a_whole(self):
+        response = self.call('post', 'api_assets', [
+            self.new_asset('API-2'),
+            self.new_asset('API-1'),
+            self.new_asset('API-2', purchase_date='yesterday'),
+            self.new_asset('API-3', department=999),
+            self.new_asset('API-4', date_added='now'),
+            self.new_asset('API-5', category=None),
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(sorted(errors), ['1', '2', '3', '4', '5'])
+        self.assertEqual(errors['1'], {'serial_number': ['Already in use.']})
+        self.assertIn('purchase_date', errors['2'])
+        self.assertEqual(errors['2']['serial_number'], ['Duplicate value in this batch.'])
+        self.assertEqual(errors['3'], {'department': ['Object does not exist.']})
+        self.assertEqual(errors['4'], {'date_added': ['This field is not writable.']})
+        self.assertEqual(errors['5'], {'category': ['This field is required.']})
+        # Nothing from a rejected batch is written
+        self.assertEqual(Asset.objects.count(), 1)
+
+    def test_bulk_create_and_update(self):
+        response = self.call('post', 'api_assets', [
+            self.new_asset('API-2'), self.new_asset('API-3', department=self.library.id),
+        ])
+        self.assertEqual(response.status_code, 201)
+        created = response.json()['created']
+        self.assertEqual(Asset.objects.filter(department=self.library).count(), 1)
+
+        response = self.call('patch', 'api_assets', [{'id': pk, 'condition': 'Fair'} for pk in created])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Asset.objects.filter(condition='Fair').count(), 2)
+        response = self.call('patch', 'api_assets', [{'id': 999, 'condition': 'Fair'}])
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_movements_move_the_assets(self):
+        response = self.call('post', 'api_movements', [
+            {'asset': self.laptop.id, 'from_department': self.science.id, 'to_department': self.library.id},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.laptop.refresh_from_db()
+        self.assertEqual(self.laptop.department, self.library)
+        self.assertEqual(AssetMovement.objects.get().moved_by, self.user)
+
+    def test_movement_destination_cannot_be_patched(self):
+        self.call('post', 'api_movements', [
+            {'asset': self.laptop.id, 'from_department': self.science.id, 'to_department': self.library.id},
+        ])
+        movement = AssetMovement.objects.get()
+        response = self.call('patch', 'api_movements', [{'id': movement.id, 'to_department': self.science.id}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('to_department', response.json()['errors']['0'])
+        response = self.call('patch', 'api_movements', [{'id': movement.id, 'remarks': 'Via the loading bay'}])
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_status_changes_open_and_end_checkouts(self):
+        response = self.call('post', 'api_assets', [self.new_asset('API-2', status='In Use')])
+        created = response.json()['created'][0]
+        self.assertEqual(CheckoutSession.objects.get(ended_at__isnull=True).asset_id, created)
+
+        self.call('patch', 'api_assets', [{'id': self.laptop.id, 'status': 'In Use'}])
+        self.assertEqual(CheckoutSession.objects.filter(ended_at__isnull=True).count(), 2)
+        self.call('patch', 'api_assets', [{'id': created, 'status': 'Available'}])
+        session = CheckoutSession.objects.get(asset_id=created)
+        self.assertIsNotNone(session.ended_at)
+        self.assertEqual(session.user, self.user)
+
+    def test_bulk_maintenance_loads_assets_once(self):
+        assets = [make_asset('Laptop', f'API-M{n}', self.science) for n in range(5)]
+
+        def record(asset):
+            return {'asset': asset.id, 'issue_reported': 'Fan', 'maintenance_date': '2025-01-02',
+                    'performed_by': 'IT'}
+        with CaptureQueriesContext(connection) as one:
+            self.call('post', 'api_maintenance_records', [record(assets[0])])
+        with CaptureQueriesContext(connection) as five:
+            self.call('post', 'api_maintenance_records', [record(asset) for asset in assets])
+        self.assertEqual(len(five), len(one))
+
+
+
+# -------------------------------
+# Change feed
+# -------------------------------
+class ChangeFeedTests(TestCase):
+    def changes(self, since, limit=changefeed.DEFAULT_BATCH_SIZE):
+        return changefeed.changes_since(since, limit)
+
+    def test_saves_and_deletes(self):
+        start = changefeed.current_cursor()
+        asset = make_asset('Kettle', 'KTL-1')
+        move = AssetMovement.objects.create(asset=asset)
+        move_pk = move.pk
+        move.delete()
+        changes, cursor, has_more = self.changes(start)
+        self.assertFalse(has_more)
+        self.assertEqual(
+            [(change['type'], change['id'], change['op']) for change in changes],
+            [('asset', asset.pk, 'upsert'), ('movement', move_pk, 'delete')],
+        )
+        self.assertEqual(changes[0]['data']['serial_number'], 'KTL-1')
+        # Nothing new after the cursor
+        self.assertEqual(self.changes(cursor), ([], cursor, False))
+
+    def test_hard_delete_of_asset_leaves_tombstones(self):
+        asset = make_asset('Kettle', 'KTL-1')
+        repair = MaintenanceRecord.objects.create(
+            asset=asset, issue_reported='Leak', maintenance_date=date.today(), performed_by='Estates',
+        )
+        start = changefeed.current_cursor()
+        Asset.all_objects.filter(pk=asset.pk).delete()
+        changes, _, _ = self.changes(start)
+        self.assertEqual(
+            {(change['type'], change['id']) for change in changes if change['op'] == 'delete'},
+            {('asset', asset.pk), ('maintenance', repair.pk)},
+        )
+        self.assertEqual(ChangeTombstone.objects.filter(seq__gt=start).count(), 2)
+
+    def test_batch_never_splits_a_sequence_number(self):
+        for n in range(3):
+            make_asset(f'Chair {n}', f'CHR-{n}')
+        start = changefeed.current_cursor()
+        # One bulk write: one shared sequence number
+        changefeed.stamp_queryset(Asset.objects.all(), condition='Fair')
+        make_asset('Desk', 'DSK-1')
+
+        changes, cursor, has_more = self.changes(start, limit=1)
+        self.assertEqual(len(changes), 3)
+        self.assertEqual({change['seq'] for change in changes}, {cursor})
+        self.assertTrue(has_more)
+        changes, cursor, has_more = self.changes(cursor, limit=1)
+        self.assertEqual([change['data']['name'] for change in changes], ['Desk'])
+        self.assertFalse(has_more)
+
+
+# -------------------------------
+# Department hierarchy
+# -------------------------------
+class DepartmentTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Department.objects.create(name='Faculty of Science')
+        cls.physics = Department.objects.create(name='Physics', parent=cls.science)
+        cls.optics = Department.objects.create(name='Optics Lab', parent=cls.physics)
+        cls.arts = Department.objects.create(name='Faculty of Arts')
+
+    def names(self, department):
+        return set(Department.objects.subtree(department).values_list('name', flat=True))
+
+    def test_paths(self):
+        self.assertEqual(self.optics.depth, 2)
+        self.assertEqual(self.optics.ancestor_ids, [self.science.id, self.physics.id])
+        self.assertEqual(self.names(self.science), {'Faculty of Science', 'Physics', 'Optics Lab'})
+        self.assertEqual(self.names(self.arts), {'Faculty of Arts'})
+
+    def test_move_re_roots_the_subtree(self):
+        self.physics.parent = self.arts
+        self.physics.save()
+        self.optics.refresh_from_db()
+        self.assertEqual(self.optics.ancestor_ids, [self.arts.id, self.physics.id])
+        self.assertEqual(self.names(self.science), {'Faculty of Science'})
+        self.assertEqual(self.names(self.arts), {'Faculty of Arts', 'Physics', 'Optics Lab'})
+
+        # And back up to the top level
+        self.physics.parent = None
+        self.physics.save()
+        self.optics.refresh_from_db()
+        self.assertEqual(self.optics.depth, 1)
+        self.assertEqual(self.names(self.physics), {'Physics', 'Optics Lab'})
+
+    def test_cycles_refused(self):
+        self.science.parent = self.optics
+        with self.assertRaises(ValidationError):
+            self.science.clean()
+        with self.assertRaises(ValidationError):
+            self.science.save()
+        self.science.refresh_from_db()
+        self.assertIsNone(self.science.parent)
+
+
+# -------------------------------
+# Utilization
+# -------------------------------
+class HoursInUseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.start = timezone.make_aware(datetime(2025, 3, 3, 8, 0))
+        cls.end = cls.start + timedelta(hours=10)
+        cls.science = Department.objects.create(name='Science')
+        cls.library = Department.objects.create(name='Library')
+        microscope = make_asset('Microscope', 'UT-1', cls.science)
+        scanner = make_asset('Scanner', 'UT-2', cls.library)
+
+        def session(asset, starts, ends=None):
+            started_at = cls.start + timedelta(hours=starts)
+            ended_at = None if ends is None else cls.start + timedelta(hours=ends)
+            CheckoutSession.objects.create(
+                asset=asset, started_at=started_at, ended_at=ended_at,
+                seconds=None if ends is None else int((ended_at - started_at).total_seconds()),
+            )
+
+        session(microscope, 1, 3)      # inside: 2h
+        session(microscope, -5, 2)     # crosses the start: 2h of it
+        session(microscope, 8, 12)     # crosses the end: 2h of it
+        session(microscope, -10, -6)   # before the window
+        session(microscope, 11, 13)    # after it
+        session(scanner, 9)            # still open
+
+    def test_sessions_are_clipped_to_the_window(self):
+        now = self.end + timedelta(hours=10)
+        self.assertEqual(
+            utilization.hours_in_use('department_id', self.start, self.end, now),
+            {self.science.id: (3, 6.0), self.library.id: (1, 1.0)},
+        )
+
+    def test_open_sessions_run_until_now(self):
+        now = self.start + timedelta(hours=9, minutes=30)
+        used = utilization.hours_in_use('department_id', self.start, self.end, now)
+        self.assertEqual(used[self.library.id], (1, 0.5))
+
+
+# -------------------------------
+# Locations
+# -------------------------------
+class SpatialTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        campus = Campus.objects.create(name='Main', latitude=51.5, longitude=-0.1)
+        building = Building.objects.create(campus=campus, name='Science Block', latitude=51.5, longitude=-0.1)
+        north = 100 / spatial.METRES_PER_DEGREE
+        cls.inherited = Room.objects.create(building=building, name='G01')
+        cls.near = Room.objects.create(building=building, name='101', latitude=51.5 + north, longitude=-0.1)
+        cls.far = Room.objects.create(building=building, name='Annex', latitude=51.5 + 10 * north, longitude=-0.1)
+        cls.bench = make_asset('Bench', 'SP-1', room=cls.inherited)
+        cls.scope = make_asset('Telescope', 'SP-2', room=cls.near)
+        make_asset('Kiln', 'SP-3', room=cls.far)
+        make_asset('Unplaced', 'SP-4')
+
+    def test_box_around(self):
+        degree = spatial.METRES_PER_DEGREE
+        for got, expected in zip(spatial.box_around(0, 0, degree), (-1, -1, 1, 1)):
+            self.assertAlmostEqual(got, expected)
+        # Longitude degrees shrink with latitude: cos(60) = 0.5
+        south, west, north, east = spatial.box_around(60, 10, degree)
+        self.assertAlmostEqual(north - south, 2)
+        self.assertAlmostEqual(east - west, 4)
+        # Clamped at the poles
+        self.assertEqual(spatial.box_around(89.5, 0, degree)[2], 90.0)
+
+    def test_rooms_within_radius(self):
+        rooms = spatial.rooms_within(51.5, -0.1, 500)
+        self.assertEqual(set(rooms), {self.inherited.id, self.near.id})
+        self.assertAlmostEqual(rooms[self.inherited.id], 0)
+        self.assertAlmostEqual(rooms[self.near.id], 100, places=3)
+        self.assertEqual(len(spatial.rooms_within(51.5, -0.1, 5_000)), 3)
+
+    def test_radius_view_nearest_first(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('location_assets'), {'lat': 51.5, 'lon': -0.1, 'radius': 500})
+        self.assertEqual([row['name'] for row in response.json()['assets']], ['Bench', 'Telescope'])
+        response = self.client.get(reverse('location_assets'), {'lat': 51.5, 'lon': 'west', 'radius': 500})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('location_assets'), {'bbox': '52,0,51,1'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_radius_must_be_positive_and_bounded(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        for radius in ('0', '-500', '1e9', 'nan', 'inf'):
+            with self.subTest(radius=radius):
+                response = self.client.get(reverse('location_assets'), {'lat': 51.5, 'lon': -0.1, 'radius': radius})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], "lat, lon and radius (metres) must be numbers.")
+
+
+# -------------------------------
+# Stocktakes
+# -------------------------------
+class StocktakeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('auditor', password='pw')
+        cls.science = Department.objects.create(name='Science')
+        physics = Department.objects.create(name='Physics', parent=cls.science)
+        cls.library = Department.objects.create(name='Library')
+        building = Building.objects.create(campus=Campus.objects.create(name='Main'), name='Science Block')
+        cls.lab = Room.objects.create(building=building, name='Lab 1')
+        cls.store = Room.objects.create(building=building, name='Store')
+        cls.oscilloscope = make_asset('Oscilloscope', 'ST-1', physics, room=cls.lab)
+        cls.balance = make_asset('Balance', 'ST-2', cls.science, room=cls.lab)
+        cls.atlas = make_asset('Atlas', 'ST-3', cls.library, room=cls.store)
+        cls.centrifuge = make_asset('Centrifuge', 'ST-4', cls.science)
+        make_asset('Old centrifuge', 'ST-5', cls.science, status='Disposed')
+        cls.take = Stocktake.objects.create(department=cls.science, started_by=cls.user)
+
+    def test_reconcile(self):
+        scans = [
+            ('ST-1', self.lab.id, timezone.now()),
+            ('ST-1', self.store.id, timezone.now()),   # second scan of the same tag: ignored
+            ('ST-2', self.store.id, timezone.now()),   # right department, wrong room
+            ('ST-3', self.lab.id, timezone.now()),     # another department's asset
+            ('NOPE', None, timezone.now()),
+        ]
+        movements = stocktake.reconcile(self.take, scans, self.user)
+        self.assertEqual(len(movements), 2)
+        # Re-sending the batch changes nothing; completing marks the rest missing
+        self.assertEqual(stocktake.reconcile(self.take, scans, self.user, complete=True), [])
+        self.assertEqual(stocktake.summary(self.take), {'found': 1, 'misplaced': 2, 'unknown': 1, 'missing': 1})
+        results = dict(self.take.scans.values_list('serial_number', 'result'))
+        self.assertEqual(results, {
+            'ST-1': 'found', 'ST-2': 'misplaced', 'ST-3': 'misplaced', 'NOPE': 'unknown', 'ST-4': 'missing',
+        })
+
+        # Misplaced assets are moved to where they were found
+        self.balance.refresh_from_db()
+        self.assertEqual((self.balance.department, self.balance.room), (self.science, self.store))
+        self.atlas.refresh_from_db()
+        self.assertEqual((self.atlas.department, self.atlas.room), (self.science, self.lab))
+        self.assertEqual(AssetMovement.objects.filter(asset=self.atlas, from_department=self.library).count(), 1)
+
+        with self.assertRaises(stocktake.StocktakeClosed):
+            stocktake.reconcile(self.take, scans, self.user)
+
+    def test_read_batch(self):
+        body = json.dumps({'scans': [[' ST-1 ', self.lab.id, '2025-03-01T10:00:00'], ['ST-2', None, None]],
+                           'complete': True}).encode()
+        scans, complete = stocktake.read_batch(gzip.compress(body), 'gzip')
+        self.assertTrue(complete)
+        self.assertEqual([(serial, room) for serial, room, _ in scans], [('ST-1', self.lab.id), ('ST-2', None)])
+        for bad in (b'[]', b'{"scans": [["ST-1", "Lab 1", null]]}', gzip.compress(b'{}')[:-4] + b'xxxx'):
+            with self.subTest(body=bad), self.assertRaises(stocktake.InvalidBatch):
+                stocktake.read_batch(bad, 'gzip' if bad.startswith(b'\x1f\x8b') else '')
+
+
+
+# -------------------------------
+# Serial numbers
+# -------------------------------
+class CanonicalSerialTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.laptop = make_asset('Laptop', 'AB-12 34')
+
+    def test_canonical_form(self):
+        self.assertEqual(canonical_serial(' ab-12 3 '), 'AB123')
+        self.assertEqual(canonical_serial('ＡＢ/１２'), 'AB12')
+        self.assertIsNone(canonical_serial(' - '))
+        self.assertEqual(self.laptop.serial_canonical, 'AB1234')
+
+    def test_clash_refused_by_clean(self):
+        for serial in ('ab1234', ' AB 12-34 ', 'Ab_12/34'):
+            with self.subTest(serial=serial), self.assertRaises(ValidationError) as caught:
+                Asset(name='Other', serial_number=serial, purchase_date=date(2024, 1, 1)).full_clean()
+            self.assertIn('serial_number', caught.exception.message_dict)
+
+    def test_clash_refused_by_database(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            make_asset('Other', 'ab1234')
+
+    def test_editing_itself_is_fine(self):
+        self.laptop.name = 'Laptop, renamed'
+        self.laptop.clean()
+
+    def test_deleted_asset_still_reserves_its_serial(self):
+        self.laptop.soft_delete()
+        with self.assertRaisesMessage(ValidationError, 'deleted, awaiting purge'):
+            Asset(name='Other', serial_number='AB1234', purchase_date=date(2024, 1, 1)).full_clean()
+
+    def test_add_form_shows_the_clash(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        with override_settings(STORAGES=PLAIN_STATIC):
+            response = self.client.post(reverse('add_asset'), {
+                'name': 'Other', 'serial_number': 'ab 1234', 'purchase_date': '2024-01-01',
+                'condition': 'Good', 'status': 'Available', 'depreciation_method': '',
+            })
+        self.assertEqual(response.status_code, 200)
+
+
+class DuplicateFinderTests(TestCase):
+    def test_edit_similarity(self):
+        encoded = dedup.encode(['KITTEN', 'ABCD', 'ABC', 'SITTING', 'ABDC', ''])
+        scores = dedup.edit_similarity(encoded, np.array([0, 1, 2, 2]), np.array([3, 4, 2, 5]))
+        # 3 edits over 7 characters; a swap is 2 edits over 4; identical; against nothing
+        for got, expected in zip(scores, (1 - 3 / 7, 0.5, 1.0, 0.0)):
+            self.assertAlmostEqual(float(got), expected, places=6)
+
+    def test_find_clusters(self):
+        serials = ['LAB0001234', 'LAB0001234', 'LAB0001235', 'LABO001234', '', 'HPZ840WS', 'HPZ84OVS']
+        names = ['Laptop', 'Laptop (spare)', 'Monitor', 'Dock', 'Projector',
+                 'HP Z840 Workstation', 'HP Z840 workstation']
+        self.assertEqual(dedup.find_clusters(serials, names, [0, 1, 2, 3, 4, 5, 5]), [
+            # Same tag twice, and a letter O typed for a zero; the next tag
+            # along (...235) is a different asset
+            ([0, 1, 3], 1.0, ['same serial', 'similar serial']),
+            # Two characters apart (score 0.75) but the same name in one block
+            ([5, 6], 0.75, ['similar name']),
+        ])
+        # Names only pair within a block
+        self.assertEqual(dedup.find_clusters(serials[5:], names[5:], [5, 6]), [])
+
+    def test_duplicate_assets(self):
+        first = make_asset('Laptop', 'LAB0001234')
+        typo = make_asset('Laptop', 'LABO001234')
+        make_asset('Monitor', 'LAB0001235')
+        # Same name, category, department and purchase date too
+        self.assertEqual(dedup.duplicate_assets(), [([first.id, typo.id], 0.9, ['similar name', 'similar serial'])])
+
+
+# -------------------------------
+# Department access
+# -------------------------------
+@override_settings(STORAGES=PLAIN_STATIC)
+class AccessScopingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Department.objects.create(name='Science')
+        cls.chemistry = Department.objects.create(name='Chemistry', parent=cls.science)
+        cls.library = Department.objects.create(name='Library')
+        cls.own = make_asset('Fume hood', 'CHEM-1', cls.chemistry)
+        cls.other = make_asset('Book scanner', 'LIB-1', cls.library)
+        cls.other_move = AssetMovement.objects.create(asset=cls.other, to_department=cls.library)
+        cls.other_repair = MaintenanceRecord.objects.create(
+            asset=cls.other, issue_reported='Jammed', maintenance_date=date.today(), performed_by='ICT',
+        )
+        cls.user = User.objects.create_user('scientist', password='pw')
+        # A grant covers the departments below it
+        DepartmentAccess.objects.create(user=cls.user, department=cls.science)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_visible_asset(self):
+        self.assertEqual(self.client.get(reverse('asset_detail', args=[self.own.pk])).status_code, 200)
+
+    def test_other_departments_are_not_found(self):
+        for name, pk in (
+            ('asset_detail', self.other.pk), ('edit_asset', self.other.pk), ('delete_asset', self.other.pk),
+            ('edit_movement', self.other_move.pk), ('delete_movement', self.other_move.pk),
+            ('edit_maintenance', self.other_repair.pk), ('delete_maintenance', self.other_repair.pk),
+        ):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name, args=[pk])).status_code, 404)
+
+    def test_api_detail_not_found(self):
+        _, key = ApiToken.issue(self.user, 'tests')
+        auth = {'HTTP_AUTHORIZATION': f'Token {key}'}
+        self.assertEqual(self.client.get(f'/api/v1/assets/{self.own.pk}/', **auth).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/v1/assets/{self.other.pk}/', **auth).status_code, 404)
+        self.assertEqual(self.client.get(f'/api/v1/movements/{self.other_move.pk}/', **auth).status_code, 404)
+        # The change feed is a full export
+        self.assertEqual(self.client.get('/api/v1/changes/', **auth).status_code, 403)
+
+    def test_lists_leave_other_departments_out(self):
+        self.assertEqual(self.client.get(reverse('movement_rows')).json()['rows'], [])
+        self.assertEqual(self.client.get(reverse('maintenance_rows')).json()['rows'], [])
+
+    def test_cannot_move_an_invisible_asset(self):
+        response = self.client.post(reverse('add_movement'), {
+            'asset': self.other.pk, 'from_department': self.library.pk, 'to_department': self.chemistry.pk,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AssetMovement.objects.filter(asset=self.other, to_department=self.chemistry).exists())
+
+
+
+
+# -------------------------------
+# Rate limiting and request coalescing
+# -------------------------------
+@override_settings(RATE_LIMITS={'reports': (60, 2)})
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.other = User.objects.create_superuser('admin2', 'admin2@example.com', 'pw')
+
+    def setUp(self):
+        caches[ratelimit.CACHE_ALIAS].clear()
+
+    def test_burst_then_429(self):
+        self.client.force_login(self.user)
+        url = reverse('valuation_report', args=['department'])
+        self.assertEqual([self.client.get(url).status_code for _ in range(2)], [200, 200])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertIn('error', response.json())
+
+    def test_buckets_are_per_user(self):
+        for _ in range(2):
+            self.assertEqual(ratelimit.take('reports', self.user), 0)
+        self.assertGreater(ratelimit.take('reports', self.user), 0)
+        self.assertEqual(ratelimit.take('reports', self.other), 0)
+
+    def test_unlisted_limits_are_open(self):
+        for _ in range(10):
+            self.assertEqual(ratelimit.take('exports', self.user), 0)
+
+
+class SingleflightTests(TestCase):
+    def test_concurrent_callers_share_one_run(self):
+        group = singleflight.Group()
+        release, runs, results = threading.Event(), [], []
+
+        def compute():
+            runs.append(1)
+            release.wait(5)
+            return 'figures'
+
+        threads = [threading.Thread(target=lambda: results.append(group.do('key', compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while group.shared < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(runs, [1])
+        self.assertEqual(results, ['figures'] * 5)
+
+    def test_nothing_is_kept(self):
+        group = singleflight.Group()
+        counter = iter(range(10))
+        self.assertEqual(group.do('key', lambda: next(counter)), 0)
+        self.assertEqual(group.do('key', lambda: next(counter)), 1)
+        self.assertEqual(group.do('other', lambda: next(counter)), 2)
+
+    def test_error_reaches_every_caller(self):
+        group = singleflight.Group()
+
+        async def main():
+            started = asyncio.Event()
+
+            async def compute():
+                started.set()
+                await asyncio.sleep(0.05)
+                raise ValueError('boom')
+
+            leader = asyncio.ensure_future(group.ado('key', compute))
+            await started.wait()
+            follower = asyncio.ensure_future(group.ado('key', compute))
+            return await asyncio.gather(leader, follower, return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertEqual([type(result) for result in results], [ValueError, ValueError])
+        self.assertEqual(group.shared, 1)
+
+
+
+# -------------------------------
+# History archive
+# -------------------------------
+@override_settings(STORAGES=PLAIN_STATIC)
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.science = Department.objects.create(name='Science')
+        cls.library = Department.objects.create(name='Library')
+        cls.asset = make_asset('Centrifuge', 'CEN-1', cls.science)
+        cls.long_ago = long_ago = timezone.now() - timedelta(days=3 * 365)
+        cls.old_move = AssetMovement.objects.create(
+            asset=cls.asset, from_department=cls.science, to_department=cls.library,
+            moved_by=cls.admin, remarks='Lent out',
+        )
+        AssetMovement.objects.filter(pk=cls.old_move.pk).update(date_moved=long_ago)
+        cls.old_repair = MaintenanceRecord.objects.create(
+            asset=cls.asset, issue_reported='Rotor imbalance', performed_by='Vendor',
+            maintenance_date=long_ago.date(),
+        )
+        cls.new_move = AssetMovement.objects.create(asset=cls.asset, to_department=cls.science)
+
+    def test_round_trip(self):
+        start = changefeed.current_cursor()
+        self.assertEqual(archive.pending(archive.horizon()), {'movement': 1, 'maintenance': 1})
+        moved = archive.archive(archive.horizon())
+        self.assertEqual(dict(moved), {'movement': 1, 'maintenance': 1})
+        self.assertEqual(archive.pending(archive.horizon()), {'movement': 0, 'maintenance': 0})
+
+        # Recent history stays in the hot table
+        self.assertEqual(list(AssetMovement.objects.values_list('pk', flat=True)), [self.new_move.pk])
+        self.assertFalse(MaintenanceRecord.objects.exists())
+
+        history = archive.history(HistoryArchive.objects.filter(asset=self.asset))
+        [move] = history['movement']
+        self.assertEqual(move['id'], self.old_move.pk)
+        self.assertEqual(move['date_moved'], self.long_ago)
+        self.assertEqual(
+            (move['from_department'], move['to_department'], move['moved_by'], move['remarks']),
+            ('Science', 'Library', 'admin', 'Lent out'),
+        )
+        [repair] = history['maintenance']
+        self.assertEqual(repair['id'], self.old_repair.pk)
+        self.assertEqual(repair['maintenance_date'], self.old_repair.maintenance_date)
+        self.assertEqual(repair['issue_reported'], 'Rotor imbalance')
+
+        changes, _, _ = changefeed.changes_since(start)
+        self.assertEqual(
+            {(change['type'], change['id']) for change in changes if change['op'] == 'delete'},
+            {('movement', self.old_move.pk), ('maintenance', self.old_repair.pk)},
+        )
+
+    def test_pages_read_the_archive(self):
+        archive.archive(archive.horizon())
+        self.client.force_login(self.admin)
+        url = reverse('asset_detail', args=[self.asset.pk])
+        self.assertContains(self.client.get(url), 'Show 2 archived records')
+        self.assertContains(self.client.get(url, {'archived': 1}), 'Rotor imbalance')
+        # Report totals still count archived records
+        response = self.client.get(reverse('reports'))
+        self.assertEqual(report_stat(response, 'Total Movements'), 2)
+        self.assertEqual(report_stat(response, 'Maintenance Records'), 1)
+
+    def test_pack_round_trip(self):
+        records = [{'id': 1, 'when': '2024-01-01', 'note': 'ünïcode'}]
+        self.assertEqual(archive.unpack(archive.pack(records)), records)
+
+
+# -------------------------------
+# Soft delete and purge
+# -------------------------------
+@override_settings(STORAGES=PLAIN_STATIC)
+class SoftDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.asset = make_asset('Microscope', 'MIC-1')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_delete_asks_first(self):
+        url = reverse('delete_asset', args=[self.asset.pk])
+        self.assertContains(self.client.get(url), 'Microscope')
+        self.assertTrue(Asset.objects.filter(pk=self.asset.pk).exists())
+
+        self.assertRedirects(self.client.post(url), reverse('asset_list'), fetch_redirect_response=False)
+        self.assertFalse(Asset.objects.filter(pk=self.asset.pk).exists())
+        self.assertIsNotNone(Asset.all_objects.get(pk=self.asset.pk).deleted_at)
+        self.assertEqual(self.client.get(reverse('asset_detail', args=[self.asset.pk])).status_code, 404)
+
+    def test_restore(self):
+        self.asset.soft_delete()
+        Asset.all_objects.get(pk=self.asset.pk).restore()
+        self.assertEqual(self.client.get(reverse('asset_detail', args=[self.asset.pk])).status_code, 200)
+
+    def test_purge_waits_for_the_horizon(self):
+        self.asset.soft_delete()
+        self.assertEqual(purge.purge(purge.horizon()), (0, 0))
+        self.assertEqual(purge.due(purge.horizon(-1)).count(), 1)
+        self.assertEqual(purge.purge(purge.horizon(-1), batch_size=1, chunk_size=1)[0], 1)
+        self.assertFalse(Asset.all_objects.exists())
+
+    def test_purge_skips_live_assets(self):
+        self.assertEqual(purge.purge(purge.horizon(-1)), (0, 0))
+        self.assertTrue(Asset.objects.filter(pk=self.asset.pk).exists())
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class SoftDeletedHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.science = Department.objects.create(name='Science')
+        cls.library = Department.objects.create(name='Library')
+        cls.kept = make_asset('Kept projector', 'KEPT-1', cls.science)
+        cls.gone = make_asset('Gone laptop', 'GONE-1', cls.science)
+        cls.moves = {
+            asset.pk: AssetMovement.objects.create(
+                asset=asset, from_department=cls.science, to_department=cls.library, moved_by=cls.admin,
+            )
+            for asset in (cls.kept, cls.gone)
+        }
+        cls.repairs = {
+            asset.pk: MaintenanceRecord.objects.create(
+                asset=asset, issue_reported='Fan noise', maintenance_date=date.today(), performed_by='ICT',
+            )
+            for asset in (cls.kept, cls.gone)
+        }
+        cls.cursor = changefeed.current_cursor()
+        Asset.objects.get(pk=cls.gone.pk).soft_delete()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_history_hidden_from_managers(self):
+        self.assertEqual(list(AssetMovement.objects.values_list('asset_id', flat=True)), [self.kept.pk])
+        self.assertEqual(list(MaintenanceRecord.objects.values_list('asset_id', flat=True)), [self.kept.pk])
+        # Still there until purged
+        self.assertEqual(AssetMovement._base_manager.count(), 2)
+        self.assertEqual(MaintenanceRecord._base_manager.count(), 2)
+
+    def test_row_lists(self):
+        for url in (reverse('movement_rows'), reverse('maintenance_rows')):
+            rows = self.client.get(url).json()['rows']
+            self.assertEqual([row['asset'] for row in rows], ['Kept projector'], url)
+
+    def test_report_counts(self):
+        response = self.client.get(reverse('reports'))
+        self.assertContains(response, '<div class="stat-number">1</div>', count=3, html=False)
+
+    def test_edit_forms_not_found(self):
+        movement, repair = self.moves[self.gone.pk], self.repairs[self.gone.pk]
+        self.assertEqual(self.client.get(reverse('edit_movement', args=[movement.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('edit_maintenance', args=[repair.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('edit_movement', args=[self.moves[self.kept.pk].pk])).status_code, 200)
+
+    def test_api_lists(self):
+        _, key = ApiToken.issue(self.admin, 'tests')
+        for url in ('/api/v1/movements/', '/api/v1/maintenance/'):
+            results = self.client.get(url, HTTP_AUTHORIZATION=f'Token {key}').json()['results']
+            self.assertEqual([row['asset'] for row in results], [self.kept.pk], url)
+
+    def test_change_feed_tombstones(self):
+        changes, _, _ = changefeed.changes_since(self.cursor)
+        deleted = {(change['type'], change['id']) for change in changes if change['op'] == 'delete'}
+        self.assertEqual(deleted, {
+            ('asset', self.gone.pk),
+            ('movement', self.moves[self.gone.pk].pk),
+            ('maintenance', self.repairs[self.gone.pk].pk),
+        })
+
+    def test_restore_brings_history_back(self):
+        cursor = changefeed.current_cursor()
+        Asset.all_objects.get(pk=self.gone.pk).restore()
+        self.assertEqual(AssetMovement.objects.count(), 2)
+        self.assertEqual(MaintenanceRecord.objects.count(), 2)
+        changes, _, _ = changefeed.changes_since(cursor)
+        upserted = {(change['type'], change['id']) for change in changes if change['op'] == 'upsert'}
+        self.assertEqual(upserted, {
+            ('asset', self.gone.pk),
+            ('movement', self.moves[self.gone.pk].pk),
+            ('maintenance', self.repairs[self.gone.pk].pk),
+        })
+
+    def test_purge_removes_history(self):
+        assets, dependents = purge.purge(timezone.now() + timedelta(seconds=1))
+        self.assertEqual(assets, 1)
+        self.assertEqual(dependents, 2)
+        self.assertFalse(Asset.all_objects.filter(pk=self.gone.pk).exists())
+        self.assertEqual(list(AssetMovement._base_manager.values_list('asset_id', flat=True)), [self.kept.pk])
+        self.assertEqual(list(MaintenanceRecord._base_manager.values_list('asset_id', flat=True)), [self.kept.pk])
@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import metrics, views
 
 urlpatterns = [
     # =====================
@@ -30,6 +30,7 @@ urlpatterns = [
     # Asset Movement Views
     # =====================
     path('movements/', views.movement_list, name='movement_list'),
+    path('movements/rows/', views.movement_rows, name='movement_rows'),
     path('movements/add/', views.add_movement, name='add_movement'),
     path('movements/<int:id>/edit/', views.edit_movement, name='edit_movement'),
     path('movements/<int:id>/delete/', views.delete_movement, name='delete_movement'),
@@ -38,12 +39,46 @@ urlpatterns = [
     # Maintenance Views
     # =====================
     path('maintenance/', views.maintenance_list, name='maintenance_list'),
+    path('maintenance/rows/', views.maintenance_rows, name='maintenance_rows'),
     path('maintenance/add/', views.add_maintenance, name='add_maintenance'),
     path('maintenance/<int:id>/edit/', views.edit_maintenance, name='edit_maintenance'),
-    path('maintenance/<int:id>/edit/', views.delete_maintenance, name='delete_maintenance'),
+    path('maintenance/<int:id>/delete/', views.delete_maintenance, name='delete_maintenance'),
 
     # =====================
     # Reports
     # =====================
     path('reports/', views.reports, name='reports'),
+    path('reports/valuation/<str:group_by>/', views.valuation_report, name='valuation_report'),
+    path('reports/utilization/<str:group_by>/', views.utilization_report, name='utilization_report'),
+    path('locations/assets/', views.location_assets, name='location_assets'),
+
+    # =====================
+    # Stocktakes
+    # =====================
+    path('stocktakes/', views.stocktake_list, name='stocktake_list'),
+    path('stocktakes/<int:id>/', views.stocktake_detail, name='stocktake_detail'),
+    path('stocktakes/<int:id>/manifest/', views.stocktake_manifest, name='stocktake_manifest'),
+    path('stocktakes/<int:id>/sync/', views.stocktake_sync, name='stocktake_sync'),
+
+    # =====================
+    # Audit Trail
+    # =====================
+    path('audit/', views.audit_log, name='audit_log'),
+
+    # =====================
+    # Form Lookups
+    # =====================
+    path('lookup/assets/', views.asset_lookup, name='asset_lookup'),
+    path('lookup/departments/', views.department_lookup, name='department_lookup'),
+    path('lookup/rooms/', views.room_lookup, name='room_lookup'),
+
+    # =====================
+    # Live Updates
+    # =====================
+    path('events/', views.asset_events, name='asset_events'),
+
+    # =====================
+    # Metrics (Prometheus)
+    # =====================
+    path('metrics', metrics.scrape, name='metrics'),
 ]
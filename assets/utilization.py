@@ -0,0 +1,170 @@
+"""
+Asset utilization from checkout history.
+
+Hours in use are summed in SQL, per asset, category or department. Ended
+sessions store their length, so the bulk of a window, the sessions wholly
+inside it, is a plain grouped ``SUM``; only the sessions crossing its
+edges (or still open) are clipped to it row by row. Hours available come from a second grouped query over the assets,
+each counted from the later of the window start and the day it was added,
+so new assets are not reported idle for time before they existed. Only the
+per-group totals reach Python, however many sessions there are.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .models import Asset, AssetCategory, CheckoutSession, Department, rollup_counts
+
+DEFAULT_WINDOW_DAYS = 30
+
+# group_by value -> (asset column, model holding the names, label for NULL)
+GROUPS = {
+    'asset': ('id', Asset, None),
+    'department': ('department_id', Department, 'Unassigned'),
+    'category': ('category_id', AssetCategory, 'Uncategorized'),
+}
+
+
+def _hours(duration):
+    return duration.total_seconds() / 3600 if duration else 0.0
+
+
+def _clipped(start_field, end_field, start, end):
+    """Length of ``[start_field, end_field)`` inside ``[start, end)`` as a duration."""
+    return ExpressionWrapper(
+        Least(end_field, Value(end)) - Greatest(start_field, Value(start)),
+        output_field=DurationField(),
+    )
+
+
+def sessions_in_window(start, end, queryset=None):
+    """Sessions overlapping ``[start, end)``, including ones still open."""
+    if queryset is None:
+        queryset = CheckoutSession.objects.all()
+    return queryset.filter(started_at__lt=end).filter(Q(ended_at__gt=start) | Q(ended_at__isnull=True))
+
+
+def hours_in_use(column, start, end, now, assets=None):
+    """
+    ``{key: (sessions, hours)}`` for sessions in the window, grouped by an
+    asset column. ``assets`` limits them to the sessions of those assets.
+    """
+    inside = Q(started_at__gte=start, started_at__lt=end, ended_at__lte=end)
+    checkouts = CheckoutSession.objects.all()
+    if assets is not None:
+        checkouts = checkouts.filter(asset__in=assets.values('id'))
+    totals = {}
+
+    # Sessions wholly inside the window: their stored length, summed natively
+    rows = (
+        checkouts.filter(inside)
+        .order_by()
+        .values(key=F(f'asset__{column}'))
+        .annotate(sessions=Count('id'), in_use=Sum('seconds'))
+        .values_list('key', 'sessions', 'in_use')
+    )
+    for key, sessions, seconds in rows:
+        totals[key] = (sessions, (seconds or 0) / 3600)
+
+    # The few crossing its start or end, or still open, clipped to it
+    clipped = _clipped('started_at', Coalesce('ended_at', Value(now)), start, end)
+    rows = (
+        sessions_in_window(start, end, checkouts)
+        .exclude(inside)
+        .order_by()
+        .values(key=F(f'asset__{column}'))
+        .annotate(sessions=Count('id'), in_use=Sum(clipped))
+        .values_list('key', 'sessions', 'in_use')
+    )
+    for key, sessions, duration in rows:
+        previous_sessions, previous_hours = totals.get(key, (0, 0.0))
+        totals[key] = (previous_sessions + sessions, previous_hours + _hours(duration))
+    return totals
+
+
+def hours_available(column, start, end, queryset=None):
+    """``{key: (assets, hours)}`` for assets that existed during the window."""
+    if queryset is None:
+        queryset = Asset.objects.all()
+    rows = (
+        queryset.exclude(status='Disposed')
+        .filter(date_added__lt=end)
+        .order_by()
+        .values(key=F(column))
+        .annotate(assets=Count('id'), available=Sum(_clipped('date_added', Value(end), start, end)))
+        .values_list('key', 'assets', 'available')
+    )
+    return {key: (assets, _hours(duration)) for key, assets, duration in rows}
+
+
+def default_window(now=None):
+    """The last ``DEFAULT_WINDOW_DAYS`` days up to now."""
+    now = now or timezone.now()
+    return now - timedelta(days=DEFAULT_WINDOW_DAYS), now
+
+
+def _rollup(totals, paths):
+    """Per-department ``{key: (count, hours)}`` totals to subtree totals; NULL stays as is."""
+    counts = rollup_counts({key: count for key, (count, _) in totals.items() if key}, paths)
+    hours = rollup_counts({key: value for key, (_, value) in totals.items() if key}, paths)
+    rolled = {key: (counts[key], float(hours[key])) for key in paths if counts[key] or hours[key]}
+    if None in totals:
+        rolled[None] = totals[None]
+    return rolled
+
+
+def utilization_report(group_by, start, end, limit=None, queryset=None, departments=None):
+    """
+    Hours in use against hours available per asset, department or category
+    in ``[start, end)``, least used first. Department figures include their
+    sub-units. ``limit`` keeps only the first groups, since the per-asset
+    report has a row for every asset. ``queryset`` narrows the assets and
+    ``departments`` the department groups their figures roll up into.
+    """
+    column, model, null_label = GROUPS[group_by]
+    now = timezone.now()
+    end = min(end, now)
+    if start < end:
+        used = hours_in_use(column, start, end, now, queryset)
+        available = hours_available(column, start, end, queryset)
+    else:
+        used, available = {}, {}
+    total_sessions = sum(sessions for sessions, _ in used.values())
+    total_used = sum(hours for _, hours in used.values())
+    total_available = sum(hours for _, hours in available.values())
+
+    if model is Department:
+        if departments is None:
+            departments = Department.objects.all()
+        paths = dict(departments.values_list('id', 'path'))
+        used, available = _rollup(used, paths), _rollup(available, paths)
+    keys = set(used) | set(available)
+    names = dict(model.objects.filter(id__in=[key for key in keys if key]).values_list('id', 'name'))
+
+    groups = []
+    for key in keys:
+        sessions, used_hours = used.get(key, (0, 0.0))
+        assets, available_hours = available.get(key, (0, 0.0))
+        groups.append({
+            'id': key,
+            'name': names.get(key, null_label),
+            'asset_count': assets,
+            'sessions': sessions,
+            'hours_in_use': round(used_hours, 2),
+            'hours_available': round(available_hours, 2),
+            'utilization': round(used_hours / available_hours, 4) if available_hours else 0.0,
+        })
+    groups.sort(key=lambda group: (group['utilization'], group['hours_in_use'], group['name'] or ''))
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'sessions': total_sessions,
+        'hours_in_use': round(total_used, 2),
+        'hours_available': round(total_available, 2),
+        'utilization': round(total_used / total_available, 4) if total_available else 0.0,
+        'groups': groups[:limit] if limit else groups,
+    }
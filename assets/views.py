@@ -1,13 +1,45 @@
+import asyncio
+import math
+from datetime import datetime, time, timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.models import User
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from .models import Asset, Department, AssetCategory, AssetMovement, MaintenanceRecord
-from .forms import AssetForm, MovementForm, MaintenanceForm
+from django.utils.dateparse import parse_date
+from django.utils.formats import date_format
+from django.utils.text import Truncator
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST
+from . import access, archive, asset_index, audit, events, fragments, pagination, presentation, singleflight
+from .models import Asset, Department, AssetCategory, AssetMovement, MaintenanceRecord, HistoryArchive, AuditEvent, CheckoutSession, Room, Stocktake, rollup_counts
+from .forms import AssetForm, MovementForm, MaintenanceForm, StocktakeForm
+from .ratelimit import rate_limited
+
+
+def async_login_required(view):
+    """``login_required`` for async views (Django's own accepts them from 5.1)."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Templates read request.user; give them the user already loaded
+        # instead of a lazy object that would query from the event loop.
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
 
 
 # -------------------------------
@@ -46,29 +78,149 @@ def user_logout(request):
     return redirect('login')
 
 
-
-
 # -------------------------------
 # Updated Dashboard View with Enhanced Analytics
 # -------------------------------
-from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q, Sum
-from django.utils import timezone
-from datetime import timedelta
-from .models import Asset, Department, AssetCategory, AssetMovement, MaintenanceRecord
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def _monthly_additions(now, assets):
+    # Six 30-day windows ending now, counted in one query
+    windows = []
+    for i in range(5, -1, -1):
+        month_start = now - timedelta(days=i*30)
+        month_end = now - timedelta(days=(i-1)*30) if i > 0 else now
+        windows.append((month_start, month_end))
+    counts = await assets.aaggregate(**{
+        f'month_{position}': Count('id', filter=Q(date_added__gte=start, date_added__lt=end))
+        for position, (start, end) in enumerate(windows)
+    })
+    month_labels = [start.strftime('%b %Y') for start, _ in windows]
+    return month_labels, [counts[f'month_{position}'] for position in range(len(windows))]
+
+
+async def _department_status(assets, departments, statuses=('Available', 'In Use', 'Under Maintenance')):
+    departments = await _alist(departments[:6])  # Top 6 departments
+    counts = {}
+    grouped = (
+        assets.filter(department__in=departments, status__in=statuses)
+        .order_by().values_list('department_id', 'status').annotate(total=Count('id'))
+    )
+    async for department_id, status, total in grouped:
+        counts[department_id, status] = total
+    return {
+        dept.name: {status: counts.get((dept.pk, status), 0) for status in statuses}
+        for dept in departments
+    }
+
+
+async def _grouped_counts(assets, field):
+    return dict(await _alist(assets.order_by().values_list(field).annotate(total=Count('id'))))
+
+
+async def _department_tree(assets, departments):
+    """Departments in tree order, each with its own and its subtree's asset count."""
+    departments, counts = await asyncio.gather(
+        _alist(departments.order_by('path')),
+        _grouped_counts(assets, 'department_id'),
+    )
+    totals = rollup_counts(counts, {department.pk: department.path for department in departments})
+    for department in departments:
+        department.own_count = counts.get(department.pk, 0)
+        department.asset_count = totals[department.pk]
+    return departments, counts.get(None, 0)
+
+
+async def _top_departments(assets, departments, limit=5):
+    departments, _ = await _department_tree(assets, departments)
+    return sorted(departments, key=lambda department: -department.asset_count)[:limit]
+
+
+async def _dashboard_results(user, visible, cached_fragments):
+    """The dashboard's query results; the same for everyone who sees the same departments."""
+    now = timezone.now()
+    thirty_days_ago = now - timedelta(days=30)
+    assets = Asset.objects.visible_to(user)
+    departments = Department.objects.visible_to(user)
+
+    # Independent queries, awaited together
+    queries = {
+        'assets_by_department': _alist(
+            assets.values('department__name')
+            .annotate(total=Count('id'))
+            .order_by('-total')[:8]  # Top 8 departments
+        ),
+        'assets_by_category': _alist(
+            assets.values('category__name')
+            .annotate(total=Count('id'))
+            .order_by('-total')[:6]  # Top 6 categories
+        ),
+        'recent_movements': AssetMovement.objects.visible_to(user)
+        .filter(date_moved__gte=thirty_days_ago).acount(),
+        'total_maintenance_records': MaintenanceRecord.objects.visible_to(user).acount(),
+        'recent_maintenance': MaintenanceRecord.objects.visible_to(user).filter(
+            maintenance_date__gte=thirty_days_ago.date()
+        ).acount(),
+        'assets_needing_attention': _alist(
+            assets.filter(Q(status="Under Maintenance") | Q(condition="Poor"))
+            .select_related('department', 'category')[:8]
+        ),
+        'monthly': _monthly_additions(now, assets),
+        'dept_status_data': _department_status(assets, departments),
+    }
+
+    # --- Tables: queried only when their cached fragment is gone ---
+    if 'top_departments' not in cached_fragments:
+        # Counts include sub-units (faculty totals cover their departments)
+        queries['top_departments'] = _top_departments(assets, departments)
+    if 'recent_assets' not in cached_fragments:
+        queries['recent_assets'] = _alist(
+            assets.select_related('department', 'category', 'assigned_to').order_by('-date_added')[:10]
+        )
 
-@login_required
-def dashboard(request):
     # --- Basic Counts ---
-    total_assets = Asset.objects.count()
-    assets_in_use = Asset.objects.filter(status="In Use").count()
-    assets_available = Asset.objects.filter(status="Available").count()
-    assets_under_maintenance = Asset.objects.filter(status="Under Maintenance").count()
-    assets_disposed = Asset.objects.filter(status="Disposed").count()
-    department_count = Department.objects.count()
-    category_count = AssetCategory.objects.count()
-    
+    index = await sync_to_async(asset_index.get_index)()
+    if index is None:
+        queries.update(
+            status_counts=_grouped_counts(assets, 'status'),
+            condition_counts=_grouped_counts(assets, 'condition'),
+            department_count=departments.acount(),
+            category_count=AssetCategory.objects.acount(),
+        )
+    results = dict(zip(queries, await asyncio.gather(*queries.values())))
+    if index is not None:
+        # Served from the in-memory index, no COUNT queries
+        scope = {} if visible is None else {'department': list(visible)}
+        results.update(
+            status_counts=index.counts_by('status', **scope),
+            condition_counts=index.counts_by('condition', **scope),
+            department_count=index.departments.live if visible is None else len(visible),
+            category_count=index.categories.live,
+        )
+    return results
+
+
+@async_login_required
+async def dashboard(request):
+    visible = await access.aload(request)
+    fragment_scope = access.scope_key(visible)
+    fragment_generations, cached_fragments = await fragments.adashboard_tables(fragment_scope)
+    # Staff opening the dashboard together share one run of its queries
+    results = await singleflight.ado(
+        ('dashboard', fragment_scope, tuple(sorted(cached_fragments))),
+        lambda: _dashboard_results(request.user, visible, cached_fragments),
+    )
+
+    status_counts = results['status_counts']
+    total_assets = sum(status_counts.values())
+    department_count = results['department_count']
+    category_count = results['category_count']
+    assets_in_use = status_counts.get("In Use", 0)
+    assets_available = status_counts.get("Available", 0)
+    assets_under_maintenance = status_counts.get("Under Maintenance", 0)
+    assets_disposed = status_counts.get("Disposed", 0)
+
     # Calculate percentages for status
     if total_assets > 0:
         in_use_percentage = round((assets_in_use / total_assets) * 100, 1)
@@ -78,94 +230,35 @@ def dashboard(request):
         in_use_percentage = maintenance_percentage = available_percentage = 0
 
     # --- Assets by Status (for Pie Chart) ---
-    assets_by_status = (
-        Asset.objects.values('status')
-        .annotate(total=Count('id'))
-        .order_by('status')
-    )
-    status_labels = [item['status'] for item in assets_by_status]
-    status_data = [item['total'] for item in assets_by_status]
+    status_labels = sorted(status_counts)
+    status_data = [status_counts[status] for status in status_labels]
 
     # --- Assets by Condition (for Doughnut Chart) ---
-    assets_by_condition = (
-        Asset.objects.values('condition')
-        .annotate(total=Count('id'))
-        .order_by('condition')
-    )
-    condition_labels = [item['condition'] for item in assets_by_condition]
-    condition_data = [item['total'] for item in assets_by_condition]
+    condition_counts = results['condition_counts']
+    condition_labels = sorted(condition_counts)
+    condition_data = [condition_counts[condition] for condition in condition_labels]
 
     # --- Assets by Department (for Bar Chart) ---
-    assets_by_department = (
-        Asset.objects.values('department__name')
-        .annotate(total=Count('id'))
-        .order_by('-total')[:8]  # Top 8 departments
-    )
-    department_labels = [item['department__name'] or "Unassigned" for item in assets_by_department]
-    department_data = [item['total'] for item in assets_by_department]
+    department_labels = [item['department__name'] or "Unassigned" for item in results['assets_by_department']]
+    department_data = [item['total'] for item in results['assets_by_department']]
 
     # --- Assets by Category (for Horizontal Bar Chart) ---
-    assets_by_category = (
-        Asset.objects.values('category__name')
-        .annotate(total=Count('id'))
-        .order_by('-total')[:6]  # Top 6 categories
-    )
-    category_labels = [item['category__name'] or "Uncategorized" for item in assets_by_category]
-    category_data = [item['total'] for item in assets_by_category]
-
-    # --- Recent Asset Movements (Last 30 days) ---
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_movements = AssetMovement.objects.filter(
-        date_moved__gte=thirty_days_ago
-    ).count()
-
-    # --- Maintenance Statistics ---
-    total_maintenance_records = MaintenanceRecord.objects.count()
-    recent_maintenance = MaintenanceRecord.objects.filter(
-        maintenance_date__gte=thirty_days_ago.date()
-    ).count()
-    
-    # --- Top Departments by Asset Count ---
-    top_departments = (
-        Department.objects.annotate(asset_count=Count('asset'))
-        .order_by('-asset_count')[:5]
-    )
+    category_labels = [item['category__name'] or "Uncategorized" for item in results['assets_by_category']]
+    category_data = [item['total'] for item in results['assets_by_category']]
 
-    # --- Recent Assets Added (Last 10) ---
-    recent_assets = Asset.objects.select_related(
-        'department', 'category', 'assigned_to'
-    ).order_by('-date_added')[:10]
-
-    # --- Assets Needing Attention ---
-    assets_needing_attention = Asset.objects.filter(
-        Q(status="Under Maintenance") | Q(condition="Poor")
-    ).select_related('department', 'category')[:8]
+    # --- Recent activity and tables ---
+    recent_movements = results['recent_movements']
+    total_maintenance_records = results['total_maintenance_records']
+    recent_maintenance = results['recent_maintenance']
+    top_departments = results.get('top_departments')
+    recent_assets = results.get('recent_assets')
+    assets_needing_attention = results['assets_needing_attention']
 
     # --- Monthly Asset Addition Trend (Last 6 months) ---
-    six_months_ago = timezone.now() - timedelta(days=180)
-    monthly_additions = []
-    month_labels = []
-    
-    for i in range(5, -1, -1):
-        month_start = timezone.now() - timedelta(days=i*30)
-        month_end = timezone.now() - timedelta(days=(i-1)*30) if i > 0 else timezone.now()
-        
-        count = Asset.objects.filter(
-            date_added__gte=month_start,
-            date_added__lt=month_end
-        ).count()
-        
-        monthly_additions.append(count)
-        month_labels.append(month_start.strftime('%b %Y'))
+    month_labels, monthly_additions = results['monthly']
 
     # --- Assets Distribution by Status and Department (for Stacked Bar) ---
-    dept_status_data = {}
-    for dept in Department.objects.all()[:6]:  # Top 6 departments
-        dept_status_data[dept.name] = {
-            'Available': Asset.objects.filter(department=dept, status='Available').count(),
-            'In Use': Asset.objects.filter(department=dept, status='In Use').count(),
-            'Under Maintenance': Asset.objects.filter(department=dept, status='Under Maintenance').count(),
-        }
+    dept_status_data = results['dept_status_data']
 
     # --- Context ---
     context = {
@@ -213,6 +306,9 @@ def dashboard(request):
         'top_departments': top_departments,
         'recent_assets': recent_assets,
         'assets_needing_attention': assets_needing_attention,
+        'fragment_generations': fragment_generations,
+        'fragment_scope': fragment_scope,
+        'cached_fragments': cached_fragments,
     }
 
     return render(request, 'assets/dashboard.html', context)
@@ -222,74 +318,147 @@ def dashboard(request):
 # -------------------------------
 @login_required
 def asset_list(request):
-    assets = Asset.objects.select_related('department', 'category').order_by('-date_added')
-    return render(request, 'assets/asset_list.html', {'assets': assets})
+    access.load(request)
+    assets = Asset.objects.visible_to(request.user).order_by('-date_added')
+    departments = Department.objects.visible_to(request.user)
+    # ?department= shows that unit and everything below it
+    department = None
+    if request.GET.get('department', '').isdigit():
+        department = departments.filter(pk=request.GET['department']).first()
+    if department is not None:
+        assets = assets.filter(department.subtree_filter('department__'))
+    rows = presentation.asset_rows(assets)
+    # Auto-refresh only needs the table body
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return render(request, 'assets/_asset_rows.html', {'rows': rows})
+    return render(request, 'assets/asset_list.html', {
+        'rows': rows,
+        'asset_count': len(rows),
+        'department': department,
+        'departments': departments.order_by('path').only('name', 'path'),
+    })
 
 
 @login_required
 def add_asset(request):
+    access.load(request)
     if request.method == 'POST':
-        form = AssetForm(request.POST)
+        form = AssetForm(request.POST, user=request.user)
         if form.is_valid():
-            form.save()
+            asset = form.save()
+            audit.record(request.user, 'create', asset, audit.diff({}, audit.snapshot(asset)))
             messages.success(request, "Asset added successfully!")
             return redirect('asset_list')
     else:
-        form = AssetForm()
+        form = AssetForm(user=request.user)
     return render(request, 'assets/asset_form.html', {'form': form, 'title': 'Add Asset'})
 
 
 @login_required
 def edit_asset(request, id):
-    asset = get_object_or_404(Asset, id=id)
+    access.load(request)
+    asset = get_object_or_404(Asset.objects.visible_to(request.user), id=id)
     if request.method == 'POST':
-        form = AssetForm(request.POST, instance=asset)
+        before = audit.snapshot(asset)
+        form = AssetForm(request.POST, instance=asset, user=request.user)
         if form.is_valid():
             form.save()
+            audit.record(request.user, 'update', asset, audit.diff(before, audit.snapshot(asset)))
             messages.success(request, "Asset updated successfully!")
             return redirect('asset_list')
     else:
-        form = AssetForm(instance=asset)
+        form = AssetForm(instance=asset, user=request.user)
     return render(request, 'assets/asset_form.html', {'form': form, 'title': 'Edit Asset'})
 
 
 @login_required
 def delete_asset(request, id):
-    asset = get_object_or_404(Asset, id=id)
-    asset.delete()
-    messages.warning(request, "Asset deleted successfully!")
-    return redirect('asset_list')
+    access.load(request)
+    asset = get_object_or_404(Asset.objects.visible_to(request.user), id=id)
 
+    if request.method == "POST":
+        audit.record(request.user, 'delete', asset, audit.diff(audit.snapshot(asset), {}))
+        # Soft delete: the row and its history stay until purge_assets removes them
+        with transaction.atomic():
+            CheckoutSession.end(asset, timezone.now())
+            asset.soft_delete()
+        messages.warning(request, "Asset deleted successfully!")
+        return redirect('asset_list')
 
-@login_required
-def asset_detail(request, id):
-    asset = get_object_or_404(Asset, id=id)
-    maintenance = MaintenanceRecord.objects.filter(asset=asset)
-    movements = AssetMovement.objects.filter(asset=asset)
+    return render(request, 'assets/confirm_delete.html', {
+        'object': asset,
+        'type': 'Asset',
+        'cancel_url': reverse('asset_detail', args=[asset.id]),
+    })
+
+
+# Latest entries shown in the activity cards of asset_detail
+DETAIL_HISTORY_LIMIT = 10
+
+
+@async_login_required
+async def asset_detail(request, id):
+    await access.aload(request)
+    # Archived history is only unpacked when asked for (?archived=1)
+    show_archived = bool(request.GET.get('archived'))
+    archives = HistoryArchive.objects.filter(asset_id=id)
+    try:
+        asset, maintenance, movements, archived = await asyncio.gather(
+            Asset.objects.visible_to(request.user)
+            .select_related('category', 'department', 'room__building__campus', 'assigned_to').aget(id=id),
+            _alist(MaintenanceRecord.objects.filter(asset_id=id)[:DETAIL_HISTORY_LIMIT]),
+            _alist(
+                AssetMovement.objects.filter(asset_id=id)
+                .select_related('from_department', 'to_department')[:DETAIL_HISTORY_LIMIT]
+            ),
+            _alist(archives) if show_archived else archives.aaggregate(total=Sum('records')),
+        )
+    except Asset.DoesNotExist:
+        raise Http404("No Asset matches the given query.")
     context = {'asset': asset, 'maintenance': maintenance, 'movements': movements}
+    if show_archived:
+        history = archive.history(archived)
+        context.update(archived_movements=history['movement'], archived_maintenance=history['maintenance'])
+    else:
+        context['archived_count'] = archived['total'] or 0
     return render(request, 'assets/asset_detail.html', context)
 
+# Fields touched by checkout/return, recorded in the audit trail
+CHECKOUT_FIELDS = ['status', 'current_user', 'last_checked_out', 'expected_return_time']
+
+
 @login_required
 def checkout_asset(request, asset_id):
-    asset = get_object_or_404(Asset, id=asset_id)
+    access.load(request)
+    asset = get_object_or_404(Asset.objects.visible_to(request.user), id=asset_id)
     if asset.status == 'In Use':
         messages.error(request, f"{asset.name} is currently in use by another user.")
         return redirect('asset_list')
 
+    before = audit.snapshot(asset, CHECKOUT_FIELDS)
+    now = timezone.now()
     asset.status = 'In Use'
     asset.current_user = request.user.username
-    asset.last_checked_out = timezone.now()
-    asset.save()
+    asset.last_checked_out = now
+    with transaction.atomic():
+        asset.save()
+        CheckoutSession.start(asset, request.user, now)
+    audit.record(request.user, 'checkout', asset, audit.diff(before, audit.snapshot(asset, CHECKOUT_FIELDS)))
     messages.success(request, f"You have successfully checked out {asset.name}.")
     return redirect('asset_list')
 
 @login_required
 def return_asset(request, asset_id):
-    asset = get_object_or_404(Asset, id=asset_id)
+    access.load(request)
+    asset = get_object_or_404(Asset.objects.visible_to(request.user), id=asset_id)
+    before = audit.snapshot(asset, CHECKOUT_FIELDS)
     asset.status = 'Available'
     asset.current_user = None
     asset.expected_return_time = None
-    asset.save()
+    with transaction.atomic():
+        asset.save()
+        CheckoutSession.end(asset, timezone.now())
+    audit.record(request.user, 'return', asset, audit.diff(before, audit.snapshot(asset, CHECKOUT_FIELDS)))
     messages.success(request, f"{asset.name} has been returned and is now available.")
     return redirect('asset_list')
 
@@ -297,38 +466,83 @@ def return_asset(request, asset_id):
 # -------------------------------
 # Asset Movement Views
 # -------------------------------
+# Keyset order served by movement_rows (backed by movement_recent_idx)
+MOVEMENT_ORDERING = ('-date_moved', '-id')
+
 @login_required
 def movement_list(request):
-    movements = AssetMovement.objects.select_related('asset', 'from_department', 'to_department').order_by('-date_moved')
-    return render(request, 'assets/movement_list.html', {'movements': movements})
+    # Rows are streamed in by the virtual table from movement_rows
+    access.load(request)
+    has_movements = AssetMovement.objects.visible_to(request.user).exists()
+    return render(request, 'assets/movement_list.html', {'has_movements': has_movements})
+
+
+@async_login_required
+async def movement_rows(request):
+    await access.aload(request)
+    queryset = AssetMovement.objects.visible_to(request.user).values(
+        'id', 'date_moved', 'asset__name', 'moved_by__username',
+        'moved_by__first_name', 'moved_by__last_name',
+        'from_department__name', 'to_department__name',
+    )
+    try:
+        movements, next_cursor = await pagination.akeyset_page(
+            queryset, MOVEMENT_ORDERING, request.GET.get('cursor'),
+            pagination.page_size(request.GET.get('limit')),
+        )
+    except pagination.InvalidCursor as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    edit_url, delete_url = presentation.url_prefix('edit_movement'), presentation.url_prefix('delete_movement')
+    rows = []
+    for move in movements:
+        full_name = f"{move['moved_by__first_name'] or ''} {move['moved_by__last_name'] or ''}".strip()
+        rows.append({
+            'id': move['id'],
+            'asset': move['asset__name'],
+            'moved_by': full_name or move['moved_by__username'] or '',
+            'from_department': move['from_department__name'],
+            'to_department': move['to_department__name'],
+            'date_moved': date_format(timezone.localtime(move['date_moved']), 'M d, Y, h:i A'),
+            'edit_url': f"{edit_url[0]}{move['id']}{edit_url[1]}",
+            'delete_url': f"{delete_url[0]}{move['id']}{delete_url[1]}",
+        })
+    return JsonResponse({'rows': rows, 'next': next_cursor})
 
 
 @login_required
 def add_movement(request):
+    access.load(request)
     if request.method == 'POST':
-        form = MovementForm(request.POST)
+        form = MovementForm(request.POST, user=request.user)
         if form.is_valid():
             movement = form.save(commit=False)
             movement.moved_by = request.user
             movement.save()
+            audit.record(request.user, 'create', movement, audit.diff({}, audit.snapshot(movement)),
+                         asset=movement.asset)
             messages.success(request, "Asset movement recorded successfully!")
             return redirect('movement_list')
     else:
-        form = MovementForm()
+        form = MovementForm(user=request.user)
     return render(request, 'assets/movement_form.html', {'form': form, 'title': 'Record Movement'})
 
 @login_required
 def edit_movement(request, id):
-    movement = get_object_or_404(AssetMovement, id=id)
+    access.load(request)
+    movement = get_object_or_404(AssetMovement.objects.visible_to(request.user), id=id)
     
     if request.method == 'POST':
-        form = MovementForm(request.POST, instance=movement)
+        before = audit.snapshot(movement)
+        form = MovementForm(request.POST, instance=movement, user=request.user)
         if form.is_valid():
             form.save()
+            audit.record(request.user, 'update', movement, audit.diff(before, audit.snapshot(movement)),
+                         asset=movement.asset)
             messages.success(request, "Movement record updated successfully.")
             return redirect('movement_list')
     else:
-        form = MovementForm(instance=movement)
+        form = MovementForm(instance=movement, user=request.user)
     
     return render(request, 'assets/movement_form.html', {
         'form': form,
@@ -337,9 +551,12 @@ def edit_movement(request, id):
 
 @login_required
 def delete_movement(request, id):
-    movement = get_object_or_404(AssetMovement, id=id)
+    access.load(request)
+    movement = get_object_or_404(AssetMovement.objects.visible_to(request.user), id=id)
 
     if request.method == "POST":
+        audit.record(request.user, 'delete', movement, audit.diff(audit.snapshot(movement), {}),
+                     asset=movement.asset)
         movement.delete()
         messages.success(request, "Movement record deleted successfully.")
         return redirect('movement_list')
@@ -353,36 +570,79 @@ def delete_movement(request, id):
 # -------------------------------
 # Maintenance Views
 # -------------------------------
+# Keyset order served by maintenance_rows (backed by maintenance_recent_idx)
+MAINTENANCE_ORDERING = ('-maintenance_date', '-id')
+
 @login_required
 def maintenance_list(request):
-    maintenance_records = MaintenanceRecord.objects.select_related('asset').order_by('-maintenance_date')
-    return render(request, 'assets/maintenance_list.html', {'records': maintenance_records})
+    # Rows are streamed in by the virtual table from maintenance_rows
+    access.load(request)
+    has_records = MaintenanceRecord.objects.visible_to(request.user).exists()
+    return render(request, 'assets/maintenance_list.html', {'has_records': has_records})
+
+
+@async_login_required
+async def maintenance_rows(request):
+    await access.aload(request)
+    queryset = MaintenanceRecord.objects.visible_to(request.user).values(
+        'id', 'maintenance_date', 'asset__name', 'issue_reported', 'performed_by', 'remarks',
+    )
+    try:
+        records, next_cursor = await pagination.akeyset_page(
+            queryset, MAINTENANCE_ORDERING, request.GET.get('cursor'),
+            pagination.page_size(request.GET.get('limit')),
+        )
+    except pagination.InvalidCursor as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    edit_url, delete_url = presentation.url_prefix('edit_maintenance'), presentation.url_prefix('delete_maintenance')
+    rows = [
+        {
+            'id': record['id'],
+            'asset': record['asset__name'],
+            'issue_reported': record['issue_reported'],
+            'maintenance_date': date_format(record['maintenance_date'], 'M d, Y'),
+            'performed_by': record['performed_by'],
+            'remarks': Truncator(record['remarks']).words(5),
+            'edit_url': f"{edit_url[0]}{record['id']}{edit_url[1]}",
+            'delete_url': f"{delete_url[0]}{record['id']}{delete_url[1]}",
+        }
+        for record in records
+    ]
+    return JsonResponse({'rows': rows, 'next': next_cursor})
 
 
 @login_required
 def add_maintenance(request):
+    access.load(request)
     if request.method == 'POST':
-        form = MaintenanceForm(request.POST)
+        form = MaintenanceForm(request.POST, user=request.user)
         if form.is_valid():
-            form.save()
+            record = form.save()
+            audit.record(request.user, 'create', record, audit.diff({}, audit.snapshot(record)),
+                         asset=record.asset)
             messages.success(request, "Maintenance record added successfully!")
             return redirect('maintenance_list')
     else:
-        form = MaintenanceForm()
+        form = MaintenanceForm(user=request.user)
     return render(request, 'assets/maintenance_form.html', {'form': form, 'title': 'Add Maintenance Record'})
 
 @login_required
 def edit_maintenance(request, id):
-    record = get_object_or_404(MaintenanceRecord, id=id)
+    access.load(request)
+    record = get_object_or_404(MaintenanceRecord.objects.visible_to(request.user), id=id)
     
     if request.method == 'POST':
-        form = MaintenanceForm(request.POST, instance=record)
+        before = audit.snapshot(record)
+        form = MaintenanceForm(request.POST, instance=record, user=request.user)
         if form.is_valid():
             form.save()
+            audit.record(request.user, 'update', record, audit.diff(before, audit.snapshot(record)),
+                         asset=record.asset)
             messages.success(request, "Maintenance record updated successfully.")
             return redirect('maintenance_list')
     else:
-        form = MaintenanceForm(instance=record)
+        form = MaintenanceForm(instance=record, user=request.user)
 
     return render(request, 'assets/maintenance_form.html', {
         'form': form,
@@ -392,9 +652,12 @@ def edit_maintenance(request, id):
 
 @login_required
 def delete_maintenance(request, id):
-    record = get_object_or_404(MaintenanceRecord, id=id)
+    access.load(request)
+    record = get_object_or_404(MaintenanceRecord.objects.visible_to(request.user), id=id)
 
     if request.method == 'POST':
+        audit.record(request.user, 'delete', record, audit.diff(audit.snapshot(record), {}),
+                     asset=record.asset)
         record.delete()
         messages.success(request, "Maintenance record deleted successfully.")
         return redirect('maintenance_list')
@@ -409,28 +672,367 @@ def delete_maintenance(request, id):
 # Reports View
 # -------------------------------
 
-@login_required
-def reports(request):
-    total_assets = Asset.objects.count()
-    maintenance_count = MaintenanceRecord.objects.count()
-    movement_count = AssetMovement.objects.count()
-
-    assets_by_category = (
-        Asset.objects.values('category__name')
-        .annotate(count=Count('id'))
-        .order_by('category__name')
-    )
-    assets_by_department = (
-        Asset.objects.values('department__name')
-        .annotate(count=Count('id'))
-        .order_by('department__name')
+async def _archived_totals(user):
+    # Records moved to the history archive, by kind (archive.py)
+    rows = HistoryArchive.objects.visible_to(user).order_by().values_list('kind').annotate(total=Sum('records'))
+    return dict(await _alist(rows))
+
+
+async def _report_results(user):
+    assets = Asset.objects.visible_to(user)
+    return await asyncio.gather(
+        assets.acount(),
+        MaintenanceRecord.objects.visible_to(user).acount(),
+        AssetMovement.objects.visible_to(user).acount(),
+        _archived_totals(user),
+        _alist(
+            assets.values('category__name')
+            .annotate(count=Count('id'))
+            .order_by('category__name')
+        ),
+        _department_tree(assets, Department.objects.visible_to(user)),
     )
 
+
+@async_login_required
+@rate_limited('reports')
+async def reports(request):
+    visible = await access.aload(request)
+    (
+        total_assets, maintenance_count, movement_count, archived, assets_by_category, (departments, unassigned),
+    ) = await singleflight.ado(('reports', access.scope_key(visible)), lambda: _report_results(request.user))
+
     context = {
         'total_assets': total_assets,
-        'maintenance_count': maintenance_count,
-        'movement_count': movement_count,
+        'maintenance_count': maintenance_count + archived.get('maintenance', 0),
+        'movement_count': movement_count + archived.get('movement', 0),
         'assets_by_category': assets_by_category,
-        'assets_by_department': assets_by_department,
+        'departments': departments,
+        'unassigned_count': unassigned,
     }
     return render(request, 'assets/reports.html', context)
+
+
+# -------------------------------
+# Valuation Reports (JSON)
+# -------------------------------
+@login_required
+@rate_limited('reports')
+def valuation_report(request, group_by):
+    # NumPy is only loaded when a valuation report is requested
+    from . import valuation
+
+    if group_by not in valuation.GROUPS:
+        raise Http404("Unknown grouping.")
+
+    as_of = timezone.localdate()
+    if request.GET.get('as_of'):
+        try:
+            as_of = parse_date(request.GET['as_of'])
+        except ValueError:
+            as_of = None
+        if as_of is None:
+            return JsonResponse({'error': "as_of must be a date in YYYY-MM-DD format."}, status=400)
+
+    visible = access.load(request)
+    report = singleflight.do(
+        ('valuation', group_by, as_of, access.scope_key(visible)),
+        lambda: valuation.valuation_report(group_by, as_of, Asset.objects.visible_to(request.user)),
+    )
+    return JsonResponse(report)
+
+
+# -------------------------------
+# Utilization Reports (JSON)
+# -------------------------------
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+@login_required
+@rate_limited('reports')
+def utilization_report(request, group_by):
+    from . import utilization
+
+    if group_by not in utilization.GROUPS:
+        raise Http404("Unknown grouping.")
+
+    # start/end are local dates, both inclusive; default: the last 30 days
+    start, end = utilization.default_window()
+    try:
+        if request.GET.get('start'):
+            start = _day_start(parse_date(request.GET['start']))
+        if request.GET.get('end'):
+            end = _day_start(parse_date(request.GET['end']) + timedelta(days=1))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': "start and end must be dates in YYYY-MM-DD format."}, status=400)
+    if start >= end:
+        return JsonResponse({'error': "start must be before end."}, status=400)
+
+    limit = None
+    if request.GET.get('limit'):
+        try:
+            limit = int(request.GET['limit'])
+        except ValueError:
+            return JsonResponse({'error': "limit must be a whole number."}, status=400)
+
+    visible = access.load(request)
+    # Keyed on the dates asked for: concurrent default-window requests share
+    # the first one's "now"
+    key = ('utilization', group_by, request.GET.get('start'), request.GET.get('end'), limit,
+           access.scope_key(visible))
+    report = singleflight.do(key, lambda: utilization.utilization_report(
+        group_by, start, end, limit=limit, queryset=Asset.objects.visible_to(request.user),
+        departments=Department.objects.visible_to(request.user),
+    ))
+    return JsonResponse(report)
+
+
+# -------------------------------
+# Location Lookups (JSON)
+# -------------------------------
+LOCATION_ASSET_LIMIT = 1000
+# Radius lookups are campus-scale; a larger circle would scan most of the grid
+MAX_RADIUS_M = 50_000
+
+
+def _floats(request, *names):
+    try:
+        return [float(request.GET[name]) for name in names]
+    except (KeyError, ValueError):
+        return None
+
+
+@login_required
+def location_assets(request):
+    """
+    Assets in a room (``?room=``), a building (``?building=``), a box
+    (``?bbox=south,west,north,east``) or a radius in metres around a point
+    (``?lat=&lon=&radius=``), nearest first for a radius.
+    """
+    from . import spatial
+
+    access.load(request)
+    distances = {}
+    assets = Asset.objects.visible_to(request.user)
+    try:
+        if request.GET.get('room'):
+            assets = assets.filter(room_id=int(request.GET['room']))
+        elif request.GET.get('building'):
+            assets = assets.filter(room__building_id=int(request.GET['building']))
+        elif request.GET.get('bbox'):
+            south, west, north, east = (float(part) for part in request.GET['bbox'].split(','))
+            assets = spatial.assets_in_box(south, west, north, east, assets)
+        elif request.GET.get('radius'):
+            point = _floats(request, 'lat', 'lon', 'radius')
+            if point is None or not all(map(math.isfinite, point)) or not 0 < point[2] <= MAX_RADIUS_M:
+                return JsonResponse({'error': "lat, lon and radius (metres) must be numbers."}, status=400)
+            assets, distances = spatial.assets_within(*point, assets)
+        else:
+            return JsonResponse({'error': "Pass room, building, bbox or lat/lon/radius."}, status=400)
+    except spatial.InvalidBox as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    except ValueError:
+        return JsonResponse({'error': "room and building must be ids; bbox must be four numbers."}, status=400)
+
+    rows = list(
+        assets.order_by('id').values(
+            'id', 'name', 'serial_number', 'status', 'room_id', 'room__name', 'room__building__name',
+        )[:LOCATION_ASSET_LIMIT + 1]
+    )
+    truncated = len(rows) > LOCATION_ASSET_LIMIT
+    results = []
+    for row in rows[:LOCATION_ASSET_LIMIT]:
+        result = {
+            'id': row['id'], 'name': row['name'], 'serial_number': row['serial_number'],
+            'status': row['status'], 'room': row['room_id'],
+            'room_name': row['room__name'], 'building_name': row['room__building__name'],
+        }
+        if distances:
+            result['distance_m'] = round(distances[row['room_id']], 1)
+        results.append(result)
+    if distances:
+        results.sort(key=lambda result: result['distance_m'])
+    return JsonResponse({'assets': results, 'truncated': truncated})
+
+
+# -------------------------------
+# Stocktakes
+# -------------------------------
+@login_required
+def stocktake_list(request):
+    access.load(request)
+    if request.method == 'POST':
+        form = StocktakeForm(request.POST, user=request.user)
+        if form.is_valid():
+            stocktake = form.save(commit=False)
+            stocktake.started_by = request.user
+            stocktake.save()
+            return redirect('stocktake_detail', id=stocktake.id)
+    else:
+        form = StocktakeForm(user=request.user)
+    stocktakes = Stocktake.objects.visible_to(request.user).select_related('department', 'started_by')[:50]
+    return render(request, 'assets/stocktake_list.html', {'form': form, 'stocktakes': stocktakes})
+
+
+@login_required
+def stocktake_detail(request, id):
+    from . import stocktake as stocktakes
+
+    access.load(request)
+    stocktake = get_object_or_404(Stocktake.objects.visible_to(request.user).select_related('department'), id=id)
+    results = stocktake.scans.exclude(result='found').select_related('asset', 'room__building')
+    context = {
+        'stocktake': stocktake,
+        'summary': stocktakes.summary(stocktake),
+        'exceptions': results[:500],
+    }
+    return render(request, 'assets/stocktake_detail.html', context)
+
+
+@gzip_page
+@login_required
+def stocktake_manifest(request, id):
+    from . import stocktake as stocktakes
+
+    access.load(request)
+    stocktake = get_object_or_404(Stocktake.objects.visible_to(request.user).select_related('department'), id=id)
+    return JsonResponse(stocktakes.manifest(stocktake))
+
+
+@require_POST
+@login_required
+def stocktake_sync(request, id):
+    """One batch of offline scans: ``{"scans": [[serial, room, scanned_at], ...], "complete": bool}``."""
+    from . import stocktake as stocktakes
+
+    access.load(request)
+    stocktake = get_object_or_404(Stocktake.objects.visible_to(request.user), id=id)
+    try:
+        scans, complete = stocktakes.read_batch(request.body, request.headers.get('Content-Encoding', ''))
+        movements = stocktakes.reconcile(stocktake, scans, request.user, complete=complete)
+    except stocktakes.InvalidBatch as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    except stocktakes.StocktakeClosed as exc:
+        return JsonResponse({'error': str(exc)}, status=409)
+    return JsonResponse({
+        'received': len(scans),
+        'moved': len(movements),
+        'completed': complete,
+        'summary': stocktakes.summary(stocktake),
+    })
+
+
+# -------------------------------
+# Audit Trail
+# -------------------------------
+# Keyset order served by audit_log (backed by audit_asset_idx / audit_actor_idx)
+AUDIT_ORDERING = ('-timestamp', '-id')
+
+
+@login_required
+def audit_log(request):
+    trail = AuditEvent.objects.all()
+    if access.load(request) is not None:
+        # Only the history of assets the user may see
+        trail = trail.filter(asset__in=Asset.objects.visible_to(request.user).values('id'))
+    asset_id = request.GET.get('asset')
+    username = request.GET.get('user')
+    if asset_id:
+        if not asset_id.isdigit():
+            raise Http404("Unknown asset.")
+        trail = trail.filter(asset_id=asset_id)
+    if username:
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise Http404("Unknown user.")
+        trail = trail.filter(actor_id=user.pk)
+
+    try:
+        page, next_cursor = pagination.keyset_page(
+            trail, AUDIT_ORDERING, request.GET.get('cursor'),
+            pagination.page_size(request.GET.get('limit')),
+        )
+    except pagination.InvalidCursor:
+        raise Http404("Invalid cursor.")
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+
+    context = {
+        'events': page,
+        'asset_filter': asset_id,
+        'user_filter': username,
+        'next_query': next_query,
+    }
+    return render(request, 'assets/audit_list.html', context)
+
+
+# -------------------------------
+# Lookups (typeahead pickers in forms.py)
+# -------------------------------
+LOOKUP_LIMIT = 10
+
+
+async def _lookup(queryset):
+    results = [{'id': obj.pk, 'label': str(obj)} async for obj in queryset[:LOOKUP_LIMIT]]
+    return JsonResponse({'results': results})
+
+
+@async_login_required
+async def asset_lookup(request):
+    term = request.GET.get('q', '').strip()
+    if not term:
+        return JsonResponse({'results': []})
+    await access.aload(request)
+    return await _lookup(
+        Asset.objects.visible_to(request.user).search(term).only('id', 'name', 'serial_number')
+    )
+
+
+@async_login_required
+async def department_lookup(request):
+    term = request.GET.get('q', '').strip()
+    if not term:
+        return JsonResponse({'results': []})
+    # Not narrowed: movements may send an asset to any department
+    return await _lookup(Department.objects.filter(name__istartswith=term).order_by('name', 'id'))
+
+
+@async_login_required
+async def room_lookup(request):
+    # "SCI 1", "Science Block" or "101" all find room 101 of the Science Block (SCI)
+    term = request.GET.get('q', '').strip()
+    if not term:
+        return JsonResponse({'results': []})
+    building_term, _, room_term = term.rpartition(' ')
+    query = Q(name__istartswith=term) | Q(building__code__istartswith=term) | Q(building__name__istartswith=term)
+    if building_term:
+        query |= Q(name__istartswith=room_term) & (
+            Q(building__code__iexact=building_term) | Q(building__name__istartswith=building_term)
+        )
+    return await _lookup(Room.objects.filter(query).select_related('building').order_by('building__name', 'name', 'id'))
+
+
+# -------------------------------
+# Live Updates (Server-Sent Events)
+# -------------------------------
+async def asset_events(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker can't hold the stream open. 204 tells EventSource
+        # not to reconnect, and the pages keep polling instead.
+        return HttpResponse(status=204)
+    # Only events about departments the user can see
+    departments = await access.aload(request)
+    response = StreamingHttpResponse(
+        events.stream(events.broker.subscribe(departments)), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -11,6 +11,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mut_tracking.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campus_tracking.settings')
 
 application = get_asgi_application()
+
+# Warm the optional in-memory asset index before the first request
+from assets import asset_index  # noqa: E402
+
+asset_index.warm()
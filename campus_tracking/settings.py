@@ -2,6 +2,8 @@
 from pathlib import Path
 import os
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -31,13 +33,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'assets.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'assets.static_pipeline.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'assets.audit.AuditMiddleware',
 ]
 
 ROOT_URLCONF = 'campus_tracking.urls'
@@ -47,6 +52,8 @@ TEMPLATES = [
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
        'DIRS': [BASE_DIR / 'templates'],
 
+        # With no 'loaders' option Django wraps these loaders in the cached
+        # loader, so each template is compiled once per process.
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -61,9 +68,32 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'campus_tracking.wsgi.application'
 
+# Cached sidebar/header and dashboard table fragments (assets/fragments.py).
+# Use a shared backend such as Redis when running more than one process, so
+# invalidations reach every process. Off under DEBUG so template edits show.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'campus-tracking',
+    }
+}
+if DEBUG:
+    CACHES['default']['BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+
+# Per-process cache for rate-limit buckets (assets/ratelimit.py); kept
+# in-process even when 'default' is shared, and on under DEBUG too.
+CACHES['local'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'campus-tracking-local',
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+#
+# SQLite by default. CAMPUS_DB=postgresql selects the PostgreSQL profile
+# (pip install "psycopg[binary,pool]"); the server and credentials come from
+# the usual libpq variables PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD.
 
 DATABASES = {
     'default': {
@@ -71,6 +101,33 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+if os.environ.get('CAMPUS_DB') == 'postgresql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('PGDATABASE', 'campus_tracking'),
+        'USER': os.environ.get('PGUSER', ''),
+        'PASSWORD': os.environ.get('PGPASSWORD', ''),
+        'HOST': os.environ.get('PGHOST', ''),
+        'PORT': os.environ.get('PGPORT', ''),
+        # .iterator() streams through server-side cursors (valuation, the
+        # duplicate finder, the asset index, stocktake manifests). Behind
+        # PgBouncer in transaction mode set this to True.
+        'DISABLE_SERVER_SIDE_CURSORS': False,
+        'OPTIONS': {},
+    }
+    if django.VERSION >= (5, 1):
+        # A pool per process: checkouts in a busy lab reuse open connections
+        # instead of paying a connect per request
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': 2,
+            'max_size': int(os.environ.get('CAMPUS_DB_POOL_SIZE', 10)),
+            'timeout': 10,
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = 600
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    # Trigram lookups for asset search (AssetQuerySet.search)
+    INSTALLED_APPS.append('django.contrib.postgres')
 
 
 # Password validation
@@ -111,11 +168,43 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic writes content-hashed names, resized WebP copies of images
+# (for srcset) and .gz/.br files; StaticFilesMiddleware serves them with
+# far-future cache headers when DEBUG is off (assets/static_pipeline.py).
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'assets.static_pipeline.CompressedManifestStaticFilesStorage'},
+}
+STATIC_IMAGE_WIDTHS = [40, 80, 160, 320, 640, 1280]
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Optional process-local asset index (assets/asset_index.py) used by the
+# dashboard for status/department/category counts instead of COUNT queries.
+ASSET_INDEX_ENABLED = False
+ASSET_INDEX_MAX_AGE = 300  # seconds before a background re-warm; None = never
+
+# Bearer token Prometheus sends to /metrics (assets/metrics.py); unset, only
+# loopback and INTERNAL_IPS may scrape
+METRICS_TOKEN = None
+
+# Per-user token buckets (assets/ratelimit.py): requests a minute, burst
+RATE_LIMITS = {
+    'reports': (30, 10),   # reports page, valuation and utilization JSON
+    'exports': (60, 20),   # API list reads and the change feed
+}
+
+# Movement and maintenance records older than this many days are moved to
+# the history archive by `manage.py archive_history` (assets/archive.py)
+HISTORY_ARCHIVE_DAYS = 730
+
+# Deleted assets can be restored from the admin for this many days; then
+# `manage.py purge_assets` removes them for good (assets/purge.py)
+ASSET_PURGE_AFTER_DAYS = 30
+
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
@@ -0,0 +1,34 @@
+"""
+Lean settings for headless processes: cron jobs, management commands and
+API-only workers.
+
+Drops the admin, messages, sessions and staticfiles apps (and their
+middleware) so startup doesn't import them. Pages and the admin aren't
+served; only the JSON API is routed. Run migrations with the full settings.
+
+    DJANGO_SETTINGS_MODULE=campus_tracking.settings_headless python manage.py export_changes
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, TEMPLATES
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'assets',
+]
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+MIDDLEWARE = [
+    'assets.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'assets.audit.AuditMiddleware',
+]
+
+ROOT_URLCONF = 'campus_tracking.urls_headless'
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {'context_processors': ['django.template.context_processors.request']},
+}]
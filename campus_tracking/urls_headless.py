@@ -0,0 +1,9 @@
+from django.urls import path, include
+
+from assets import metrics
+
+# URLs for API-only workers (settings_headless): the JSON API and metrics
+urlpatterns = [
+    path('api/v1/', include('assets.api_urls')),
+    path('metrics', metrics.scrape, name='metrics'),
+]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campus_tracking.settings')
 
 application = get_wsgi_application()
+
+# Warm the optional in-memory asset index before the first request
+from assets import asset_index  # noqa: E402
+
+asset_index.warm()
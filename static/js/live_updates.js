@@ -0,0 +1,52 @@
+/*
+ * Live updates pushed by the server as Server-Sent Events (assets/events.py).
+ *
+ *   LiveUpdates.connect('/events/', {
+ *     asset: (data) => {},        // status changes, creations, deletions
+ *     movement: (data) => {},
+ *     maintenance: (data) => {},
+ *     fallback: () => {},         // the server refused the stream; poll instead
+ *   });
+ */
+(function () {
+  'use strict';
+
+  const KINDS = ['asset', 'movement', 'maintenance'];
+
+  function connect(url, handlers) {
+    if (!window.EventSource) {
+      if (handlers.fallback) handlers.fallback();
+      return null;
+    }
+    const source = new EventSource(url);
+    KINDS.forEach((kind) => {
+      if (!handlers[kind]) return;
+      source.addEventListener(kind, (event) => handlers[kind](JSON.parse(event.data)));
+    });
+    source.addEventListener('error', () => {
+      // A dropped connection is retried by EventSource itself; CLOSED means
+      // the server answered without a stream (204 under WSGI, 401).
+      if (source.readyState === EventSource.CLOSED && handlers.fallback) handlers.fallback();
+    });
+    return source;
+  }
+
+  // Status transition carried by an asset event, as {status: delta}
+  function statusDeltas(data) {
+    const deltas = {};
+    const bump = (status, step) => {
+      if (status) deltas[status] = (deltas[status] || 0) + step;
+    };
+    if (data.deleted) {
+      bump(data.previous_status, -1);
+    } else if (data.created) {
+      bump(data.status, 1);
+    } else if (data.previous_status && data.previous_status !== data.status) {
+      bump(data.previous_status, -1);
+      bump(data.status, 1);
+    }
+    return deltas;
+  }
+
+  window.LiveUpdates = { connect: connect, statusDeltas: statusDeltas };
+})();
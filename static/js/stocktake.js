@@ -0,0 +1,218 @@
+/*
+ * Offline stocktake scanner (stocktake_detail.html).
+ *
+ * The manifest of expected assets is downloaded once and kept in
+ * localStorage together with the queue of scans, so scanning carries on
+ * without a connection and survives a page reload. Queued scans are sent in
+ * one gzip-compressed batch when "Sync" is pressed, when the browser comes
+ * back online, and every minute while there is something to send.
+ */
+(function () {
+  'use strict';
+
+  var AUTO_SYNC_MS = 60000;
+
+  // Same as canonical_serial() in models.py: no case, spaces or separators
+  function canonical(serial) {
+    return serial.normalize('NFKC').replace(/[\s\-_./\\:#]+/g, '').toUpperCase();
+  }
+
+  function Scanner(root) {
+    this.root = root;
+    this.id = root.dataset.stocktake;
+    this.manifestUrl = root.dataset.manifestUrl;
+    this.syncUrl = root.dataset.syncUrl;
+    this.csrf = root.querySelector('input[name=csrfmiddlewaretoken]').value;
+    this.input = root.querySelector('[data-scan-input]');
+    this.roomSelect = root.querySelector('[data-room-select]');
+    this.feedback = root.querySelector('[data-scan-feedback]');
+    this.counts = root.querySelector('[data-scan-counts]');
+    this.syncButton = root.querySelector('[data-sync]');
+    this.completeButton = root.querySelector('[data-complete]');
+    this.syncing = false;
+
+    this.manifest = this.load('manifest');
+    this.queue = this.load('queue') || [];
+    this.seen = new Set(this.load('seen') || []);
+    this.index();
+
+    var self = this;
+    this.input.addEventListener('keydown', function (event) {
+      if (event.key === 'Enter') {
+        event.preventDefault();
+        self.scan(self.input.value);
+        self.input.value = '';
+      }
+    });
+    this.roomSelect.addEventListener('change', function () {
+      self.save('room', self.roomSelect.value);
+    });
+    this.syncButton.addEventListener('click', function () { self.sync(false); });
+    this.completeButton.addEventListener('click', function () {
+      if (window.confirm('Complete the stocktake? Every expected asset not scanned yet will be reported missing.')) {
+        self.sync(true);
+      }
+    });
+    window.addEventListener('online', function () { self.sync(false); });
+    window.setInterval(function () {
+      if (self.queue.length && navigator.onLine) { self.sync(false); }
+    }, AUTO_SYNC_MS);
+
+    this.refreshManifest();
+    this.render();
+    this.input.focus();
+  }
+
+  Scanner.prototype.key = function (name) {
+    return 'stocktake:' + this.id + ':' + name;
+  };
+
+  Scanner.prototype.load = function (name) {
+    try {
+      return JSON.parse(window.localStorage.getItem(this.key(name)));
+    } catch (error) {
+      return null;
+    }
+  };
+
+  Scanner.prototype.save = function (name, value) {
+    window.localStorage.setItem(this.key(name), JSON.stringify(value));
+  };
+
+  Scanner.prototype.index = function () {
+    this.expected = new Map();
+    if (!this.manifest) { return; }
+    var columns = this.manifest.columns;
+    var serialAt = columns.indexOf('serial_number');
+    var nameAt = columns.indexOf('name');
+    var self = this;
+    this.manifest.assets.forEach(function (row) {
+      self.expected.set(canonical(row[serialAt]), row[nameAt]);
+    });
+    this.manifest.scanned.forEach(function (serial) { self.seen.add(canonical(serial)); });
+
+    var chosen = this.load('room');
+    this.roomSelect.length = 1;
+    this.manifest.rooms.forEach(function (room) {
+      var option = new Option(room[1], room[0]);
+      option.selected = String(room[0]) === chosen;
+      self.roomSelect.add(option);
+    });
+  };
+
+  Scanner.prototype.refreshManifest = function () {
+    var self = this;
+    fetch(this.manifestUrl, { credentials: 'same-origin', headers: { Accept: 'application/json' } })
+      .then(function (response) {
+        if (!response.ok) { throw new Error(response.status); }
+        return response.json();
+      })
+      .then(function (manifest) {
+        self.manifest = manifest;
+        self.save('manifest', manifest);
+        self.index();
+        self.render();
+      })
+      .catch(function () {
+        // Offline: keep working from the stored copy
+        if (!self.manifest) { self.say('warning', 'The asset list could not be downloaded yet; scans are still recorded.'); }
+      });
+  };
+
+  Scanner.prototype.scan = function (value) {
+    var serial = value.trim();
+    var key = canonical(serial);
+    if (!key) { return; }
+    if (this.seen.has(key)) {
+      this.say('secondary', serial + ' was already scanned.');
+      return;
+    }
+    var room = this.roomSelect.value ? parseInt(this.roomSelect.value, 10) : null;
+    this.queue.push([serial, room, new Date().toISOString()]);
+    this.seen.add(key);
+    this.save('queue', this.queue);
+    this.save('seen', Array.from(this.seen));
+
+    if (this.expected.has(key)) {
+      this.say('success', this.expected.get(key) + ' (' + serial + ')');
+    } else {
+      this.say('warning', serial + ' is not on this department\'s list; it will be checked when synced.');
+    }
+    this.render();
+  };
+
+  Scanner.prototype.say = function (kind, message) {
+    this.feedback.className = 'alert alert-' + kind + ' py-2 mb-3';
+    this.feedback.textContent = message;
+  };
+
+  Scanner.prototype.render = function () {
+    var expectedSeen = 0;
+    var self = this;
+    this.expected.forEach(function (_, serial) {
+      if (self.seen.has(serial)) { expectedSeen += 1; }
+    });
+    this.counts.textContent = expectedSeen + ' of ' + this.expected.size + ' expected assets scanned, ' +
+      this.queue.length + ' waiting to sync';
+    this.syncButton.disabled = this.syncing || !this.queue.length;
+    this.completeButton.disabled = this.syncing;
+  };
+
+  Scanner.prototype.body = function (payload) {
+    var json = JSON.stringify(payload);
+    if (typeof CompressionStream === 'undefined') {
+      return Promise.resolve({ body: json, encoding: null });
+    }
+    var stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+    return new Response(stream).arrayBuffer().then(function (buffer) {
+      return { body: buffer, encoding: 'gzip' };
+    });
+  };
+
+  Scanner.prototype.sync = function (complete) {
+    if (this.syncing || (!this.queue.length && !complete)) { return; }
+    this.syncing = true;
+    this.render();
+    var sent = this.queue.length;
+    var self = this;
+    this.body({ scans: this.queue.slice(0, sent), complete: complete })
+      .then(function (upload) {
+        var headers = { 'Content-Type': 'application/json', 'X-CSRFToken': self.csrf };
+        if (upload.encoding) { headers['Content-Encoding'] = upload.encoding; }
+        return fetch(self.syncUrl, {
+          method: 'POST', credentials: 'same-origin', headers: headers, body: upload.body
+        });
+      })
+      .then(function (response) {
+        return response.json().then(function (data) { return { ok: response.ok, data: data }; });
+      })
+      .then(function (result) {
+        if (!result.ok) { throw new Error(result.data.error || 'Sync failed.'); }
+        // Scans made while the batch was in flight stay queued
+        self.queue = self.queue.slice(sent);
+        self.save('queue', self.queue);
+        if (complete) {
+          ['manifest', 'queue', 'seen', 'room'].forEach(function (name) {
+            window.localStorage.removeItem(self.key(name));
+          });
+          window.location.reload();
+          return;
+        }
+        var summary = result.data.summary;
+        self.say('info', 'Synced ' + result.data.received + ' scans: ' + summary.found + ' found, ' +
+          summary.misplaced + ' misplaced, ' + summary.unknown + ' unknown so far.');
+      })
+      .catch(function (error) {
+        self.say('danger', navigator.onLine ? error.message : 'Offline; scans are kept and will be sent later.');
+      })
+      .then(function () {
+        self.syncing = false;
+        self.render();
+      });
+  };
+
+  document.addEventListener('DOMContentLoaded', function () {
+    var root = document.querySelector('[data-stocktake]');
+    if (root) { new Scanner(root); }
+  });
+})();
@@ -0,0 +1,123 @@
+/*
+ * Typeahead picker for TypeaheadWidget (assets/forms.py).
+ *
+ *   <div class="typeahead" data-typeahead-url="/lookup/assets/">
+ *     <input type="text">                        // what the user types
+ *     <input type="hidden" data-typeahead-value> // pk that is submitted
+ *     <div class="typeahead-menu"></div>
+ *   </div>
+ *
+ * The endpoint answers ?q=... with {results: [{id, label}, ...]}.
+ */
+(function () {
+  'use strict';
+
+  const DELAY = 150;
+
+  function Typeahead(root) {
+    this.url = root.dataset.typeaheadUrl;
+    this.input = root.querySelector('input[type="text"]');
+    this.value = root.querySelector('[data-typeahead-value]');
+    this.menu = root.querySelector('.typeahead-menu');
+    this.results = [];
+    this.active = -1;
+    this.request = 0;
+
+    this.input.addEventListener('input', () => this.changed());
+    this.input.addEventListener('keydown', (event) => this.key(event));
+    this.input.addEventListener('blur', () => setTimeout(() => this.hide(), DELAY));
+  }
+
+  Typeahead.prototype.changed = function () {
+    // Typing invalidates the previous choice until a suggestion is picked
+    this.value.value = '';
+    clearTimeout(this.timer);
+    const term = this.input.value.trim();
+    if (!term) {
+      this.hide();
+      return;
+    }
+    this.timer = setTimeout(() => this.fetch(term), DELAY);
+  };
+
+  Typeahead.prototype.fetch = function (term) {
+    const request = ++this.request;
+    fetch(this.url + '?' + new URLSearchParams({ q: term }), { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then((response) => {
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+        return response.json();
+      })
+      .then((data) => {
+        // Ignore answers to queries the user has already typed past
+        if (request === this.request) this.show(data.results);
+      })
+      .catch((error) => console.error('Typeahead error:', error));
+  };
+
+  Typeahead.prototype.show = function (results) {
+    this.results = results;
+    this.active = -1;
+    this.menu.replaceChildren();
+    if (!results.length) {
+      const empty = document.createElement('div');
+      empty.className = 'list-group-item text-muted small';
+      empty.textContent = 'No matches';
+      this.menu.appendChild(empty);
+    }
+    results.forEach((result, index) => {
+      const item = document.createElement('button');
+      item.type = 'button';
+      item.className = 'list-group-item list-group-item-action';
+      item.textContent = result.label;
+      // mousedown fires before the input's blur hides the menu
+      item.addEventListener('mousedown', (event) => {
+        event.preventDefault();
+        this.pick(index);
+      });
+      this.menu.appendChild(item);
+    });
+    this.menu.style.display = 'block';
+  };
+
+  Typeahead.prototype.hide = function () {
+    this.menu.style.display = 'none';
+    this.active = -1;
+  };
+
+  Typeahead.prototype.pick = function (index) {
+    const result = this.results[index];
+    if (!result) return;
+    this.value.value = result.id;
+    this.input.value = result.label;
+    this.hide();
+  };
+
+  Typeahead.prototype.highlight = function (index) {
+    const items = this.menu.querySelectorAll('button');
+    if (!items.length) return;
+    this.active = (index + items.length) % items.length;
+    items.forEach((item, i) => item.classList.toggle('active', i === this.active));
+  };
+
+  Typeahead.prototype.key = function (event) {
+    if (this.menu.style.display === 'none') return;
+    if (event.key === 'ArrowDown') {
+      event.preventDefault();
+      this.highlight(this.active + 1);
+    } else if (event.key === 'ArrowUp') {
+      event.preventDefault();
+      this.highlight(this.active - 1);
+    } else if (event.key === 'Enter') {
+      if (this.active >= 0) {
+        event.preventDefault();
+        this.pick(this.active);
+      }
+    } else if (event.key === 'Escape') {
+      this.hide();
+    }
+  };
+
+  document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('[data-typeahead-url]').forEach((root) => new Typeahead(root));
+  });
+})();
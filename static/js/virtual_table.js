@@ -0,0 +1,159 @@
+/*
+ * Virtual-scrolling table fed by a keyset-paginated JSON endpoint.
+ *
+ * The endpoint answers ?cursor=...&limit=... with {rows: [...], next: cursor|null}.
+ * Rows are fetched one window at a time as the user scrolls, and only the
+ * rows inside the viewport (plus a small overscan) exist in the DOM, so the
+ * page stays light however long the history grows.
+ *
+ *   new VirtualTable({
+ *     container: element,   // scrollable wrapper around the <table>
+ *     tbody: element,
+ *     url: '/movements/rows/',
+ *     columns: [(row, index) => Node|string, ...],
+ *     rowHeight: 57,
+ *     onEmpty: () => {},
+ *   });
+ */
+(function () {
+  'use strict';
+
+  function cell(content, className) {
+    const td = document.createElement('td');
+    if (className) td.className = className;
+    if (content instanceof Node) {
+      td.appendChild(content);
+    } else if (content !== null && content !== undefined) {
+      td.textContent = content;
+    }
+    return td;
+  }
+
+  function VirtualTable(options) {
+    this.container = options.container;
+    this.tbody = options.tbody;
+    this.url = options.url;
+    this.columns = options.columns;
+    this.cellClasses = options.cellClasses || [];
+    this.rowHeight = options.rowHeight || 57;
+    this.pageSize = options.pageSize || 100;
+    this.overscan = options.overscan || 10;
+    this.onEmpty = options.onEmpty || function () {};
+
+    this.rows = [];
+    this.next = null;
+    this.done = false;
+    this.loading = false;
+    this.rendered = [-1, -1];
+
+    this.container.addEventListener('scroll', () => this.schedule(), { passive: true });
+    window.addEventListener('resize', () => this.schedule());
+    this.load();
+  }
+
+  VirtualTable.prototype.load = function () {
+    if (this.loading || this.done) return;
+    this.loading = true;
+
+    const params = new URLSearchParams({ limit: this.pageSize });
+    if (this.next) params.set('cursor', this.next);
+
+    fetch(this.url + '?' + params.toString(), { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then((response) => {
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+        return response.json();
+      })
+      .then((page) => {
+        this.rows.push.apply(this.rows, page.rows);
+        this.next = page.next;
+        this.done = !page.next;
+        this.loading = false;
+        if (!this.rows.length) {
+          this.onEmpty();
+          return;
+        }
+        this.rendered = [-1, -1];
+        this.render();
+      })
+      .catch((error) => {
+        this.loading = false;
+        console.error('Virtual table load error:', error);
+      });
+  };
+
+  VirtualTable.prototype.schedule = function () {
+    if (this.frame) return;
+    this.frame = window.requestAnimationFrame(() => {
+      this.frame = null;
+      this.render();
+    });
+  };
+
+  VirtualTable.prototype.spacer = function (height) {
+    const tr = document.createElement('tr');
+    tr.className = 'virtual-spacer';
+    tr.style.height = height + 'px';
+    return tr;
+  };
+
+  VirtualTable.prototype.render = function () {
+    const viewport = this.container.clientHeight || 600;
+    const first = Math.max(0, Math.floor(this.container.scrollTop / this.rowHeight) - this.overscan);
+    const last = Math.min(
+      this.rows.length,
+      Math.ceil((this.container.scrollTop + viewport) / this.rowHeight) + this.overscan
+    );
+
+    // Fetch the next window before the user reaches the end of what we have
+    if (!this.done && last + this.pageSize / 2 >= this.rows.length) this.load();
+
+    if (first === this.rendered[0] && last === this.rendered[1]) return;
+    this.rendered = [first, last];
+
+    const fragment = document.createDocumentFragment();
+    fragment.appendChild(this.spacer(first * this.rowHeight));
+    for (let i = first; i < last; i++) {
+      const tr = document.createElement('tr');
+      tr.style.height = this.rowHeight + 'px';
+      this.columns.forEach((column, c) => {
+        tr.appendChild(cell(column(this.rows[i], i), this.cellClasses[c]));
+      });
+      fragment.appendChild(tr);
+    }
+    fragment.appendChild(this.spacer((this.rows.length - last) * this.rowHeight));
+    this.tbody.replaceChildren(fragment);
+  };
+
+  // Small DOM helpers for column renderers
+  VirtualTable.badge = function (text, className) {
+    const span = document.createElement('span');
+    span.className = 'badge ' + className;
+    span.textContent = text;
+    return span;
+  };
+
+  VirtualTable.muted = function (text, className) {
+    const span = document.createElement('span');
+    span.className = 'text-muted' + (className ? ' ' + className : '');
+    span.textContent = text;
+    return span;
+  };
+
+  VirtualTable.actions = function (links) {
+    const div = document.createElement('div');
+    div.className = 'd-flex justify-content-center gap-2';
+    links.forEach((link) => {
+      const a = document.createElement('a');
+      a.href = link.href;
+      a.className = 'btn btn-sm ' + link.className;
+      a.title = link.title;
+      const icon = document.createElement('i');
+      icon.className = 'bi ' + link.icon;
+      a.appendChild(icon);
+      div.appendChild(a);
+    });
+    return div;
+  };
+
+  window.VirtualTable = VirtualTable;
+})();